@@ -1,10 +1,13 @@
 import sys
 import os
+import multiprocessing
 from PySide6.QtWidgets import QApplication
 from PySide6.QtGui import QIcon
 from ui.main_window import MainWindow
 from ui.login_dialog import LoginDialog
-from utils.db import DatabaseManager
+from utils.db import DatabaseManager, close_all_pools
+from modules.file_metadata import MetadataReconciler
+from modules.task_engine import TaskEngine
 
 def setup_environment():
     """設置應用程式環境"""
@@ -38,9 +41,27 @@ def main():
         # 登入成功，顯示主視窗
         window = MainWindow(login_dialog.get_user())
         window.show()
-        return app.exec_()
+        
+        # 背景校正文件中繼資料（只處理修改時間變動的文件）
+        reconciler = MetadataReconciler()
+        reconciler.start()
+        
+        # 啟動任務執行引擎（在獨立程序中處理等待中的任務）
+        engine = TaskEngine()
+        engine.start()
+        
+        exit_code = app.exec_()
+        # 不等待執行中的任務完成，被中斷的任務會放回等待佇列
+        engine.stop(wait=False)
+        reconciler.stop()
+        
+        # 關閉連接池中的所有資料庫連接
+        close_all_pools()
+        return exit_code
     
     return 0
 
 if __name__ == '__main__':
+    # 打包後的執行檔需要此呼叫才能正確啟動工作程序
+    multiprocessing.freeze_support()
     sys.exit(main())
\ No newline at end of file
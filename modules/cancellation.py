@@ -0,0 +1,155 @@
+import threading
+import multiprocessing
+from contextlib import contextmanager
+
+from modules.task_events import publish, STATUS_EVENT
+
+# 取消標記表的大小（同時執行的任務數不會超過此值）
+CANCEL_SLOTS = 256
+
+# 執行中的步驟檢查取消標記的間隔（秒）
+CANCEL_POLL_SECONDS = 0.2
+
+# 取消標記的值：使用者停止任務，或程式結束時中斷任務（任務放回等待佇列，下次啟動時重新執行）
+CANCEL_REQUESTED = 1
+INTERRUPT_REQUESTED = 2
+
+
+class TaskCancelled(Exception):
+    """任務已由使用者停止（或程式結束時被中斷）"""
+
+
+class CancelFlags:
+    """以共享記憶體保存的任務取消標記表
+
+    由 TaskEngine 建立並在程序池啟動時傳給工作程序，每個執行中的任務佔用一格；
+    主程序設定標記後，工作程序直接讀取共享記憶體即可得知，不需要額外的通訊。
+    """
+
+    def __init__(self, size=CANCEL_SLOTS):
+        self.flags = multiprocessing.RawArray('b', size)
+        self._free = list(range(size - 1, -1, -1))
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取得一格未使用的標記，沒有空位時回傳 None（該任務無法取消）"""
+        with self._lock:
+            if not self._free:
+                return None
+            slot = self._free.pop()
+        self.flags[slot] = 0
+        return slot
+
+    def release(self, slot):
+        if slot is None:
+            return
+        self.flags[slot] = 0
+        with self._lock:
+            self._free.append(slot)
+
+    def cancel(self, slot):
+        if slot is not None:
+            self.flags[slot] = CANCEL_REQUESTED
+
+    def interrupt(self, slot):
+        """程式結束時中斷任務（已被使用者停止的任務維持停止）"""
+        if slot is not None and self.flags[slot] == 0:
+            self.flags[slot] = INTERRUPT_REQUESTED
+
+
+class TaskCancelToken:
+    """工作程序中的任務取消標記（用法與 DataLoader 的 CancelToken 相同）"""
+
+    def __init__(self, flags=None, slot=None):
+        self.flags = flags
+        self.slot = slot
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+        if self.flags is not None and self.slot is not None:
+            self.flags[self.slot] = CANCEL_REQUESTED
+
+    @property
+    def cancelled(self):
+        if self._cancelled:
+            return True
+        return self.flags is not None and self.slot is not None and self.flags[self.slot] != 0
+
+    @property
+    def interrupted(self):
+        """是否因程式結束而被中斷（而不是由使用者停止）"""
+        return (not self._cancelled and self.flags is not None and self.slot is not None
+                and self.flags[self.slot] == INTERRUPT_REQUESTED)
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise TaskCancelled()
+
+
+# 工作程序中的取消標記表（由 init_worker 設定）
+_worker_flags = None
+
+# 目前執行緒正在處理的任務的取消標記
+_local = threading.local()
+
+
+def init_worker(flags):
+    """程序池的 initializer：保存共享的取消標記表"""
+    global _worker_flags
+    _worker_flags = flags
+
+
+def worker_token(slot):
+    """取得工作程序中指定標記的取消標記"""
+    return TaskCancelToken(_worker_flags, slot)
+
+
+@contextmanager
+def bind_token(token):
+    """在目前執行緒中設定取消標記，讓讀取與運算函式不必逐層傳遞"""
+    previous = getattr(_local, 'token', None)
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previous
+
+
+def current_token():
+    return getattr(_local, 'token', None)
+
+
+def raise_if_cancelled():
+    """目前的任務已被停止時拋出 TaskCancelled（沒有設定取消標記時不做任何事）
+
+    批次讀取、分段運算與逐欄處理的步驟在每批/每段/每欄之間呼叫；分組彙總、樞紐分析、
+    合併與去重複等單一 pandas 呼叫只在呼叫前檢查，停止這類步驟須等該呼叫結束。
+    """
+    token = getattr(_local, 'token', None)
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def request_cancellation(db, task_id):
+    """要求停止任務：等待中的任務直接標記為已停止，執行中的任務由引擎通知工作程序
+
+    回傳 'cancelled'（已停止）、'requested'（已通知執行中的任務）或 None（任務已結束）。
+    """
+    with db.transaction() as conn:
+        if conn.execute("""
+            UPDATE tasks
+            SET status = 'cancelled', completed_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'pending'
+        """, (task_id,)).rowcount:
+            outcome = 'cancelled'
+        elif conn.execute("""
+            UPDATE tasks SET cancel_requested = 1, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'processing'
+        """, (task_id,)).rowcount:
+            outcome = 'requested'
+        else:
+            outcome = None
+    if outcome == 'cancelled':
+        publish(STATUS_EVENT, task_id, status='cancelled')
+    return outcome
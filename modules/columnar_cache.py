@@ -0,0 +1,268 @@
+import os
+import hashlib
+
+from modules.file_metadata import HASH_CHUNK_SIZE
+
+# 欄式快取目錄：每個工作表轉換為一個 Arrow IPC 檔案
+CACHE_DIR = os.path.join('data', 'cache', 'columnar')
+
+# 快取大小上限，超過時依最近使用時間淘汰
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+# 步驟輸出快取目錄與預設大小上限
+STEP_CACHE_DIR = os.path.join('data', 'cache', 'steps')
+STEP_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# 快取格式版本，轉換方式改變時需更新以免讀到舊格式
+CACHE_FORMAT_VERSION = "1"
+
+
+def arrow_available():
+    """檢查是否安裝 pyarrow（未安裝時不使用快取）"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def compute_sha256(path):
+    """以串流方式計算文件的 SHA-256"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def current_content_hash(path, sha256=None, mtime=None, size_bytes=None):
+    """取得文件目前內容的雜湊
+
+    已記錄的雜湊只有在文件的修改時間與大小都未變動時才沿用，否則重新計算。
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if (sha256 and mtime is not None and size_bytes == stat.st_size
+            and abs(stat.st_mtime - mtime) < 1e-6):
+        return sha256
+    return compute_sha256(path)
+
+
+def sheet_cache_key(sha256, sheet_name=None):
+    """上傳文件工作表的快取鍵：內容雜湊 + 工作表"""
+    if not sha256:
+        return None
+    sheet_key = hashlib.sha1(str(sheet_name).encode('utf-8')).hexdigest()[:12] if sheet_name else "default"
+    return f"{sha256}-{sheet_key}"
+
+
+def read_arrow_file(path):
+    """以記憶體映射開啟 Arrow IPC 檔案並轉換為 DataFrame
+
+    每欄各自成為一個區塊（split_blocks），沒有空值的數值欄位直接引用映射的記憶體而不複製，
+    這些欄位是唯讀的；其他欄位轉換後立即釋放對應的 Arrow 緩衝（self_destruct），
+    不會同時保留整份 Arrow 資料與轉換結果。需要就地修改資料的步驟必須先 copy()。
+    """
+    import pyarrow as pa
+
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+        frame = table.to_pandas(split_blocks=True, self_destruct=True)
+        del table
+        return frame
+
+
+class ColumnarCache:
+    """以 Arrow IPC 檔案保存 DataFrame 的磁碟快取
+
+    每個快取鍵對應一個未壓縮的 Arrow IPC 檔案，讀取時以記憶體映射開啟（見 read_arrow_file）。
+    上傳文件的工作表以 sheet_cache_key 為鍵，重新執行同一文件時不必再解析 Excel；
+    步驟輸出快取使用另一個目錄與大小上限。
+    快取總大小超過上限時，依檔案修改時間（讀取時會更新）淘汰最久未使用的項目。
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, f"{key}-v{CACHE_FORMAT_VERSION}.arrow")
+
+    def contains(self, key):
+        return bool(key) and os.path.exists(self.path_for(key))
+
+    def load(self, key):
+        """讀取快取的 DataFrame，沒有快取時回傳 None"""
+        if not key or not arrow_available():
+            return None
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            return None
+
+        import pyarrow as pa
+
+        try:
+            frame = read_arrow_file(path)
+        except (OSError, pa.ArrowInvalid) as e:
+            print(f"讀取欄式快取 {path} 時發生錯誤：{e}")
+            return None
+
+        # 更新修改時間作為最近使用時間
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return frame
+
+    def batch_writer(self, key):
+        """建立逐批寫入快取的 CacheBatchWriter，無法快取時回傳 None"""
+        if not key or not arrow_available():
+            return None
+        return CacheBatchWriter(self, key)
+
+    def store(self, key, frame):
+        """將 DataFrame 寫入快取，回傳是否成功（資料型別無法轉換時不快取）"""
+        writer = self.batch_writer(key)
+        if writer is None:
+            return False
+        try:
+            if not writer.write(frame):
+                return False
+            return writer.commit()
+        except OSError as e:
+            print(f"寫入欄式快取時發生錯誤：{e}")
+            return False
+        finally:
+            writer.abort()
+
+    def entries(self):
+        """列出快取檔案：[(路徑, 大小, 最近使用時間)]"""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.arrow'):
+                stat = entry.stat()
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def total_bytes(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """淘汰最久未使用的快取直到總大小不超過上限，回傳淘汰的檔案數"""
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+
+class CacheBatchWriter:
+    """逐批寫入欄式快取的暫存檔，批次轉換為 Arrow 後立即寫入，不在記憶體中累積
+
+    第一批決定檔案的欄位型別，之後的批次轉換為相同型別；無法轉換時（例如同一欄
+    前後批次分別為數字與文字）停止寫入並將 failed 設為 True，已寫入的批次仍可由
+    finish 讀回。全部批次寫入成功時，finish 將暫存檔移為快取檔案。
+    """
+
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+        self.temp_path = f"{cache.path_for(key)}.{os.getpid()}.tmp"
+        self.failed = False
+        self._sink = None
+        self._writer = None
+        self._schema = None
+
+    def write(self, frame):
+        """寫入一批，回傳是否成功；失敗後不再寫入，呼叫端需自行保留該批與之後的批次
+
+        無法建立暫存檔時視為失敗；已開始寫入後發生的 OSError 直接拋出。
+        """
+        if self.failed:
+            return False
+
+        import pyarrow as pa
+
+        try:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._schema is not None and not table.schema.equals(self._schema):
+                table = table.cast(self._schema)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+            print(f"無法建立欄式快取：{e}")
+            self.failed = True
+            return False
+
+        if self._writer is None:
+            try:
+                os.makedirs(self.cache.cache_dir, exist_ok=True)
+                self._sink = pa.OSFile(self.temp_path, 'wb')
+                self._writer = pa.ipc.new_file(self._sink, table.schema)
+            except OSError as e:
+                print(f"寫入欄式快取時發生錯誤：{e}")
+                self.failed = True
+                self.abort()
+                return False
+            self._schema = table.schema
+        self._writer.write_table(table)
+        return True
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._sink is not None:
+            self._sink.close()
+            self._sink = None
+
+    def commit(self):
+        """全部批次寫入成功時，將暫存檔移為快取檔案並淘汰舊快取，回傳是否成功"""
+        if self.failed or self._schema is None:
+            return False
+        self._close()
+        try:
+            os.replace(self.temp_path, self.cache.path_for(self.key))
+        except OSError as e:
+            # Windows 上快取檔案仍被映射時無法取代
+            print(f"寫入欄式快取時發生錯誤：{e}")
+            self.failed = True
+            return False
+        self.cache.evict()
+        return True
+
+    def finish(self):
+        """結束寫入並以記憶體映射讀回已寫入的批次，沒有寫入任何批次時回傳 None"""
+        if self._schema is None:
+            return None
+        try:
+            if self.commit():
+                return read_arrow_file(self.cache.path_for(self.key))
+            self._close()
+            return read_arrow_file(self.temp_path)
+        finally:
+            self.abort()
+
+    def abort(self):
+        """關閉並刪除暫存檔（已 commit 時不做任何事）"""
+        try:
+            self._close()
+        except OSError:
+            pass
+        try:
+            os.remove(self.temp_path)
+        except OSError:
+            pass
@@ -0,0 +1,18 @@
+from utils.db import DatabaseManager
+from modules.records import ConnectionRecord
+
+
+class ConnectionRepository:
+    """數據連接資料存取類"""
+
+    def __init__(self, db=None):
+        self.db = db or DatabaseManager()
+
+    def list_connections(self):
+        """取得連接列表（依名稱排序），回傳 ConnectionRecord 列表"""
+        with self.db.connection() as conn:
+            return ConnectionRecord.fetch_all(conn, """
+                SELECT id, name, type, server, port, database_name, username, status
+                FROM connections
+                ORDER BY name ASC
+            """)
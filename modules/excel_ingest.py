@@ -0,0 +1,137 @@
+import os
+
+from modules.cancellation import raise_if_cancelled
+
+# 每批讀取的列數
+DEFAULT_BATCH_SIZE = 50000
+
+# 可以串流讀取的 Excel 格式（openpyxl 支援）；.xls 只能整份讀取
+STREAMING_EXCEL_EXTENSIONS = ('.xlsx', '.xlsm')
+EXCEL_EXTENSIONS = STREAMING_EXCEL_EXTENSIONS + ('.xls',)
+
+
+def make_columns(header):
+    """由標題列產生欄位名稱，空白標題與重複名稱的處理方式與 pandas 相同"""
+    columns = []
+    seen = {}
+    for i, value in enumerate(header):
+        name = f"Unnamed: {i}" if value is None or value == "" else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def iter_excel_batches(path, sheet_name=None, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """以 openpyxl 唯讀模式逐列讀取工作表，每 batch_size 列產生一個 DataFrame
+
+    唯讀模式以 iterparse 串流解析工作表 XML，不會建立整份活頁簿的儲存格物件，
+    記憶體用量只與批次大小有關。第一列視為標題，完全空白的列會略過。
+    progress(已讀列數, 總列數) 在每批產生前呼叫；總列數取自工作表尺寸資訊，
+    無法取得時為 None。任務被停止時在下一批產生前中斷。
+    """
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        total_rows = worksheet.max_row - 1 if worksheet.max_row else None
+
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = make_columns(header)
+        width = len(columns)
+
+        batch = []
+        rows_read = 0
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            # 唯讀模式下各列長度可能與標題不同
+            if len(row) != width:
+                row = (tuple(row) + (None,) * width)[:width]
+            batch.append(row)
+            if len(batch) >= batch_size:
+                rows_read += len(batch)
+                if progress:
+                    progress(rows_read, total_rows)
+                raise_if_cancelled()
+                yield pd.DataFrame.from_records(batch, columns=columns)
+                batch = []
+
+        if batch or rows_read == 0:
+            rows_read += len(batch)
+            if progress:
+                progress(rows_read, total_rows)
+            raise_if_cancelled()
+            yield pd.DataFrame.from_records(batch, columns=columns)
+    finally:
+        workbook.close()
+
+
+def iter_csv_batches(path, batch_size=DEFAULT_BATCH_SIZE, progress=None, total_rows=None):
+    """以 pandas 分塊讀取 CSV，每 batch_size 列產生一個 DataFrame"""
+    import pandas as pd
+
+    rows_read = 0
+    with pd.read_csv(path, chunksize=batch_size) as reader:
+        for chunk in reader:
+            rows_read += len(chunk)
+            if progress:
+                progress(rows_read, total_rows)
+            raise_if_cancelled()
+            yield chunk
+
+
+def iter_record_batches(path, sheet_name=None, batch_size=None, progress=None, total_rows=None):
+    """依文件類型以批次方式讀取輸入文件
+
+    total_rows 可傳入上傳時記錄的列數（files.row_count），供 CSV 回報進度使用。
+    """
+    import pandas as pd
+
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension in STREAMING_EXCEL_EXTENSIONS:
+        yield from iter_excel_batches(path, sheet_name, batch_size, progress)
+    elif extension == '.csv':
+        yield from iter_csv_batches(path, batch_size, progress, total_rows)
+    elif extension in EXCEL_EXTENSIONS:
+        # 舊版 .xls 格式無法串流讀取，只能整份載入
+        frame = pd.read_excel(path, sheet_name=sheet_name or 0)
+        if progress:
+            progress(len(frame), len(frame))
+        yield frame
+    else:
+        raise ValueError(f"不支援的文件類型: {extension}")
+
+
+def read_batches(path, sheet_name=None, batch_size=None, progress=None, total_rows=None, sink=None):
+    """以批次方式讀取輸入文件並合併為單一 DataFrame
+
+    提供 sink（欄式快取的 CacheBatchWriter）時，每批讀取後直接寫入 sink，不在記憶體中累積，
+    讀取完成後由 sink.finish() 以記憶體映射一次讀回；只有 sink 無法寫入的批次才保留在記憶體中合併。
+    """
+    import pandas as pd
+
+    batches = []
+    for batch in iter_record_batches(path, sheet_name, batch_size, progress, total_rows):
+        if sink is None or not sink.write(batch):
+            batches.append(batch)
+    if sink is not None:
+        written = sink.finish()
+        if written is not None:
+            batches.insert(0, written)
+
+    if not batches:
+        return pd.DataFrame()
+    if len(batches) == 1:
+        return batches[0]
+    return pd.concat(batches, ignore_index=True)
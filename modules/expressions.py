@@ -0,0 +1,428 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+
+from modules.cancellation import raise_if_cancelled
+
+# 資料列數達到此值時改用 numexpr 以多執行緒分塊計算，較小的資料直接用 NumPy
+NUMEXPR_MIN_ROWS = 10000
+
+# 大量資料分段計算的列數，每段之間檢查任務是否已被停止
+EVALUATE_CHUNK_ROWS = 500000
+
+# 運算式可使用的函式：名稱 -> (參數數量, numexpr 是否支援)
+FUNCTIONS = {
+    'abs': (1, True),
+    'sqrt': (1, True),
+    'log': (1, True),
+    'log10': (1, True),
+    'exp': (1, True),
+    'where': (3, True),
+    'round': (2, False),
+}
+
+KEYWORDS = ('and', 'or', 'not', 'in', 'startswith', 'endswith', 'contains', 'true', 'false')
+
+TOKEN_PATTERN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<number>(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?)
+  | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<quoted>`[^`]+`)
+  | (?P<name>[^\W\d]\w*)
+  | (?P<op>\*\*|==|!=|<=|>=|[-+*/%<>&|~(),\[\]])
+""", re.VERBOSE)
+
+COMPARE_OPS = ('==', '!=', '<', '<=', '>', '>=')
+STRING_OPS = ('startswith', 'endswith', 'contains')
+
+
+class ExpressionError(ValueError):
+    """運算式語法或求值錯誤"""
+
+
+def tokenize(text):
+    """將運算式切分為 (類型, 值, 位置) 列表"""
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if not match:
+            raise ExpressionError(f"第 {position + 1} 個字元無法辨識: {text[position]}")
+        kind = match.lastgroup
+        value = match.group()
+        if kind == 'name' and value.lower() in KEYWORDS:
+            kind, value = 'keyword', value.lower()
+        elif kind == 'quoted':
+            kind, value = 'name', value[1:-1]
+        elif kind == 'string':
+            value = re.sub(r"\\(.)", r"\1", value[1:-1])
+        if kind != 'space':
+            tokens.append((kind, value, position))
+        position = match.end()
+    tokens.append(('end', None, len(text)))
+    return tokens
+
+
+class Parser:
+    """遞迴下降剖析器
+
+    優先順序（由低至高）：or / |、and / &、not / ~、比較與 startswith/endswith/contains/in、
+    + -、* / %、正負號、**。與 Python 不同，& 與 | 的優先順序低於比較運算，
+    因此 `abs(amount) > 1e6 & account startswith '4'` 不需要加括號。
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.index = 0
+
+    def peek(self):
+        return self.tokens[self.index]
+
+    def advance(self):
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def accept(self, *values):
+        kind, value, _ = self.peek()
+        if kind in ('op', 'keyword') and value in values:
+            self.index += 1
+            return value
+        return None
+
+    def expect(self, value):
+        if not self.accept(value):
+            kind, found, position = self.peek()
+            raise ExpressionError(f"第 {position + 1} 個字元預期為 {value}，但為 {found or '結尾'}")
+
+    def parse(self):
+        node = self.parse_or()
+        kind, value, position = self.peek()
+        if kind != 'end':
+            raise ExpressionError(f"第 {position + 1} 個字元有多餘的內容: {value}")
+        return node
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.accept('|', 'or'):
+            node = ('bool', 'or', node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self.accept('&', 'and'):
+            node = ('bool', 'and', node, self.parse_not())
+        return node
+
+    def parse_not(self):
+        if self.accept('~', 'not'):
+            return ('not', self.parse_not())
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        node = self.parse_additive()
+        op = self.accept(*COMPARE_OPS)
+        if op:
+            return ('compare', op, node, self.parse_additive())
+        op = self.accept(*STRING_OPS)
+        if op:
+            return ('strop', op, node, self.parse_additive())
+        if self.accept('in'):
+            self.expect('[')
+            items = []
+            if not self.accept(']'):
+                items.append(self.parse_additive())
+                while self.accept(','):
+                    items.append(self.parse_additive())
+                self.expect(']')
+            return ('in', node, items)
+        return node
+
+    def parse_additive(self):
+        node = self.parse_multiplicative()
+        while True:
+            op = self.accept('+', '-')
+            if not op:
+                return node
+            node = ('binary', op, node, self.parse_multiplicative())
+
+    def parse_multiplicative(self):
+        node = self.parse_unary()
+        while True:
+            op = self.accept('*', '/', '%')
+            if not op:
+                return node
+            node = ('binary', op, node, self.parse_unary())
+
+    def parse_unary(self):
+        if self.accept('-'):
+            return ('neg', self.parse_unary())
+        if self.accept('+'):
+            return self.parse_unary()
+        return self.parse_power()
+
+    def parse_power(self):
+        node = self.parse_primary()
+        if self.accept('**'):
+            return ('binary', '**', node, self.parse_unary())
+        return node
+
+    def parse_primary(self):
+        kind, value, position = self.advance()
+        if kind == 'number':
+            return ('const', float(value) if any(c in value for c in '.eE') else int(value))
+        if kind == 'string':
+            return ('const', value)
+        if kind == 'keyword' and value in ('true', 'false'):
+            return ('const', value == 'true')
+        if kind == 'op' and value == '(':
+            node = self.parse_or()
+            self.expect(')')
+            return node
+        if kind == 'name':
+            if self.accept('('):
+                return self.parse_call(value, position)
+            return ('column', value)
+        raise ExpressionError(f"第 {position + 1} 個字元預期為數值、欄位或函式，但為 {value or '結尾'}")
+
+    def parse_call(self, name, position):
+        if name not in FUNCTIONS:
+            raise ExpressionError(f"第 {position + 1} 個字元使用了未知的函式: {name}")
+        args = []
+        if not self.accept(')'):
+            args.append(self.parse_or())
+            while self.accept(','):
+                args.append(self.parse_or())
+            self.expect(')')
+        if len(args) != FUNCTIONS[name][0]:
+            raise ExpressionError(f"函式 {name} 需要 {FUNCTIONS[name][0]} 個參數")
+        return ('call', name, args)
+
+
+@lru_cache(maxsize=512)
+def parse_expression(text):
+    """剖析運算式並快取結果（同一版本的配置在每個工作程序中只剖析一次）"""
+    if not text or not text.strip():
+        raise ExpressionError("運算式不能為空")
+    return Parser(text).parse()
+
+
+class Evaluator:
+    """將剖析後的運算式套用到 DataFrame
+
+    數值運算編譯為 numexpr 字串（大量資料時以多執行緒分塊計算）；
+    字串比較與 startswith 等運算先以 pandas 向量化計算成布林陣列，
+    再以變數的形式代入 numexpr。未安裝 numexpr 或資料量小時直接以 NumPy 計算。
+    """
+
+    def __init__(self, frame, use_numexpr=None):
+        self.frame = frame
+        if use_numexpr is None:
+            use_numexpr = len(frame) >= NUMEXPR_MIN_ROWS
+        self.numexpr = None
+        if use_numexpr:
+            try:
+                import numexpr
+                self.numexpr = numexpr
+            except ImportError:
+                self.numexpr = None
+        self.variables = {}
+
+    def evaluate(self, node):
+        if self.numexpr is None:
+            return self.values(node)
+        source = self.to_numexpr(node)
+        return self.numexpr.evaluate(source, local_dict=self.variables)
+
+    # --- 以 NumPy / pandas 直接計算 ---
+
+    def column(self, name):
+        if name not in self.frame.columns:
+            raise ExpressionError(f"找不到欄位: {name}")
+        return self.frame[name]
+
+    def is_text(self, node):
+        """判斷節點是否為文字（字串常數或非數值欄位）"""
+        if node[0] == 'const':
+            return isinstance(node[1], str)
+        if node[0] == 'column':
+            return self.column(node[1]).dtype.kind not in 'biuf'
+        return False
+
+    def values(self, node):
+        kind = node[0]
+        if kind == 'const':
+            return node[1]
+        if kind == 'column':
+            series = self.column(node[1])
+            return series if self.is_text(node) else series.to_numpy()
+        if kind == 'neg':
+            return -self.values(node[1])
+        if kind == 'not':
+            return ~np.asarray(self.values(node[1]), dtype=bool)
+        if kind == 'binary':
+            left, right = self.values(node[2]), self.values(node[3])
+            op = node[1]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if op == '+':
+                    return left + right
+                if op == '-':
+                    return left - right
+                if op == '*':
+                    return left * right
+                if op == '/':
+                    return np.true_divide(left, right)
+                if op == '%':
+                    return np.mod(left, right)
+                return np.power(left, right)
+        if kind == 'bool':
+            left = np.asarray(self.values(node[2]), dtype=bool)
+            right = np.asarray(self.values(node[3]), dtype=bool)
+            return left & right if node[1] == 'and' else left | right
+        if kind == 'compare':
+            return self.compare(node)
+        if kind == 'strop':
+            return self.string_op(node)
+        if kind == 'in':
+            return self.membership(node)
+        if kind == 'call':
+            return self.call(node)
+        raise ExpressionError(f"無法計算的運算式節點: {kind}")
+
+    def compare(self, node):
+        op, left, right = node[1], self.values(node[2]), self.values(node[3])
+        if op == '==':
+            result = left == right
+        elif op == '!=':
+            result = left != right
+        elif op == '<':
+            result = left < right
+        elif op == '<=':
+            result = left <= right
+        elif op == '>':
+            result = left > right
+        else:
+            result = left >= right
+        return np.asarray(result, dtype=bool)
+
+    def string_op(self, node):
+        op = node[1]
+        if node[3][0] != 'const' or not isinstance(node[3][1], str):
+            raise ExpressionError(f"{op} 的右側必須是字串")
+        pattern = node[3][1]
+        series = self.values(node[2])
+        if not hasattr(series, 'str'):
+            series = self.column_like(series)
+        # 數值代碼（例如科目代碼）也可以用 startswith 比對
+        text = series.astype(str).str
+        if op == 'startswith':
+            result = text.startswith(pattern)
+        elif op == 'endswith':
+            result = text.endswith(pattern)
+        else:
+            result = text.contains(pattern, regex=False)
+        return result.fillna(False).to_numpy(dtype=bool)
+
+    def membership(self, node):
+        values = self.values(node[1])
+        items = [self.values(item) for item in node[2]]
+        if not hasattr(values, 'isin'):
+            values = self.column_like(values)
+        return values.isin(items).to_numpy(dtype=bool)
+
+    def column_like(self, values):
+        import pandas as pd
+        return pd.Series(values, index=self.frame.index)
+
+    def call(self, node):
+        name, args = node[1], [self.values(arg) for arg in node[2]]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if name == 'where':
+                return np.where(np.asarray(args[0], dtype=bool), args[1], args[2])
+            if name == 'round':
+                return np.round(args[0], int(args[1]))
+            return getattr(np, name)(args[0])
+
+    # --- 編譯為 numexpr ---
+
+    def bind(self, value):
+        """將計算好的陣列或欄位綁定為 numexpr 變數，回傳變數名稱"""
+        name = f"_v{len(self.variables)}"
+        self.variables[name] = value
+        return name
+
+    def to_numexpr(self, node):
+        kind = node[0]
+        if kind == 'const':
+            if isinstance(node[1], str):
+                raise ExpressionError(f"字串 '{node[1]}' 只能用於比較運算")
+            return repr(node[1]) if not isinstance(node[1], bool) else str(node[1])
+        if kind == 'column':
+            if self.is_text(node):
+                raise ExpressionError(f"欄位 {node[1]} 不是數值，不能用於數值運算")
+            return self.bind(self.column(node[1]).to_numpy())
+        if kind == 'neg':
+            return f"(-{self.to_numexpr(node[1])})"
+        if kind == 'not':
+            return f"(~{self.to_numexpr(node[1])})"
+        if kind == 'binary':
+            return f"({self.to_numexpr(node[2])} {node[1]} {self.to_numexpr(node[3])})"
+        if kind == 'bool':
+            op = '&' if node[1] == 'and' else '|'
+            return f"({self.to_numexpr(node[2])} {op} {self.to_numexpr(node[3])})"
+        if kind == 'compare':
+            if self.is_text(node[2]) or self.is_text(node[3]):
+                return self.bind(self.compare(node))
+            return f"({self.to_numexpr(node[2])} {node[1]} {self.to_numexpr(node[3])})"
+        if kind in ('strop', 'in'):
+            return self.bind(self.values(node))
+        if kind == 'call':
+            if not FUNCTIONS[node[1]][1]:
+                return self.bind(self.call(node))
+            return f"{node[1]}({', '.join(self.to_numexpr(arg) for arg in node[2])})"
+        raise ExpressionError(f"無法計算的運算式節點: {kind}")
+
+
+def evaluate(text, frame, use_numexpr=None):
+    """計算運算式，回傳與 frame 等長的陣列（常數運算式會展開為整欄）
+
+    超過 EVALUATE_CHUNK_ROWS 列時分段計算（運算式都是逐列運算，結果與整體計算相同），
+    任務被停止時在下一段開始前中斷。
+    """
+    node = parse_expression(text)
+    if len(frame) <= EVALUATE_CHUNK_ROWS:
+        return evaluate_node(text, node, frame, use_numexpr)
+
+    if use_numexpr is None:
+        use_numexpr = len(frame) >= NUMEXPR_MIN_ROWS
+    parts = []
+    for start in range(0, len(frame), EVALUATE_CHUNK_ROWS):
+        raise_if_cancelled()
+        parts.append(evaluate_node(text, node, frame.iloc[start:start + EVALUATE_CHUNK_ROWS], use_numexpr))
+    return np.concatenate(parts)
+
+
+def evaluate_node(text, node, frame, use_numexpr=None):
+    """以剖析後的運算式計算單一段資料"""
+    try:
+        result = Evaluator(frame, use_numexpr).evaluate(node)
+    except (TypeError, ValueError, KeyError) as e:
+        if isinstance(e, ExpressionError):
+            raise
+        raise ExpressionError(f"運算式 {text} 計算失敗: {e}")
+    if np.ndim(result) == 0:
+        result = np.full(len(frame), result)
+    elif hasattr(result, 'to_numpy'):
+        result = result.to_numpy()
+    return result
+
+
+def validate_expression(text):
+    """檢查運算式語法，回傳錯誤訊息；沒有錯誤時回傳 None"""
+    try:
+        parse_expression(text)
+    except ExpressionError as e:
+        return str(e)
+    return None
@@ -0,0 +1,183 @@
+import os
+import hashlib
+import mimetypes
+import threading
+
+from utils.db import DatabaseManager
+
+# 計算雜湊時每次讀取的大小
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 中繼資料欄位（files 與 results 共用）
+METADATA_COLUMNS = ('size_bytes', 'mtime', 'sha256', 'mime_type', 'extension',
+                    'sheet_count', 'row_count')
+
+# 允許更新中繼資料的資料表
+METADATA_TABLES = {
+    'files': 'path',
+    'results': 'output_path',
+}
+
+
+def format_file_size(size_bytes):
+    """格式化文件大小"""
+    if size_bytes is None:
+        return "未知"
+    if size_bytes < 1024:
+        return f"{size_bytes} B"
+    elif size_bytes < 1024 * 1024:
+        return f"{size_bytes / 1024:.1f} KB"
+    else:
+        return f"{size_bytes / (1024 * 1024):.1f} MB"
+
+
+def count_workbook_rows(path):
+    """取得 Excel 工作表數與總列數（唯讀模式，只讀取工作表尺寸資訊）"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        return None, None
+
+    try:
+        workbook = load_workbook(path, read_only=True)
+    except Exception:
+        return None, None
+
+    try:
+        sheet_count = len(workbook.worksheets)
+        row_count = 0
+        for worksheet in workbook.worksheets:
+            row_count += worksheet.max_row or 0
+        return sheet_count, row_count
+    finally:
+        workbook.close()
+
+
+def collect_file_metadata(path, original_name=None):
+    """收集文件中繼資料：大小、修改時間、SHA-256、MIME 類型、副檔名、工作表數與列數
+
+    SHA-256 以串流方式計算；CSV 的列數在同一次讀取中順便計算。
+    """
+    stat = os.stat(path)
+    extension = os.path.splitext(original_name or path)[1].lower()
+    is_csv = extension == '.csv'
+
+    hasher = hashlib.sha256()
+    line_count = 0
+    last_byte = b''
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            if is_csv:
+                line_count += chunk.count(b'\n')
+                last_byte = chunk[-1:]
+
+    sheet_count = None
+    row_count = None
+    if extension in ('.xlsx', '.xlsm'):
+        sheet_count, row_count = count_workbook_rows(path)
+    elif is_csv:
+        # 最後一行沒有換行符號時也要計入
+        sheet_count = 1
+        row_count = line_count + (1 if last_byte and last_byte != b'\n' else 0)
+
+    return {
+        'original_name': original_name,
+        'size_bytes': stat.st_size,
+        'mtime': stat.st_mtime,
+        'sha256': hasher.hexdigest(),
+        'mime_type': mimetypes.guess_type(original_name or path)[0],
+        'extension': extension,
+        'sheet_count': sheet_count,
+        'row_count': row_count,
+    }
+
+
+def save_metadata(cursor, table, row_id, metadata):
+    """將中繼資料寫入 files 或 results 資料表"""
+    if table not in METADATA_TABLES:
+        raise ValueError(f"不支援的資料表: {table}")
+
+    columns = [column for column in METADATA_COLUMNS if column in metadata]
+    if metadata.get('original_name'):
+        columns.append('original_name')
+
+    assignments = ", ".join(f"{column} = ?" for column in columns)
+    values = [metadata[column] for column in columns]
+    cursor.execute(f"UPDATE {table} SET {assignments} WHERE id = ?", values + [row_id])
+
+
+def reconcile_metadata(db=None, table='files', stop_event=None):
+    """重新整理修改時間已變動的文件中繼資料，回傳更新筆數
+
+    只比對 os.stat 的 mtime，內容未變動的文件不會重新計算雜湊。
+    """
+    if table not in METADATA_TABLES:
+        raise ValueError(f"不支援的資料表: {table}")
+
+    db = db or DatabaseManager()
+    path_column = METADATA_TABLES[table]
+
+    with db.connection() as conn:
+        rows = conn.execute(f"""
+            SELECT id, {path_column}, mtime, size_bytes FROM {table}
+            WHERE {path_column} IS NOT NULL
+        """).fetchall()
+
+    changed = []
+    for row_id, path, stored_mtime, stored_size in rows:
+        if stop_event is not None and stop_event.is_set():
+            break
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if stored_mtime is not None and stored_size == stat.st_size and abs(stat.st_mtime - stored_mtime) < 1e-6:
+            continue
+        try:
+            changed.append((row_id, collect_file_metadata(path)))
+        except OSError:
+            continue
+
+    if changed:
+        with db.transaction() as conn:
+            cursor = conn.cursor()
+            for row_id, metadata in changed:
+                save_metadata(cursor, table, row_id, metadata)
+
+    return len(changed)
+
+
+class MetadataReconciler:
+    """背景中繼資料校正器，定期重新整理修改時間變動的文件與結果"""
+
+    def __init__(self, db=None, interval=600):
+        self.db = db or DatabaseManager()
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="metadata-reconciler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            for table in METADATA_TABLES:
+                try:
+                    reconcile_metadata(self.db, table, self._stop_event)
+                except Exception as e:
+                    print(f"校正 {table} 中繼資料時發生錯誤：{e}")
+            self._stop_event.wait(self.interval)
@@ -0,0 +1,38 @@
+from utils.db import DatabaseManager
+from modules.records import FileRecord
+
+
+class FileRepository:
+    """文件資料存取類"""
+
+    def __init__(self, db=None):
+        self.db = db or DatabaseManager()
+
+    def list_files(self, status=None, limit=60, after=None):
+        """以鍵集分頁取得文件列表（依上傳時間由新到舊），回傳 FileRecord 列表
+
+        after 為上一頁最後一筆的 (created_at, id)，不使用 OFFSET，
+        因此越後面的頁面也不需要先掃過前面所有資料。
+        """
+        conditions = []
+        params = []
+
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+
+        if after is not None:
+            conditions.append("(created_at, id) < (?, ?)")
+            params.extend(after)
+
+        query = """
+            SELECT id, name, category, path, status, created_at, size_bytes
+            FROM files
+        """
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+
+        with self.db.connection() as conn:
+            return FileRecord.fetch_all(conn, query, params)
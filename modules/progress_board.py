@@ -0,0 +1,215 @@
+import time
+import threading
+import multiprocessing
+
+from modules.cancellation import CANCEL_SLOTS
+from modules.task_events import publish, PROGRESS_EVENT, STEP_EVENT
+
+# 寫入器檢查共享進度表的間隔（秒），有變動時立即發布進度事件
+PROGRESS_POLL_SECONDS = 0.25
+
+# 進度寫入資料庫的最短間隔（秒）；任務結束或讓出時另外立即寫入
+PROGRESS_FLUSH_SECONDS = 2.0
+
+
+def format_rows_progress(rows_read, total_rows):
+    """格式化讀取進度說明"""
+    if total_rows:
+        return f"已讀取 {rows_read:,} / {total_rows:,} 列（{min(rows_read / total_rows, 1) * 100:.0f}%）"
+    return f"已讀取 {rows_read:,} 列"
+
+
+class ProgressBoard:
+    """以共享記憶體保存的執行中任務進度表
+
+    每個執行中的任務佔用一格（與取消標記表使用同一格），工作程序只寫入共享記憶體，
+    不直接寫資料庫；主程序的 ProgressWriter 讀取後合併寫入資料庫。
+    未設定的數值為 -1。
+    """
+
+    def __init__(self, size=CANCEL_SLOTS):
+        self.task_ids = multiprocessing.RawArray('q', size)
+        self.progress = multiprocessing.RawArray('d', size)
+        self.steps = multiprocessing.RawArray('i', size)
+        self.rows_read = multiprocessing.RawArray('q', size)
+        self.rows_total = multiprocessing.RawArray('q', size)
+        for slot in range(size):
+            self.clear(slot)
+
+    def arrays(self):
+        """傳給工作程序的共享陣列"""
+        return self.task_ids, self.progress, self.steps, self.rows_read, self.rows_total
+
+    def bind(self, slot, task_id):
+        if slot is None:
+            return
+        self.progress[slot] = -1
+        self.steps[slot] = -1
+        self.rows_read[slot] = -1
+        self.rows_total[slot] = -1
+        self.task_ids[slot] = task_id
+
+    def clear(self, slot):
+        if slot is None:
+            return
+        self.task_ids[slot] = 0
+        self.progress[slot] = -1
+        self.steps[slot] = -1
+        self.rows_read[slot] = -1
+        self.rows_total[slot] = -1
+
+    def snapshot(self, slot):
+        """讀取一格的內容，回傳 (任務 ID, 進度, 目前步驟, 已讀取列數, 總列數)；未使用時回傳 None"""
+        task_id = self.task_ids[slot]
+        if not task_id:
+            return None
+        return (task_id, self.progress[slot], self.steps[slot],
+                self.rows_read[slot], self.rows_total[slot])
+
+
+class TaskProgress:
+    """工作程序中單一任務的進度回報（沒有共享進度表時 active 為 False）"""
+
+    def __init__(self, arrays=None, slot=None):
+        self.arrays = arrays
+        self.slot = slot
+
+    @property
+    def active(self):
+        return self.arrays is not None and self.slot is not None
+
+    def set_progress(self, progress):
+        self.arrays[1][self.slot] = progress
+
+    def set_step(self, order_num):
+        self.arrays[2][self.slot] = order_num
+
+    def set_rows(self, rows_read, total_rows=None):
+        self.arrays[4][self.slot] = total_rows or -1
+        self.arrays[3][self.slot] = rows_read
+
+
+# 工作程序中的共享進度表（由 init_worker 設定）
+_worker_arrays = None
+
+
+def init_worker(arrays):
+    """程序池的 initializer：保存共享的進度表"""
+    global _worker_arrays
+    _worker_arrays = arrays
+
+
+def worker_progress(slot):
+    """取得工作程序中指定格的進度回報"""
+    return TaskProgress(_worker_arrays, slot)
+
+
+class ProgressWriter:
+    """共享進度表的唯一寫入者
+
+    定期讀取進度表，有變動時立即發布進度事件（介面不需要查詢資料庫），
+    並以不超過 flush_seconds 一次的頻率將所有變動合併在一個交易中寫入
+    tasks.progress 與讀取中步驟的說明。任務結束或讓出時由引擎呼叫 flush_slot 立即寫入。
+    """
+
+    def __init__(self, db, board, poll_seconds=PROGRESS_POLL_SECONDS, flush_seconds=PROGRESS_FLUSH_SECONDS):
+        self.db = db
+        self.board = board
+        self.poll_seconds = poll_seconds
+        self.flush_seconds = flush_seconds
+        self._published = {}
+        self._written = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="task-progress", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"寫入任務進度時發生錯誤：{e}")
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while not self._stop_event.wait(self.poll_seconds):
+            self.publish_changes()
+            if time.monotonic() - last_flush < self.flush_seconds:
+                continue
+            last_flush = time.monotonic()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"寫入任務進度時發生錯誤：{e}")
+
+    def publish_changes(self):
+        """發布進度有變動的任務的進度事件"""
+        for slot in range(len(self.board.task_ids)):
+            entry = self.board.snapshot(slot)
+            if entry is None or entry[1] < 0:
+                continue
+            task_id, progress, step = entry[0], entry[1], entry[2]
+            if self._published.get(slot) == (task_id, progress):
+                continue
+            self._published[slot] = (task_id, progress)
+            publish(PROGRESS_EVENT, task_id, progress=progress, step=step)
+
+    def flush(self, slots=None):
+        """將進度表中尚未寫入的變動合併寫入資料庫"""
+        with self._lock:
+            progress_updates = []
+            description_updates = []
+            changed = {}
+            for slot in (range(len(self.board.task_ids)) if slots is None else slots):
+                entry = self.board.snapshot(slot)
+                if entry is None or self._written.get(slot) == entry:
+                    continue
+                task_id, progress, step, rows_read, rows_total = entry
+                previous = self._written.get(slot)
+                if previous is not None and previous[0] != task_id:
+                    previous = None
+                if progress >= 0 and (previous is None or previous[1] != progress):
+                    progress_updates.append((progress, task_id))
+                if step >= 0 and rows_read >= 0 and (previous is None or previous[3] != rows_read):
+                    description_updates.append((format_rows_progress(rows_read, rows_total if rows_total >= 0 else None),
+                                                task_id, step))
+                changed[slot] = entry
+
+            if not changed:
+                return
+            if progress_updates or description_updates:
+                with self.db.transaction() as conn:
+                    conn.executemany("""
+                        UPDATE tasks SET progress = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?
+                    """, progress_updates)
+                    conn.executemany("""
+                        UPDATE task_steps SET description = ?
+                        WHERE task_id = ? AND order_num = ? AND status = 'processing'
+                    """, description_updates)
+            self._written.update(changed)
+
+        for task_id in dict.fromkeys(task_id for _, task_id, _ in description_updates):
+            publish(STEP_EVENT, task_id)
+
+    def flush_slot(self, slot):
+        """立即寫入一格的變動並清除該格（任務結束時呼叫）"""
+        if slot is None:
+            return
+        try:
+            self.flush([slot])
+        except Exception as e:
+            print(f"寫入任務進度時發生錯誤：{e}")
+        with self._lock:
+            self._written.pop(slot, None)
+            self._published.pop(slot, None)
+        self.board.clear(slot)
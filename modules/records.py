@@ -0,0 +1,82 @@
+import sys
+
+
+class Record:
+    """以 __slots__ 保存的資料列
+
+    列表畫面會同時保存大量資料列，使用 __slots__ 物件取代每列一個字典，
+    可以減少記憶體與配置次數，並以欄位名稱存取而不依賴查詢欄位的位置。
+    COLUMNS 為查詢回傳的欄位，EXTRA 為畫面計算後補上的欄位（預設為 None），
+    INTERNED 中的欄位（狀態等重複值）會被 intern，所有列共用同一個字串物件。
+    """
+
+    COLUMNS = ()
+    EXTRA = ()
+    INTERNED = ()
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for name in self.COLUMNS + self.EXTRA:
+            setattr(self, name, values.get(name))
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        """作為 cursor.row_factory 使用，將查詢結果直接建立為記錄"""
+        record = cls.__new__(cls)
+        for name in cls.EXTRA:
+            setattr(record, name, None)
+        for column, value in zip(cursor.description, row):
+            name = column[0]
+            if name in cls.INTERNED and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(record, name, value)
+        return record
+
+    @classmethod
+    def fetch_all(cls, conn, query, params=()):
+        """執行查詢並以記錄回傳所有結果（查詢欄位必須都在 COLUMNS 中）"""
+        cursor = conn.cursor()
+        cursor.row_factory = cls.row_factory
+        return cursor.execute(query, params).fetchall()
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.COLUMNS)
+        return f"{type(self).__name__}({values})"
+
+
+class TaskRecord(Record):
+    """任務列表的任務"""
+
+    COLUMNS = ('id', 'name', 'priority', 'status', 'progress', 'started_at', 'completed_at',
+               'file_name', 'config_name', 'total_steps', 'completed_steps')
+    # 目前步驟、預估剩餘秒數與預計完成時間
+    EXTRA = ('current_step', 'eta_seconds', 'estimated_completion')
+    INTERNED = ('priority', 'status')
+    __slots__ = COLUMNS + EXTRA
+
+
+class FileRecord(Record):
+    """文件列表的文件"""
+
+    COLUMNS = ('id', 'name', 'category', 'path', 'status', 'created_at', 'size_bytes')
+    # 格式化後的文件大小
+    EXTRA = ('size',)
+    INTERNED = ('category', 'status')
+    __slots__ = COLUMNS + EXTRA
+
+
+class ResultRecord(Record):
+    """結果列表的處理結果"""
+
+    COLUMNS = ('id', 'name', 'output_path', 'status', 'created_at', 'task_name', 'size_bytes', 'extension')
+    EXTRA = ('size',)
+    INTERNED = ('status', 'extension')
+    __slots__ = COLUMNS + EXTRA
+
+
+class ConnectionRecord(Record):
+    """數據連接"""
+
+    COLUMNS = ('id', 'name', 'type', 'server', 'port', 'database_name', 'username', 'status')
+    INTERNED = ('type', 'status')
+    __slots__ = COLUMNS
@@ -0,0 +1,64 @@
+from utils.db import DatabaseManager
+from modules.file_metadata import collect_file_metadata, save_metadata
+from modules.records import ResultRecord
+
+
+def collect_result_metadata(output_path):
+    """收集輸出文件的中繼資料，文件無法讀取時回傳 None"""
+    try:
+        return collect_file_metadata(output_path)
+    except OSError:
+        return None
+
+
+class ResultRepository:
+    """處理結果資料存取類"""
+
+    def __init__(self, db=None):
+        self.db = db or DatabaseManager()
+
+    def create_result(self, task_id, name, output_path, status='completed',
+                      user_id=None, description=None, cursor=None, metadata=None):
+        """新增處理結果並記錄輸出文件的中繼資料，回傳結果 ID
+
+        傳入 cursor 時在呼叫端的交易中寫入，否則自行開啟交易。
+        中繼資料（需計算整個文件的雜湊）一律在交易外收集：未傳入 cursor 時在開啟交易前
+        收集，傳入 cursor 時由呼叫端事先以 collect_result_metadata 取得後以 metadata 傳入。
+        """
+        if cursor is None:
+            if metadata is None:
+                metadata = collect_result_metadata(output_path)
+            with self.db.transaction() as conn:
+                return self._insert(conn.cursor(), task_id, name, output_path, status,
+                                    user_id, description, metadata)
+        return self._insert(cursor, task_id, name, output_path, status,
+                            user_id, description, metadata)
+
+    def _insert(self, cursor, task_id, name, output_path, status, user_id, description, metadata):
+        cursor.execute("""
+            INSERT INTO results (task_id, name, description, output_path, status, user_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (task_id, name, description, output_path, status, user_id))
+        result_id = cursor.lastrowid
+        if metadata:
+            save_metadata(cursor, 'results', result_id, metadata)
+        return result_id
+
+    def list_results(self, status=None):
+        """取得結果列表（含已記錄的文件大小與副檔名），回傳 ResultRecord 列表"""
+        query = """
+            SELECT r.id, r.name, r.output_path, r.status, r.created_at,
+                   t.name as task_name, r.size_bytes, r.extension
+            FROM results r
+            LEFT JOIN tasks t ON r.task_id = t.id
+        """
+        params = []
+
+        if status:
+            query += " WHERE r.status = ?"
+            params.append(status)
+
+        query += " ORDER BY r.created_at DESC"
+
+        with self.db.connection() as conn:
+            return ResultRecord.fetch_all(conn, query, params)
@@ -0,0 +1,302 @@
+import os
+import sys
+import time
+import marshal
+import shutil
+import hashlib
+import builtins
+import tempfile
+import threading
+import traceback
+import multiprocessing
+import importlib.util
+
+try:
+    import resource
+except ImportError:  # Windows 沒有 resource 模組，不限制 CPU 時間與記憶體，只能以逾時限制
+    resource = None
+
+from modules.cancellation import current_token, TaskCancelled, CANCEL_POLL_SECONDS
+
+# 編譯後的腳本位元組碼快取目錄
+SCRIPT_CACHE_DIR = os.path.join('data', 'cache', 'scripts')
+
+# 腳本在錯誤訊息與追蹤中顯示的檔名
+SCRIPT_FILENAME = "<自訂腳本>"
+
+# 預設限制：執行逾時（秒）、CPU 時間（秒）與子程序的記憶體上限（MB）
+DEFAULT_TIMEOUT = 300
+DEFAULT_CPU_SECONDS = 300
+DEFAULT_MEMORY_LIMIT_MB = 4096
+
+# 腳本可以匯入的模組與不能使用的內建函式：只用來避免誤用，不是安全限制，
+# 腳本仍可經由 pandas 等模組的屬性取得 os 等模組
+ALLOWED_MODULES = {
+    'math', 're', 'datetime', 'decimal', 'statistics', 'json', 'collections',
+    'itertools', 'functools', 'numpy', 'pandas',
+}
+
+BLOCKED_BUILTINS = {'open', 'exec', 'eval', 'compile', 'input', 'breakpoint', 'exit', 'quit', '__import__'}
+
+
+class ScriptError(Exception):
+    """自訂腳本錯誤（語法錯誤、執行錯誤、逾時或超過資源限制）"""
+
+
+def syntax_error_message(error):
+    return f"第 {error.lineno} 行語法錯誤: {error.msg}"
+
+
+def validate_script(source):
+    """檢查腳本語法，回傳錯誤訊息，沒有錯誤時回傳 None"""
+    if not source or not source.strip():
+        return None
+    try:
+        compile(source, SCRIPT_FILENAME, 'exec')
+    except SyntaxError as e:
+        return syntax_error_message(e)
+    return None
+
+
+def compile_script(source):
+    """編譯腳本並以位元組碼快取，回傳 (快取路徑, 腳本雜湊)
+
+    快取鍵包含 Python 版本標籤，同一份腳本（即同一版本的配置）只會編譯一次。
+    """
+    digest = hashlib.sha256(f"{sys.implementation.cache_tag}\0{source}".encode('utf-8')).hexdigest()
+    path = os.path.abspath(os.path.join(SCRIPT_CACHE_DIR, f"{digest}.bin"))
+    if os.path.exists(path):
+        return path, digest
+
+    try:
+        code = compile(source, SCRIPT_FILENAME, 'exec')
+    except SyntaxError as e:
+        raise ScriptError(syntax_error_message(e))
+
+    os.makedirs(SCRIPT_CACHE_DIR, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(importlib.util.MAGIC_NUMBER)
+        marshal.dump(code, f)
+    os.replace(temp_path, path)
+    return path, digest
+
+
+def load_compiled(path):
+    """讀取位元組碼快取，Python 版本不符時回傳 None"""
+    with open(path, 'rb') as f:
+        if f.read(len(importlib.util.MAGIC_NUMBER)) != importlib.util.MAGIC_NUMBER:
+            return None
+        return marshal.load(f)
+
+
+def write_arrow(frame, path):
+    """以未壓縮的 Arrow IPC 檔案寫入 DataFrame"""
+    import pyarrow as pa
+
+    try:
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+        raise ScriptError(f"資料無法轉換為 Arrow 格式: {e}")
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def read_arrow(path):
+    """以記憶體映射讀取 Arrow IPC 檔案"""
+    import pyarrow as pa
+
+    with pa.memory_map(path, 'r') as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+class ScriptSandbox:
+    """在常駐子程序中執行自訂腳本
+
+    子程序以 multiprocessing 的 spawn 方式啟動（打包後的執行檔由 freeze_support 處理，
+    不會重新開啟主程式），啟動後持續接收請求（保持暖機，pandas 等模組只匯入一次）。
+    請求與回覆經由管道傳送，每個請求的資料以 Arrow IPC 檔案傳遞並以記憶體映射讀取，不經過 pickle。
+    子程序有記憶體上限，每次執行另有 CPU 時間上限與逾時；逾時或被系統終止時
+    子程序會被關閉，下一次執行時重新啟動。
+    同一個沙箱一次只執行一個腳本。
+
+    沙箱只提供程序隔離與逾時：腳本當機、無窮迴圈或用盡記憶體不會影響工作程序，
+    但不是安全邊界。腳本以與本程式相同的使用者權限執行，匯入與內建函式的限制
+    可以繞過，只應執行可信任使用者撰寫的腳本。Windows 上沒有 CPU 時間與記憶體上限，
+    只有逾時。
+    """
+
+    def __init__(self, memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB):
+        self.memory_limit_mb = memory_limit_mb
+        self.process = None
+        self.connection = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        context = multiprocessing.get_context('spawn')
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=serve, args=(child_connection, self.memory_limit_mb or 0),
+                                       name="script-sandbox", daemon=True)
+        self.process.start()
+        child_connection.close()
+
+    def stop(self):
+        """關閉子程序"""
+        if self.process is None:
+            return
+        try:
+            self.process.kill()
+            self.process.join()
+        except OSError:
+            pass
+        self.connection.close()
+        self.process = None
+        self.connection = None
+
+    def wait_response(self, timeout):
+        """等待子程序回覆，子程序結束時回傳 None；逾時或任務被停止時終止子程序"""
+        token = current_token()
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.connection.poll(CANCEL_POLL_SECONDS):
+                try:
+                    return self.connection.recv()
+                except EOFError:
+                    return None
+            if not self.process.is_alive() and not self.connection.poll():
+                return None
+            if token is not None and token.cancelled:
+                self.stop()
+                raise TaskCancelled()
+            if time.monotonic() >= deadline:
+                self.stop()
+                raise ScriptError(f"自訂腳本執行超過 {timeout} 秒，已終止")
+
+    def run(self, source, frame, params=None, timeout=DEFAULT_TIMEOUT, cpu_seconds=DEFAULT_CPU_SECONDS):
+        """以腳本處理 DataFrame 並回傳結果"""
+        code_path, digest = compile_script(source)
+
+        with self.lock:
+            if self.process is None or not self.process.is_alive():
+                if self.process is not None:
+                    self.stop()
+                self.start()
+
+            work_dir = tempfile.mkdtemp(prefix='script-')
+            try:
+                input_path = os.path.join(work_dir, 'input.arrow')
+                output_path = os.path.join(work_dir, 'output.arrow')
+                write_arrow(frame, input_path)
+
+                request = {
+                    'code': code_path, 'digest': digest, 'input': input_path, 'output': output_path,
+                    'params': params or {}, 'cpu_seconds': cpu_seconds,
+                }
+                try:
+                    self.connection.send(request)
+                    response = self.wait_response(timeout)
+                except OSError:
+                    response = None
+
+                if response is None:
+                    self.process.join()
+                    returncode = self.process.exitcode
+                    self.stop()
+                    raise ScriptError(f"自訂腳本程序意外結束（超過 CPU 時間或記憶體限制，代碼 {returncode}）")
+
+                if response.get('error'):
+                    raise ScriptError(response['error'])
+                return read_arrow(output_path)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+
+_sandbox = None
+_sandbox_lock = threading.Lock()
+
+
+def get_sandbox():
+    """取得目前程序共用的沙箱（每個工作程序各有一個常駐子程序）"""
+    global _sandbox
+    with _sandbox_lock:
+        if _sandbox is None:
+            _sandbox = ScriptSandbox()
+        return _sandbox
+
+
+# ---- 以下在沙箱子程序中執行 ----
+
+def safe_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name.split('.')[0] not in ALLOWED_MODULES:
+        raise ImportError(f"自訂腳本不能匯入模組: {name}")
+    return builtins.__import__(name, globals, locals, fromlist, level)
+
+
+def script_globals(frame, params):
+    """建立腳本的執行環境：df 為輸入資料，params 為配置中的參數"""
+    import numpy as np
+    import pandas as pd
+
+    safe_builtins = {name: value for name, value in vars(builtins).items() if name not in BLOCKED_BUILTINS}
+    safe_builtins['__import__'] = safe_import
+    return {'__builtins__': safe_builtins, '__name__': '__script__',
+            'df': frame, 'params': params, 'pd': pd, 'np': np}
+
+
+def script_error_message(error):
+    """取得腳本錯誤訊息，並標示出錯的腳本行號"""
+    lines = [frame.lineno for frame in traceback.extract_tb(error.__traceback__)
+             if frame.filename == SCRIPT_FILENAME]
+    prefix = f"第 {lines[-1]} 行: " if lines else ""
+    return f"{prefix}{type(error).__name__}: {error}"
+
+
+def limit_cpu(seconds):
+    """設定本次執行可以再使用的 CPU 時間（CPU 上限以程序累計時間計算）"""
+    if resource is None or not seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime + seconds) + 1
+    hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def serve(connection, memory_limit_mb):
+    """子程序主迴圈：從管道接收請求並回覆，管道關閉時結束"""
+    if resource is not None and memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    codes = {}
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            break
+        try:
+            limit_cpu(request.get('cpu_seconds'))
+            code = codes.get(request['digest'])
+            if code is None:
+                code = load_compiled(request['code'])
+                if code is None:
+                    raise ScriptError("腳本快取的 Python 版本不符")
+                codes[request['digest']] = code
+
+            namespace = script_globals(read_arrow(request['input']), request.get('params') or {})
+            exec(code, namespace)
+            result = namespace.get('df')
+            if not isinstance(result, namespace['pd'].DataFrame):
+                raise ScriptError("自訂腳本執行後 df 必須是 DataFrame")
+            write_arrow(result, request['output'])
+            response = {'rows': len(result)}
+        except MemoryError:
+            response = {'error': "自訂腳本超過記憶體限制"}
+        except ScriptError as e:
+            response = {'error': str(e)}
+        except Exception as e:
+            response = {'error': script_error_message(e)}
+
+        connection.send(response)
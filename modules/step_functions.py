@@ -0,0 +1,380 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from modules.cancellation import raise_if_cancelled
+from modules.expressions import evaluate, validate_expression
+from modules.script_sandbox import validate_script, DEFAULT_TIMEOUT, DEFAULT_CPU_SECONDS
+
+# 步驟函式註冊表：function 名稱 -> handler(frame, params) -> frame
+STEP_HANDLERS = {}
+
+# 步驟函式的參數宣告：function 名稱 -> {'required': 必填參數, 'file_params': 指向文件路徑的參數,
+#                                       'expression_params': 運算式參數, 'script_params': 腳本參數}
+STEP_SPECS = {}
+
+# 可分段處理的步驟每段的列數，段與段之間檢查任務是否已被停止
+STEP_CHUNK_ROWS = 500000
+
+class StepParameterError(Exception):
+    """步驟參數錯誤"""
+
+
+def register_step(name, required=(), file_params=(), expression_params=(), script_params=()):
+    """註冊步驟函式的裝飾器
+
+    required 為步驟 JSON 的 params 中必須提供的參數；file_params 為內容會影響
+    輸出的文件路徑參數（步驟快取鍵會納入這些文件的內容雜湊）；
+    expression_params 與 script_params 為運算式與 Python 腳本參數，保存配置時會檢查語法。
+    輸入的 DataFrame 可能直接引用欄式快取的唯讀記憶體，步驟函式要修改資料時須先 copy()。
+    步驟函式應在各段/各欄之間呼叫 raise_if_cancelled()；以單一 pandas 呼叫完成的運算
+    （分組彙總、樞紐分析、合併、去重複）無法中途中斷，停止任務時須等該呼叫結束。
+    """
+    def decorator(func):
+        STEP_HANDLERS[name] = func
+        STEP_SPECS[name] = {
+            'required': tuple(required),
+            'file_params': tuple(file_params),
+            'expression_params': tuple(expression_params),
+            'script_params': tuple(script_params),
+        }
+        return func
+    return decorator
+
+
+def validate_step(step):
+    """檢查步驟的函式與參數，回傳錯誤訊息列表"""
+    function_name = step.get('function') or ""
+    if function_name not in STEP_HANDLERS:
+        return [f"步驟「{step.get('name', '')}」使用了未知的函式: {function_name}"]
+
+    params = step.get('params') or {}
+    if not isinstance(params, dict):
+        return [f"步驟「{step.get('name', '')}」的參數必須是物件"]
+    missing = [name for name in STEP_SPECS[function_name]['required'] if name not in params]
+    if missing:
+        return [f"步驟「{step.get('name', '')}」缺少參數: {', '.join(missing)}"]
+
+    errors = []
+    if function_name == "join" and 'path' not in params and 'dataset' not in params:
+        errors.append(f"步驟「{step.get('name', '')}」缺少參數: path 或 dataset")
+    for name in STEP_SPECS[function_name]['expression_params']:
+        error = validate_expression(params[name]) if name in params else None
+        if error:
+            errors.append(f"步驟「{step.get('name', '')}」的運算式錯誤: {error}")
+    for name in STEP_SPECS[function_name]['script_params']:
+        error = validate_script(params[name]) if name in params else None
+        if error:
+            errors.append(f"步驟「{step.get('name', '')}」的腳本{error}")
+    return errors
+
+
+def as_list(value):
+    """將單一欄位名稱或欄位列表統一為列表"""
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+def require_columns(frame, columns):
+    """確認欄位存在"""
+    missing = [column for column in columns if column not in frame.columns]
+    if missing:
+        raise StepParameterError(f"找不到欄位: {', '.join(map(str, missing))}")
+
+
+def iter_chunks(series):
+    """以 STEP_CHUNK_ROWS 列為一段取出資料（空資料仍回傳一段），每段之前檢查任務是否已被停止"""
+    for start in range(0, max(len(series), 1), STEP_CHUNK_ROWS):
+        raise_if_cancelled()
+        yield series.iloc[start:start + STEP_CHUNK_ROWS]
+
+
+@register_step("")
+def passthrough_step(frame, params):
+    """未指定函式的步驟，不改變資料"""
+    return frame
+
+
+def condition_mask(frame, condition):
+    """將單一條件 {"column", "op", "value"} 轉換為布林遮罩"""
+    column = condition.get('column')
+    op = condition.get('op', '==')
+    value = condition.get('value')
+    require_columns(frame, [column])
+    series = frame[column]
+
+    if op == '==':
+        return series == value
+    if op == '!=':
+        return series != value
+    if op == '>':
+        return series > value
+    if op == '>=':
+        return series >= value
+    if op == '<':
+        return series < value
+    if op == '<=':
+        return series <= value
+    if op == 'in':
+        return series.isin(as_list(value))
+    if op == 'not_in':
+        return ~series.isin(as_list(value))
+    if op == 'contains':
+        return series.astype(str).str.contains(str(value), regex=False, na=False)
+    if op == 'isnull':
+        return series.isna()
+    if op == 'notnull':
+        return series.notna()
+    raise StepParameterError(f"不支援的篩選運算: {op}")
+
+
+@register_step("filter", required=('conditions',))
+def filter_rows(frame, params):
+    """依條件篩選資料列
+
+    params: {"conditions": [{"column", "op", "value"}, ...], "mode": "all" | "any"}
+    """
+    conditions = params['conditions']
+    if isinstance(conditions, dict):
+        conditions = [conditions]
+    if not conditions:
+        return frame
+
+    masks = []
+    for condition in conditions:
+        raise_if_cancelled()
+        masks.append(condition_mask(frame, condition))
+    combined = np.logical_or.reduce(masks) if params.get('mode') == 'any' else np.logical_and.reduce(masks)
+    return frame[np.asarray(combined, dtype=bool)].reset_index(drop=True)
+
+
+@register_step("query", required=('expression',), expression_params=('expression',))
+def query(frame, params):
+    """以運算式篩選資料列
+
+    params: {"expression": 例如 "abs(amount) > 1e6 & account startswith '4'"}
+    """
+    mask = evaluate(params['expression'], frame)
+    return frame[np.asarray(mask, dtype=bool)].reset_index(drop=True)
+
+
+@register_step("derive", required=('column', 'expression'), expression_params=('expression',))
+def derive(frame, params):
+    """以運算式計算衍生欄位
+
+    params: {"column": 輸出欄位, "expression": 例如 "debit - credit"}
+    """
+    values = evaluate(params['expression'], frame)
+    frame = frame.copy()
+    frame[params['column']] = values
+    return frame
+
+
+def code_strings(series):
+    """將科目代碼欄位轉為字串供對照（對照表的鍵在 JSON 中一定是字串）
+
+    含空值的整數代碼會被讀成浮點數，轉換時去除多餘的 ".0"。是否為整數代碼以整欄判斷，
+    之後分段轉換，段與段之間檢查任務是否已被停止。
+    """
+    integral = series.dtype.kind == 'f' and (series.dropna() % 1 == 0).all()
+    return pd.concat([chunk.astype('Int64').astype(str) if integral else chunk.astype(str)
+                      for chunk in iter_chunks(series)])
+
+
+@register_step("map_accounts", required=('column', 'mapping'))
+def map_accounts(frame, params):
+    """依對照表轉換科目代碼
+
+    params: {"column", "mapping": {原代碼: 新代碼}, "target": 輸出欄位（預設覆寫原欄位）,
+             "default": 對照表沒有的代碼使用的值（預設保留原值）}
+    """
+    column = params['column']
+    require_columns(frame, [column])
+    source = frame[column]
+    keys = code_strings(source)
+    mapping = {str(key): value for key, value in params['mapping'].items()}
+    mapped = pd.concat([chunk.map(mapping) for chunk in iter_chunks(keys)])
+
+    fallback = params['default'] if 'default' in params else source
+    frame = frame.copy()
+    frame[params.get('target') or column] = mapped.where(mapped.notna(), fallback)
+    return frame
+
+
+@register_step("fill_missing")
+def fill_missing(frame, params):
+    """填補空值
+
+    params: {"columns": 欄位列表（預設全部）, "value": 填補值或 {欄位: 值}, "method": "ffill" | "bfill"}
+    """
+    columns = as_list(params.get('columns')) or list(frame.columns)
+    require_columns(frame, columns)
+    frame = frame.copy()
+
+    method = params.get('method')
+    if method not in (None, '', 'ffill', 'bfill'):
+        raise StepParameterError(f"不支援的填補方式: {method}")
+    value = params.get('value')
+
+    # 逐欄填補，欄與欄之間檢查任務是否已被停止
+    for column in columns:
+        raise_if_cancelled()
+        if method == 'ffill':
+            frame[column] = frame[column].ffill()
+        elif method == 'bfill':
+            frame[column] = frame[column].bfill()
+        fill = value.get(column) if isinstance(value, dict) else value
+        if fill is not None:
+            frame[column] = frame[column].fillna(fill)
+    return frame
+
+
+@register_step("dedupe")
+def dedupe(frame, params):
+    """移除重複資料列
+
+    params: {"columns": 判斷重複的欄位（預設全部）, "keep": "first" | "last"}
+    """
+    columns = as_list(params.get('columns')) or None
+    if columns:
+        require_columns(frame, columns)
+    keep = params.get('keep', 'first')
+    if keep not in ('first', 'last'):
+        raise StepParameterError(f"不支援的保留方式: {keep}")
+    raise_if_cancelled()
+    return frame.drop_duplicates(subset=columns, keep=keep).reset_index(drop=True)
+
+
+def flatten_columns(frame):
+    """將多層欄位名稱攤平為「欄位_彙總」"""
+    if getattr(frame.columns, 'nlevels', 1) > 1:
+        frame.columns = ["_".join(str(part) for part in column if part != "") for column in frame.columns]
+    return frame
+
+
+@register_step("groupby_aggregate", required=('by', 'aggregations'))
+def groupby_aggregate(frame, params):
+    """分組彙總
+
+    params: {"by": 分組欄位, "aggregations": {欄位: "sum" | ["sum", "count"], ...}}
+    """
+    by = as_list(params['by'])
+    aggregations = params['aggregations']
+    require_columns(frame, by + list(aggregations))
+    raise_if_cancelled()
+    result = frame.groupby(by, dropna=False, sort=True).agg(aggregations)
+    return flatten_columns(result).reset_index()
+
+
+@register_step("pivot", required=('index', 'columns', 'values'))
+def pivot(frame, params):
+    """樞紐分析
+
+    params: {"index", "columns", "values", "aggfunc": 預設 "sum", "fill_value": 預設 0}
+    """
+    index = as_list(params['index'])
+    columns = as_list(params['columns'])
+    values = as_list(params['values'])
+    require_columns(frame, index + columns + values)
+    raise_if_cancelled()
+    result = frame.pivot_table(index=index, columns=columns, values=values,
+                               aggfunc=params.get('aggfunc', 'sum'),
+                               fill_value=params.get('fill_value', 0), observed=True)
+    if len(values) == 1 and getattr(result.columns, 'nlevels', 1) > 1:
+        result.columns = result.columns.droplevel(0)
+    result = flatten_columns(result).reset_index()
+    result.columns = [str(column) for column in result.columns]
+    return result
+
+
+def load_lookup_table(path, sheet=None):
+    """讀取合併用的對照文件（有欄式快取時直接使用）"""
+    from modules.excel_ingest import read_batches
+    from modules.columnar_cache import ColumnarCache, current_content_hash, sheet_cache_key
+
+    if not os.path.exists(path):
+        raise StepParameterError(f"找不到合併文件: {path}")
+
+    cache = ColumnarCache()
+    cache_key = sheet_cache_key(current_content_hash(path), sheet)
+    frame = cache.load(cache_key)
+    if frame is None:
+        frame = read_batches(path, sheet)
+        cache.store(cache_key, frame)
+    return frame
+
+
+@register_step("join", file_params=('path',))
+def join(frame, params):
+    """與另一個文件或同一任務中的另一個資料集合併
+
+    params: {"path": 文件路徑, "sheet": 工作表, 或 "dataset": 步驟的其他輸入資料集名稱,
+             "on" 或 "left_on"/"right_on": 合併欄位,
+             "how": "left" | "inner" | "right" | "outer", "suffix": 右側重複欄位的後綴}
+    """
+    if 'dataset' in params:
+        datasets = params.get('datasets') or {}
+        if params['dataset'] not in datasets:
+            raise StepParameterError(f"資料集 {params['dataset']} 必須列在步驟的 inputs 中")
+        other = datasets[params['dataset']]
+    elif 'path' in params:
+        other = load_lookup_table(params['path'], params.get('sheet'))
+    else:
+        raise StepParameterError("合併步驟需要 path 或 dataset 參數")
+    how = params.get('how', 'left')
+    if how not in ('left', 'inner', 'right', 'outer'):
+        raise StepParameterError(f"不支援的合併方式: {how}")
+
+    if 'on' in params:
+        left_on = right_on = as_list(params['on'])
+    else:
+        left_on = as_list(params.get('left_on'))
+        right_on = as_list(params.get('right_on'))
+    if not left_on or len(left_on) != len(right_on):
+        raise StepParameterError("合併欄位設定錯誤")
+    require_columns(frame, left_on)
+    require_columns(other, right_on)
+
+    raise_if_cancelled()
+    return frame.merge(other, how=how, left_on=left_on, right_on=right_on,
+                       suffixes=("", params.get('suffix', "_right")))
+
+
+@register_step("round_cents")
+def round_cents(frame, params):
+    """金額四捨五入（預設到小數第 2 位，0.5 一律進位而非銀行家捨入）
+
+    params: {"columns": 欄位列表（預設所有浮點數欄位）, "decimals": 預設 2}
+    """
+    columns = as_list(params.get('columns')) or list(frame.select_dtypes(include='floating').columns)
+    require_columns(frame, columns)
+    factor = 10 ** int(params.get('decimals', 2))
+
+    frame = frame.copy()
+    for column in columns:
+        raise_if_cancelled()
+        values = frame[column].to_numpy(dtype='float64', na_value=np.nan)
+        # 先去除浮點誤差（例如 1.005 * 100 = 100.49999...）再以絕對值進位
+        scaled = np.round(np.abs(values) * factor, 6)
+        frame[column] = np.sign(values) * np.floor(scaled + 0.5) / factor
+    return frame
+
+
+@register_step("script", required=('source',), script_params=('source',))
+def run_script(frame, params):
+    """在沙箱子程序中執行自訂 Python 腳本
+
+    腳本以 df 取得輸入資料、以 params 取得參數，執行後 df 即為輸出。
+    沙箱只隔離程序並限制執行時間，不是安全邊界（見 ScriptSandbox）。
+    params: {"source": 腳本內容, "params": 傳給腳本的參數,
+             "timeout": 逾時秒數, "cpu_seconds": CPU 時間上限}
+    """
+    from modules.script_sandbox import get_sandbox
+
+    return get_sandbox().run(params['source'], frame, params.get('params'),
+                             timeout=params.get('timeout', DEFAULT_TIMEOUT),
+                             cpu_seconds=params.get('cpu_seconds', DEFAULT_CPU_SECONDS))
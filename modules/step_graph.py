@@ -0,0 +1,122 @@
+from collections import deque
+
+# 輸入文件（處理配置指定的工作表）的資料集名稱
+INPUT_DATASET = "input"
+
+# 輸入文件其他工作表的資料集名稱前綴，例如 "sheet:應付帳款"
+SHEET_PREFIX = "sheet:"
+
+
+class StepGraphError(ValueError):
+    """步驟相依關係錯誤（輸出名稱重複、引用不存在的資料集或循環相依）"""
+
+
+def as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+def is_source(name):
+    """資料集是否直接來自輸入文件"""
+    return name == INPUT_DATASET or name.startswith(SHEET_PREFIX)
+
+
+class StepNode:
+    """DAG 中的一個步驟"""
+
+    def __init__(self, order, step, inputs, output):
+        self.order = order
+        self.step = step
+        self.inputs = inputs
+        self.output = output
+
+    @property
+    def name(self):
+        return self.step.get('name') or f"步驟 {self.order}"
+
+
+class StepGraph:
+    """由處理配置步驟建立的有向無環圖
+
+    步驟可以在 JSON 中以 "inputs" 指定輸入資料集、以 "output" 命名輸出資料集；
+    未指定 inputs 的步驟使用前一個步驟的輸出（第一個步驟使用輸入文件），
+    因此沒有宣告相依關係的舊配置仍是依序執行的單一鏈。
+    """
+
+    def __init__(self, nodes, producers, topological):
+        self.nodes = nodes
+        self.producers = producers
+        self.topological = topological
+
+    def dependencies(self, node):
+        """取得節點相依的上游步驟"""
+        return [self.producers[name] for name in node.inputs if name in self.producers]
+
+    def consumers(self, name):
+        """取得使用指定資料集的步驟"""
+        return [node for node in self.nodes if name in node.inputs]
+
+    def sources(self):
+        """取得需要從輸入文件讀取的資料集"""
+        return sorted({name for node in self.nodes for name in node.inputs if is_source(name)})
+
+    def sinks(self):
+        """取得沒有被其他步驟使用的輸出資料集（依步驟順序）"""
+        consumed = {name for node in self.nodes for name in node.inputs}
+        return [node.output for node in self.nodes if node.output not in consumed]
+
+
+def build_step_graph(steps):
+    """依步驟定義建立 StepGraph，相依關係有誤時拋出 StepGraphError"""
+    nodes = []
+    producers = {}
+    previous = INPUT_DATASET
+
+    for i, step in enumerate(sorted(steps, key=lambda step: step.get('order', 0)), 1):
+        order = step.get('order', i)
+        output = step.get('output') or f"step{order}"
+        if is_source(output):
+            raise StepGraphError(f"步驟「{step.get('name', order)}」的輸出名稱 {output} 為保留名稱")
+        if output in producers:
+            raise StepGraphError(f"輸出名稱 {output} 重複（步驟「{producers[output].name}」與「{step.get('name', order)}」）")
+
+        node = StepNode(order, step, as_list(step.get('inputs')) or [previous], output)
+        nodes.append(node)
+        producers[output] = node
+        previous = output
+
+    for node in nodes:
+        for name in node.inputs:
+            if name not in producers and not is_source(name):
+                raise StepGraphError(f"步驟「{node.name}」引用了不存在的資料集: {name}")
+
+    # Kahn 演算法：無法排序的節點代表有循環相依
+    indegree = {node.output: len(set(node.inputs) & set(producers)) for node in nodes}
+    queue = deque(node for node in nodes if indegree[node.output] == 0)
+    topological = []
+    while queue:
+        node = queue.popleft()
+        topological.append(node)
+        for consumer in nodes:
+            if node.output in consumer.inputs:
+                indegree[consumer.output] -= 1
+                if indegree[consumer.output] == 0:
+                    queue.append(consumer)
+
+    if len(topological) < len(nodes):
+        cycle = [node.name for node in nodes if indegree[node.output] > 0]
+        raise StepGraphError(f"步驟之間有循環相依: {', '.join(cycle)}")
+
+    return StepGraph(nodes, producers, topological)
+
+
+def validate_step_graph(steps):
+    """檢查步驟相依關係，回傳錯誤訊息列表"""
+    try:
+        build_step_graph(steps)
+    except StepGraphError as e:
+        return [str(e)]
+    return []
@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+import cProfile
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows 沒有 resource 模組，不記錄峰值 RSS
+    resource = None
+
+# cProfile 分析檔目錄
+PROFILE_DIR = os.path.join('data', 'profiles')
+
+# 步驟耗時達到此秒數時才保存分析檔
+DEFAULT_PROFILE_MIN_SECONDS = 10
+
+
+def peak_rss_bytes():
+    """取得目前程序的峰值常駐記憶體（位元組）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 為單位，macOS 以位元組為單位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StepMetrics:
+    """單一步驟的效能量測結果（未量測的項目為 None）"""
+
+    FIELDS = ('wall_ms', 'cpu_ms', 'peak_rss_bytes', 'tracemalloc_peak_bytes',
+              'rows_in', 'rows_out', 'bytes_read', 'bytes_written', 'profile_path')
+
+    def __init__(self):
+        for field in self.FIELDS:
+            setattr(self, field, None)
+
+    def values(self):
+        return tuple(getattr(self, field) for field in self.FIELDS)
+
+
+class StepProfiler:
+    """量測步驟的耗時與資源使用
+
+    牆鐘時間與 CPU 時間（執行步驟的執行緒）一律記錄。啟用分析時另外以 tracemalloc
+    記錄 Python 配置的峰值記憶體，並以 cProfile 分析步驟；耗時達到 min_seconds 的步驟
+    會將分析檔保存為 {prefix}_step_{順序}.prof，可以用 pstats 或 snakeviz 檢視。
+    tracemalloc 的峰值是整個程序共用的，啟用分析時步驟必須依序執行。
+    """
+
+    def __init__(self, enabled=False, min_seconds=DEFAULT_PROFILE_MIN_SECONDS, prefix="task",
+                 profile_dir=PROFILE_DIR):
+        self.enabled = enabled
+        self.min_seconds = DEFAULT_PROFILE_MIN_SECONDS if min_seconds is None else min_seconds
+        self.prefix = prefix
+        self.profile_dir = profile_dir
+        self.started_tracing = False
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+
+    def measure(self, order_num, func, *args):
+        """執行 func(*args)，回傳 (結果, StepMetrics)"""
+        metrics = StepMetrics()
+        profiler = cProfile.Profile() if self.enabled else None
+        if self.enabled:
+            tracemalloc.reset_peak()
+
+        wall_started = time.perf_counter()
+        cpu_started = time.thread_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            result = func(*args)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            wall = time.perf_counter() - wall_started
+            metrics.wall_ms = wall * 1000
+            metrics.cpu_ms = (time.thread_time() - cpu_started) * 1000
+            metrics.peak_rss_bytes = peak_rss_bytes()
+            if self.enabled:
+                metrics.tracemalloc_peak_bytes = tracemalloc.get_traced_memory()[1]
+
+        if profiler is not None and wall >= self.min_seconds:
+            metrics.profile_path = self.save_profile(profiler, order_num)
+        return result, metrics
+
+    def save_profile(self, profiler, order_num):
+        """保存 cProfile 分析檔，回傳路徑（失敗時回傳 None）"""
+        path = os.path.join(self.profile_dir, f"{self.prefix}_step_{order_num}.prof")
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profiler.dump_stats(path)
+        except OSError as e:
+            print(f"保存效能分析檔時發生錯誤：{e}")
+            return None
+        return path
+
+    def close(self):
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
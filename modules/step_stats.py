@@ -0,0 +1,178 @@
+import time
+
+from utils.db import DatabaseManager
+
+# 每個步驟保留的最近執行樣本數（滾動視窗）
+STATS_WINDOW = 50
+
+# IN 查詢每次最多帶入的參數數（SQLite 預設上限為 999）
+SQL_CHUNK_SIZE = 500
+
+
+def percentile(values, fraction):
+    """以線性內插計算百分位數"""
+    values = sorted(values)
+    if not values:
+        return None
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def scaled_durations(samples, rows, size_bytes):
+    """將歷史耗時依輸入列數與大小的比例換算為本次輸入的耗時
+
+    樣本與本次輸入都有列數或大小時，以兩者比例的平均縮放；都沒有時直接使用原耗時。
+    """
+    durations = []
+    for seconds, sample_rows, sample_bytes in samples:
+        ratios = []
+        if rows and sample_rows:
+            ratios.append(rows / sample_rows)
+        if size_bytes and sample_bytes:
+            ratios.append(size_bytes / sample_bytes)
+        durations.append(seconds * (sum(ratios) / len(ratios) if ratios else 1))
+    return durations
+
+
+def format_eta(seconds):
+    """格式化預計剩餘時間"""
+    if seconds is None:
+        return "未知"
+    if seconds < 60:
+        return "不到 1 分鐘"
+    minutes = int(round(seconds / 60))
+    if minutes < 60:
+        return f"約 {minutes} 分鐘"
+    return f"約 {minutes // 60} 小時 {minutes % 60} 分鐘"
+
+
+class StepStatistics:
+    """步驟耗時統計
+
+    每次實際執行（非快取）的步驟都會記錄耗時與任務輸入文件的列數、大小，
+    每個「處理配置 + 步驟」只保留最近 STATS_WINDOW 筆。預估時將樣本依輸入規模
+    換算後取中位數與 P90；沒有同一配置的樣本時改用其他配置中同名步驟的樣本。
+    """
+
+    def __init__(self, db=None):
+        self.db = db or DatabaseManager()
+
+    def record(self, config_id, order_num, step_name, seconds, input_rows=None, input_bytes=None):
+        """記錄一次步驟執行，並刪除超出滾動視窗的舊樣本"""
+        with self.db.transaction() as conn:
+            conn.execute("""
+                INSERT INTO step_run_stats (config_id, order_num, step_name, seconds, input_rows, input_bytes)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (config_id, order_num, step_name, seconds, input_rows, input_bytes))
+            conn.execute("""
+                DELETE FROM step_run_stats
+                WHERE config_id IS ? AND order_num = ? AND step_name = ? AND id NOT IN (
+                    SELECT id FROM step_run_stats
+                    WHERE config_id IS ? AND order_num = ? AND step_name = ?
+                    ORDER BY id DESC LIMIT ?
+                )
+            """, (config_id, order_num, step_name, config_id, order_num, step_name, STATS_WINDOW))
+
+    def load_samples(self, conn, step_names):
+        """一次查詢多個步驟最近的執行樣本
+
+        回傳 ({(配置 ID, 順序, 步驟名稱): 樣本}, {步驟名稱: 樣本})，樣本為 [(秒數, 列數, 大小)]，
+        由新到舊各保留 STATS_WINDOW 筆。每個步驟的樣本數有上限，因此直接依名稱取出後在記憶體中分組。
+        """
+        by_step = {}
+        by_name = {}
+        names = list(step_names)
+        for start in range(0, len(names), SQL_CHUNK_SIZE):
+            chunk = names[start:start + SQL_CHUNK_SIZE]
+            rows = conn.execute(f"""
+                SELECT config_id, order_num, step_name, seconds, input_rows, input_bytes
+                FROM step_run_stats
+                WHERE step_name IN ({", ".join("?" * len(chunk))})
+                ORDER BY id DESC
+            """, chunk)
+            for config_id, order_num, step_name, seconds, input_rows, input_bytes in rows:
+                sample = (seconds, input_rows, input_bytes)
+                step_samples = by_step.setdefault((config_id, order_num, step_name), [])
+                if len(step_samples) < STATS_WINDOW:
+                    step_samples.append(sample)
+                name_samples = by_name.setdefault(step_name, [])
+                if len(name_samples) < STATS_WINDOW:
+                    name_samples.append(sample)
+        return by_step, by_name
+
+    def predict(self, samples, config_id, order_num, step_name, input_rows=None, input_bytes=None):
+        """以 load_samples 取得的樣本預估步驟耗時，回傳 (中位數, P90)，沒有樣本時回傳 None
+
+        沒有同一配置的樣本時改用其他配置中同名步驟的樣本。
+        """
+        by_step, by_name = samples
+        step_samples = by_step.get((config_id, order_num, step_name)) or by_name.get(step_name) or []
+        durations = scaled_durations(step_samples, input_rows, input_bytes)
+        if not durations:
+            return None
+        return percentile(durations, 0.5), percentile(durations, 0.9)
+
+    def estimate_remaining(self, task_id, now=None):
+        """預估任務剩餘秒數
+
+        加總尚未完成步驟的中位數耗時；執行中的步驟扣除已經過的時間，
+        超過中位數時改以 P90 估計。任何未完成步驟沒有樣本時回傳 None。
+        """
+        return self.estimate_remaining_many([task_id], now).get(task_id)
+
+    def estimate_remaining_many(self, task_ids, now=None):
+        """預估多個任務的剩餘秒數，回傳 {任務 ID: 秒數或 None}
+
+        無論任務數多少都只以固定次數的查詢取得任務、步驟與樣本，列表畫面一次計算一整頁。
+        """
+        task_ids = list(dict.fromkeys(task_ids))
+        if not task_ids:
+            return {}
+        now = now or time.time()
+        tasks = {}
+        steps = {}
+        with self.db.connection() as conn:
+            for start in range(0, len(task_ids), SQL_CHUNK_SIZE):
+                chunk = task_ids[start:start + SQL_CHUNK_SIZE]
+                placeholders = ", ".join("?" * len(chunk))
+                for row in conn.execute(f"""
+                    SELECT t.id, t.status, t.config_id, f.row_count, f.size_bytes
+                    FROM tasks t
+                    LEFT JOIN files f ON t.file_id = f.id
+                    WHERE t.id IN ({placeholders})
+                """, chunk):
+                    tasks[row[0]] = tuple(row[1:])
+                for row in conn.execute(f"""
+                    SELECT task_id, order_num, name, status, started_at FROM task_steps
+                    WHERE task_id IN ({placeholders}) ORDER BY task_id, order_num
+                """, chunk):
+                    steps.setdefault(row[0], []).append(tuple(row[1:]))
+
+            samples = self.load_samples(conn, {name for task_steps in steps.values()
+                                               for _, name, status, _ in task_steps
+                                               if status not in ('completed', 'failed')})
+
+        return {task_id: self._remaining(tasks.get(task_id), steps.get(task_id), samples, now)
+                for task_id in task_ids}
+
+    def _remaining(self, task, steps, samples, now):
+        if task is None or task[0] not in ('pending', 'processing') or not steps:
+            return None
+        _, config_id, row_count, size_bytes = task
+
+        remaining = 0.0
+        for order_num, name, status, started_at in steps:
+            if status in ('completed', 'failed'):
+                continue
+            prediction = self.predict(samples, config_id, order_num, name, row_count, size_bytes)
+            if prediction is None:
+                return None
+            median, p90 = prediction
+            if status == 'processing' and started_at:
+                elapsed = now - started_at
+                remaining += max((median if elapsed < median else p90) - elapsed, 0)
+            else:
+                remaining += median
+        return remaining
@@ -0,0 +1,1006 @@
+import os
+import json
+import time
+import hashlib
+import pickle
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from utils.db import DatabaseManager
+from modules.result_repository import ResultRepository, collect_result_metadata
+from modules.task_scheduler import TaskScheduler, PRIORITY_SQL
+from modules.task_queue import TaskQueue
+from modules.excel_ingest import read_batches, EXCEL_EXTENSIONS
+from modules.step_functions import STEP_HANDLERS, STEP_SPECS
+from modules.step_stats import StepStatistics
+from modules.step_profiler import StepProfiler
+from modules import cancellation, task_events, progress_board
+from modules.progress_board import (ProgressBoard, ProgressWriter, TaskProgress, worker_progress,
+                                    format_rows_progress)
+from modules.task_events import publish, EventForwarder, STATUS_EVENT, PROGRESS_EVENT, STEP_EVENT
+from modules.cancellation import (CancelFlags, TaskCancelToken, TaskCancelled, bind_token,
+                                  worker_token, request_cancellation, CANCEL_POLL_SECONDS)
+from modules.step_graph import build_step_graph, is_source, StepGraphError, INPUT_DATASET, SHEET_PREFIX
+from modules.columnar_cache import (ColumnarCache, current_content_hash, sheet_cache_key,
+                                    STEP_CACHE_DIR, STEP_CACHE_MAX_BYTES)
+
+# 引擎版本，步驟輸出格式或語意改變時需更新
+ENGINE_VERSION = "1"
+
+# 處理結果輸出目錄
+RESULTS_DIR = os.path.join('data', 'results')
+
+# 被搶占任務的中間結果目錄，恢復執行時從下一個步驟繼續
+CHECKPOINT_DIR = os.path.join('data', 'checkpoints')
+
+# Excel 單一工作表的列數上限（含標題列），超過時輸出改寫為 CSV
+EXCEL_MAX_ROWS = 1048576
+
+# 讀取輸入文件的步驟固定使用順序 0，處理配置的步驟從 1 開始
+INGEST_STEP_ORDER = 0
+
+# 單一任務內同時執行的步驟數與記憶體預算（可由處理配置的
+# max_parallel_steps 與 memory_budget_mb 覆蓋）
+DEFAULT_STEP_PARALLELISM = 4
+DEFAULT_MEMORY_BUDGET_MB = 1024
+
+
+class TaskExecutionError(Exception):
+    """任務執行失敗"""
+
+
+def read_input(path, sheet_name=None, batch_size=None, progress=None, total_rows=None, sink=None):
+    """以批次串流方式讀取輸入文件為 DataFrame（sink 見 read_batches）"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXCEL_EXTENSIONS and extension != '.csv':
+        raise TaskExecutionError(f"不支援的文件類型: {extension}")
+    return read_batches(path, sheet_name, batch_size, progress, total_rows, sink)
+
+
+def exceeds_sheet_limit(frame):
+    """資料列加上標題列是否超過 Excel 工作表的列數上限"""
+    return len(frame) + 1 > EXCEL_MAX_ROWS
+
+
+def write_output(frame, path):
+    """將處理結果寫入輸出文件，回傳實際寫入的路徑
+
+    超過 Excel 工作表列數上限時改寫為同名的 CSV 文件。
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not path.lower().endswith('.csv') and exceeds_sheet_limit(frame):
+        path = os.path.splitext(path)[0] + '.csv'
+    if path.lower().endswith('.csv'):
+        frame.to_csv(path, index=False)
+    else:
+        frame.to_excel(path, index=False)
+    return path
+
+
+def load_task_spec(db, task_id):
+    """載入任務、輸入文件與處理配置步驟"""
+    with db.connection() as conn:
+        task = conn.execute("""
+            SELECT t.id, t.name, t.user_id, t.file_id, t.config_id, t.cancel_requested,
+                   f.path AS file_path, f.name AS file_name, f.row_count AS file_rows,
+                   f.sha256 AS file_sha256, f.mtime AS file_mtime, f.size_bytes AS file_size,
+                   p.configuration
+            FROM tasks t
+            LEFT JOIN files f ON t.file_id = f.id
+            LEFT JOIN process_configs p ON t.config_id = p.id
+            WHERE t.id = ?
+        """, (task_id,)).fetchone()
+
+    if task is None:
+        raise TaskExecutionError(f"找不到任務 {task_id}")
+
+    config_data = {}
+    if task['configuration']:
+        try:
+            config_data = json.loads(task['configuration'])
+        except ValueError:
+            raise TaskExecutionError("處理配置格式錯誤")
+
+    spec = dict(task)
+    spec['steps'] = sorted(config_data.get('steps', []), key=lambda step: step.get('order', 0))
+    spec['script'] = config_data.get('script', '')
+    if spec['script'].strip():
+        # 自訂腳本作為最後一個步驟，處理前一個步驟的輸出
+        spec['steps'].append({
+            'order': max([step.get('order', 0) for step in spec['steps']], default=0) + 1,
+            'name': "自訂腳本",
+            'function': "script",
+            'params': {key: value for key, value in (
+                ('source', spec['script']),
+                ('params', config_data.get('script_params')),
+                ('timeout', config_data.get('script_timeout')),
+                ('cpu_seconds', config_data.get('script_cpu_seconds')),
+            ) if value is not None},
+        })
+    # 讀取設定：工作表名稱與每批讀取列數
+    spec['sheet'] = config_data.get('sheet')
+    spec['batch_size'] = config_data.get('batch_size')
+    # 步驟 DAG 設定：輸出資料集、同時執行的步驟數與記憶體預算
+    spec['outputs'] = config_data.get('outputs')
+    spec['max_parallel_steps'] = config_data.get('max_parallel_steps')
+    spec['memory_budget_mb'] = config_data.get('memory_budget_mb')
+    # 效能分析：保存 cProfile 分析檔的開關與最低耗時（秒）
+    spec['profile_steps'] = config_data.get('profile_steps')
+    spec['profile_min_seconds'] = config_data.get('profile_min_seconds')
+    return spec
+
+
+def ensure_task_steps(db, task_id, config_steps):
+    """使任務的 task_steps 與處理配置的步驟一致，回傳依順序排列的步驟列
+
+    順序與名稱都相符的步驟列保留（恢復被搶占的任務時保留已完成的狀態），
+    配置中已沒有的或名稱不符的步驟列刪除，缺少的步驟以等待中狀態新增。
+    """
+    expected = {}
+    for i, step in enumerate(config_steps or [], 1):
+        expected[step.get('order', i)] = (step.get('name', f"步驟 {i}"), step.get('description'))
+
+    with db.transaction() as conn:
+        rows = conn.execute("""
+            SELECT id, order_num, name FROM task_steps
+            WHERE task_id = ? AND order_num > ? ORDER BY order_num
+        """, (task_id, INGEST_STEP_ORDER)).fetchall()
+
+        kept = set()
+        stale = []
+        for row in rows:
+            step = expected.get(row['order_num'])
+            if step is None or step[0] != row['name'] or row['order_num'] in kept:
+                stale.append((row['id'],))
+            else:
+                kept.add(row['order_num'])
+        if stale:
+            conn.executemany("DELETE FROM task_steps WHERE id = ?", stale)
+
+        missing = [order for order in expected if order not in kept]
+        if missing:
+            db.bulk_insert('task_steps', (
+                (task_id, order, expected[order][0], expected[order][1], 'pending') for order in missing
+            ), columns=('task_id', 'order_num', 'name', 'description', 'status'), conn=conn)
+
+        if stale or missing:
+            rows = conn.execute("""
+                SELECT id, order_num, name FROM task_steps
+                WHERE task_id = ? AND order_num > ? ORDER BY order_num
+            """, (task_id, INGEST_STEP_ORDER)).fetchall()
+
+    return [dict(row) for row in rows]
+
+
+def ensure_ingest_step(db, task_id):
+    """確保任務有讀取輸入文件的步驟，回傳步驟 ID"""
+    with db.transaction() as conn:
+        row = conn.execute("""
+            SELECT id FROM task_steps WHERE task_id = ? AND order_num = ?
+        """, (task_id, INGEST_STEP_ORDER)).fetchone()
+        if row:
+            return row[0]
+        return conn.execute("""
+            INSERT INTO task_steps (task_id, order_num, name, status)
+            VALUES (?, ?, '讀取文件', 'pending')
+        """, (task_id, INGEST_STEP_ORDER)).lastrowid
+
+
+def update_step(db, step_id, status, duration=None, description=None, cache_hit=None, started_at=None,
+                metrics=None):
+    """更新步驟狀態、用時、說明、是否使用快取與開始時間（epoch 秒）
+
+    metrics 為 StepMetrics 時在同一交易中寫入效能量測欄位。
+    """
+    with db.transaction() as conn:
+        row = conn.execute("""
+            UPDATE task_steps
+            SET status = ?, duration = COALESCE(?, duration), description = COALESCE(?, description),
+                cache_hit = COALESCE(?, cache_hit), started_at = COALESCE(?, started_at)
+            WHERE id = ?
+            RETURNING task_id
+        """, (status, duration, description, cache_hit, started_at, step_id)).fetchone()
+        if metrics is not None:
+            conn.execute("""
+                UPDATE task_steps
+                SET wall_ms = ?, cpu_ms = ?, peak_rss_bytes = ?, tracemalloc_peak_bytes = ?,
+                    rows_in = ?, rows_out = ?, bytes_read = ?, bytes_written = ?, profile_path = ?
+                WHERE id = ?
+            """, metrics.values() + (step_id,))
+    if row is not None:
+        publish(STEP_EVENT, row[0], step_id=step_id, status=status)
+
+
+def ingest_input(db, task_id, spec, content_hash, sheet=None, cache=None, profiler=None, progress=None):
+    """讀取輸入文件的工作表（預設為處理配置指定的工作表），並將讀取進度寫入讀取步驟
+
+    同一內容的文件已轉換為欄式快取時直接以記憶體映射讀取，
+    否則以批次串流解析，每批直接寫入快取，讀取完成後再由快取讀回。
+    progress 為共享進度表的 TaskProgress 時，每批的讀取進度只寫入共享記憶體，
+    由引擎合併寫入資料庫；否則每批直接更新讀取步驟的說明。
+    """
+    sheet = sheet or spec.get('sheet')
+    step_id = ensure_ingest_step(db, task_id)
+    update_step(db, step_id, 'processing', cache_hit=0, started_at=time.time())
+    started = time.perf_counter()
+    profiler = profiler or StepProfiler()
+    progress = progress or TaskProgress()
+    if progress.active:
+        progress.set_step(INGEST_STEP_ORDER)
+
+    cache = cache or ColumnarCache()
+    cache_key = sheet_cache_key(content_hash, sheet)
+    frame, metrics = profiler.measure(INGEST_STEP_ORDER, cache.load, cache_key)
+    if frame is not None:
+        metrics.rows_out = len(frame)
+        metrics.bytes_read = file_size(cache.path_for(cache_key))
+        metrics.bytes_written = frame_nbytes(frame)
+        update_step(db, step_id, 'completed', format_duration(time.perf_counter() - started),
+                    f"由欄式快取載入 {len(frame):,} 列", cache_hit=1, metrics=metrics)
+        return frame
+
+    # 上傳時記錄的 row_count 包含標題列
+    total_rows = spec['file_rows'] - 1 if spec.get('file_rows') else None
+
+    def report(rows_read, batch_total):
+        if progress.active:
+            progress.set_rows(rows_read, batch_total or total_rows)
+        else:
+            update_step(db, step_id, 'processing', description=format_rows_progress(rows_read, batch_total or total_rows))
+
+    # 每批讀取後直接寫入欄式快取，讀取完成後由快取讀回，不在記憶體中同時保留所有批次與合併結果
+    writer = cache.batch_writer(cache_key)
+    try:
+        frame, metrics = profiler.measure(INGEST_STEP_ORDER, read_input, spec['file_path'], sheet,
+                                          spec.get('batch_size'), report, total_rows, writer)
+    except Exception as e:
+        if writer is not None:
+            writer.abort()
+        update_step(db, step_id, 'cancelled' if isinstance(e, TaskCancelled) else 'failed',
+                    format_duration(time.perf_counter() - started))
+        raise
+    metrics.rows_out = len(frame)
+    metrics.bytes_read = file_size(spec['file_path'])
+    metrics.bytes_written = frame_nbytes(frame)
+    update_step(db, step_id, 'completed', format_duration(time.perf_counter() - started),
+                format_rows_progress(len(frame), None), metrics=metrics)
+    return frame
+
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+def step_definition(step):
+    """步驟快取鍵中代表單一步驟的內容：函式、參數與參數所指文件的內容雜湊"""
+    function_name = step.get('function') or ""
+    params = step.get('params') or {}
+    file_params = STEP_SPECS.get(function_name, {}).get('file_params', ())
+    files = {name: current_content_hash(params[name]) for name in file_params if params.get(name)}
+    return {'function': function_name, 'params': params, 'files': files}
+
+
+def dataset_cache_keys(graph, content_hash, spec):
+    """計算每個資料集的快取鍵
+
+    來源工作表以「內容雜湊 + 工作表」為鍵；步驟輸出的鍵由步驟定義、各輸入資料集的鍵
+    與引擎版本組成，修改某個步驟只會使它與下游步驟的快取失效。
+    無法取得內容雜湊時回傳空字典（不使用快取）。
+    """
+    if not content_hash:
+        return {}
+
+    keys = {}
+    for name in graph.sources():
+        keys[name] = sheet_cache_key(content_hash, source_sheet(name, spec))
+    for node in graph.topological:
+        payload = json.dumps({
+            'step': step_definition(node.step),
+            'inputs': [keys[name] for name in node.inputs],
+            'engine': ENGINE_VERSION,
+        }, sort_keys=True, ensure_ascii=False, default=str)
+        keys[node.output] = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    return keys
+
+
+def source_sheet(name, spec):
+    """取得來源資料集對應的工作表名稱"""
+    if name.startswith(SHEET_PREFIX):
+        return name[len(SHEET_PREFIX):]
+    return spec.get('sheet')
+
+
+def update_progress(db, task_id, progress):
+    """更新任務進度"""
+    with db.transaction() as conn:
+        conn.execute("""
+            UPDATE tasks SET progress = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (progress, task_id))
+    publish(PROGRESS_EVENT, task_id, progress=progress)
+
+
+def finish_task(db, task_id, status, message=None, worker_id=None, result=None):
+    """將任務標記為完成、失敗或已停止，同步更新文件狀態並記錄日誌，回傳是否已更新
+
+    指定 worker_id 時，只有仍持有該任務租約的工作者能更新（租約過期後任務
+    可能已由其他工作者重新執行）。result 為 (名稱, 輸出路徑, 使用者 ID) 時，
+    結果記錄與任務狀態在同一交易中寫入；輸出文件的中繼資料在開啟交易前收集，
+    不在持有寫入鎖時計算雜湊。任務被停止時文件恢復為等待處理。
+    """
+    metadata = collect_result_metadata(result[1]) if result else None
+    with db.transaction() as conn:
+        updated = conn.execute("""
+            UPDATE tasks
+            SET status = ?, completed_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP,
+                progress = CASE WHEN ? = 'completed' THEN 100 ELSE progress END,
+                worker_id = NULL, lease_expires_at = NULL, cancel_requested = 0
+            WHERE id = ? AND (? IS NULL OR worker_id = ?)
+        """, (status, status, task_id, worker_id, worker_id)).rowcount
+        if not updated:
+            return False
+        if result:
+            name, output_path, user_id = result
+            ResultRepository(db).create_result(task_id, name, output_path, user_id=user_id,
+                                               cursor=conn.cursor(), metadata=metadata)
+        conn.execute("""
+            UPDATE files SET status = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = (SELECT file_id FROM tasks WHERE id = ?)
+        """, ('pending' if status == 'cancelled' else status, task_id))
+        if message:
+            conn.execute("""
+                INSERT INTO system_logs (level, message, user_id)
+                VALUES (?, ?, (SELECT user_id FROM tasks WHERE id = ?))
+            """, ('error' if status == 'failed' else 'info', message, task_id))
+    publish(STATUS_EVENT, task_id, status=status)
+    return True
+
+
+def preempt_requested(db, task_id):
+    """檢查排程器是否要求任務在步驟邊界讓出工作程序"""
+    with db.connection() as conn:
+        row = conn.execute("SELECT preempt_requested FROM tasks WHERE id = ?", (task_id,)).fetchone()
+    return bool(row and row[0])
+
+
+def requeue_task(db, task_id, worker_id=None):
+    """將被搶占的任務放回等待佇列（保留進度與已完成的步驟）"""
+    with db.transaction() as conn:
+        updated = conn.execute("""
+            UPDATE tasks
+            SET status = 'pending', preempt_requested = 0, updated_at = CURRENT_TIMESTAMP,
+                worker_id = NULL, lease_expires_at = NULL
+            WHERE id = ? AND (? IS NULL OR worker_id = ?)
+        """, (task_id, worker_id, worker_id)).rowcount
+    if updated:
+        publish(STATUS_EVENT, task_id, status='pending')
+
+
+def checkpoint_path(task_id):
+    return os.path.join(CHECKPOINT_DIR, f"task_{task_id}.pkl")
+
+
+def save_checkpoint(task_id, datasets, completed):
+    """保存被搶占任務的中間資料集與已完成的步驟（以輸出名稱表示）"""
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    path = checkpoint_path(task_id)
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump({'datasets': datasets, 'completed': sorted(completed)}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + '.tmp', path)
+
+
+def load_checkpoint(task_id):
+    """讀取任務的中間資料集，沒有時回傳 ({}, set())"""
+    path = checkpoint_path(task_id)
+    if not os.path.exists(path):
+        return {}, set()
+    try:
+        with open(path, 'rb') as f:
+            checkpoint = pickle.load(f)
+        return checkpoint['datasets'], set(checkpoint['completed'])
+    except Exception:
+        return {}, set()
+
+
+def remove_checkpoint(task_id):
+    try:
+        os.remove(checkpoint_path(task_id))
+    except OSError:
+        pass
+
+
+def format_duration(seconds):
+    """格式化步驟用時"""
+    if seconds < 60:
+        return f"{seconds:.1f}秒"
+    return f"{int(seconds // 60)}分{int(seconds % 60)}秒"
+
+
+def resolve_step(step):
+    """取得步驟對應的處理函式"""
+    function_name = (step or {}).get('function') or ""
+    handler = STEP_HANDLERS.get(function_name)
+    if handler is None:
+        raise TaskExecutionError(f"未知的步驟函式: {function_name}")
+    return handler
+
+
+def frame_nbytes(frame):
+    """估計 DataFrame 佔用的記憶體"""
+    try:
+        return int(frame.memory_usage(index=True, deep=False).sum())
+    except Exception:
+        return 0
+
+
+def write_outputs(frames, path):
+    """寫入輸出資料集，回傳實際寫入的路徑
+
+    只有一個時與 write_output 相同，多個時各寫入一個工作表；
+    任一資料集超過 Excel 工作表列數上限時，改為每個資料集一個 CSV 並打包為同名的 ZIP 文件。
+    """
+    if len(frames) == 1:
+        return write_output(next(iter(frames.values())), path)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if any(exceeds_sheet_limit(frame) for frame in frames.values()):
+        import io
+        import zipfile
+
+        path = os.path.splitext(path)[0] + '.zip'
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name, frame in frames.items():
+                with archive.open(f"{name}.csv", 'w') as entry:
+                    with io.TextIOWrapper(entry, encoding='utf-8', newline='') as text:
+                        frame.to_csv(text, index=False)
+        return path
+
+    import pandas as pd
+
+    with pd.ExcelWriter(path) as writer:
+        for name, frame in frames.items():
+            # Excel 工作表名稱最多 31 個字元
+            frame.to_excel(writer, sheet_name=str(name)[:31], index=False)
+    return path
+
+
+def run_step(node, frames, token=None):
+    """在執行緒中執行單一步驟；多個輸入時，其餘輸入以 params['datasets'] 傳入"""
+    params = node.step.get('params') or {}
+    if len(frames) > 1:
+        params = dict(params, datasets=dict(zip(node.inputs[1:], frames[1:])))
+    with bind_token(token):
+        if token is not None:
+            token.raise_if_cancelled()
+        return resolve_step(node.step)(frames[0], params)
+
+
+class StepRun:
+    """單一任務在工作程序中的步驟執行狀態
+
+    依步驟 DAG 決定需要執行的步驟：輸出已在步驟快取中的步驟直接載入，
+    其上游步驟若沒有其他用途則略過；其餘步驟在輸入就緒後交給執行緒池並行執行。
+    同時執行的步驟數受 max_parallel 限制，啟動新步驟前會估計輸入資料集的大小，
+    超過記憶體預算時等待執行中的步驟完成（至少保留一個步驟執行以免停滯）。
+    不再被任何待執行步驟使用的中間資料集會立即釋放。
+    """
+
+    def __init__(self, db, task_id, spec, worker_id=None, step_cache=None, token=None, progress=None):
+        self.db = db
+        self.task_id = task_id
+        self.spec = spec
+        self.worker_id = worker_id
+        self.token = token or TaskCancelToken()
+        self.progress = progress or TaskProgress()
+        self.step_cache = step_cache or ColumnarCache(STEP_CACHE_DIR, STEP_CACHE_MAX_BYTES)
+
+        try:
+            self.graph = build_step_graph(spec['steps'])
+        except StepGraphError as e:
+            raise TaskExecutionError(str(e))
+
+        self.step_rows = {row['order_num']: row for row in ensure_task_steps(db, task_id, spec['steps'])}
+        self.content_hash = current_content_hash(spec['file_path'], spec.get('file_sha256'),
+                                                 spec.get('file_mtime'), spec.get('file_size'))
+        self.keys = dataset_cache_keys(self.graph, self.content_hash, spec)
+        self.outputs = spec.get('outputs') or self.graph.sinks() or [INPUT_DATASET]
+        self.max_parallel = max(1, int(spec.get('max_parallel_steps') or DEFAULT_STEP_PARALLELISM))
+        self.memory_budget = int(float(spec.get('memory_budget_mb') or DEFAULT_MEMORY_BUDGET_MB) * 1024 * 1024)
+        # 啟用效能分析時依序執行步驟，tracemalloc 的峰值才能對應到單一步驟
+        self.profiler = StepProfiler(bool(spec.get('profile_steps')), spec.get('profile_min_seconds'),
+                                     prefix=f"task_{task_id}")
+        if self.profiler.enabled:
+            self.max_parallel = 1
+
+        self.datasets = {}
+        self.completed = set()
+        self.step_stats = StepStatistics(db)
+
+    def step_id(self, node):
+        return self.step_rows[node.order]['id']
+
+    def run(self):
+        """執行任務的所有步驟，回傳輸出資料集；被搶占時回傳 None"""
+        try:
+            self.datasets, self.completed = load_checkpoint(self.task_id)
+            needed = self.plan()
+            with bind_token(self.token):
+                self.load_sources(needed)
+
+            pending = [node for node in self.graph.topological
+                       if node.output in needed and node.output not in self.datasets
+                       and node.output not in self.completed]
+            if not self.execute(pending):
+                return None
+            return {name: self.datasets[name] for name in self.outputs}
+        finally:
+            self.profiler.close()
+
+    def plan(self):
+        """從輸出資料集往上游找出需要的資料集，並載入已快取的步驟輸出"""
+        for name in self.outputs:
+            if name not in self.graph.producers and not is_source(name):
+                raise TaskExecutionError(f"找不到輸出資料集: {name}")
+
+        needed = set()
+        stack = list(self.outputs)
+        while stack:
+            name = stack.pop()
+            if name in needed:
+                continue
+            needed.add(name)
+            if name in self.datasets or name not in self.graph.producers:
+                continue
+            node = self.graph.producers[name]
+            if node.output in self.completed:
+                continue
+
+            started = time.perf_counter()
+            frame = self.step_cache.load(self.keys.get(name))
+            if frame is not None:
+                self.datasets[name] = frame
+                update_step(self.db, self.step_id(node), 'completed',
+                            format_duration(time.perf_counter() - started), "快取命中", cache_hit=1)
+                continue
+            stack.extend(node.inputs)
+
+        # 輸出已由下游快取取代的步驟不需要執行
+        for node in self.graph.nodes:
+            if node.output not in needed and node.output not in self.completed:
+                update_step(self.db, self.step_id(node), 'completed', "0.0秒",
+                            "下游步驟已使用快取，略過", cache_hit=1)
+        return needed
+
+    def load_sources(self, needed):
+        """讀取需要的輸入工作表；全部由快取取代時略過讀取"""
+        sources = [name for name in self.graph.sources() + [INPUT_DATASET]
+                   if name in needed and name not in self.datasets]
+        if not sources:
+            update_step(self.db, ensure_ingest_step(self.db, self.task_id), 'completed', "0.0秒",
+                        "已使用步驟快取，略過讀取", cache_hit=1)
+            return
+        started = time.perf_counter()
+        for name in dict.fromkeys(sources):
+            self.datasets[name] = ingest_input(self.db, self.task_id, self.spec, self.content_hash,
+                                               source_sheet(name, self.spec), profiler=self.profiler,
+                                               progress=self.progress)
+        self.record_duration(INGEST_STEP_ORDER, "讀取文件", time.perf_counter() - started)
+
+    def report_progress(self, value):
+        """回報任務進度：有共享進度表時只寫入共享記憶體，否則直接寫入資料庫"""
+        if self.progress.active:
+            self.progress.set_progress(value)
+        else:
+            update_progress(self.db, self.task_id, value)
+
+    def record_duration(self, order_num, step_name, seconds):
+        """記錄實際執行的步驟耗時，供預估剩餘時間使用（記錄失敗不影響任務）"""
+        try:
+            self.step_stats.record(self.spec['config_id'], order_num, step_name, seconds,
+                                   self.spec.get('file_rows'), self.spec.get('file_size'))
+        except Exception as e:
+            print(f"記錄步驟耗時時發生錯誤：{e}")
+
+    def execute(self, pending):
+        """並行執行待執行的步驟，回傳是否全部完成（被搶占時回傳 False）"""
+        total = len(self.graph.nodes)
+        remaining_uses = {}
+        for node in pending:
+            for name in set(node.inputs):
+                remaining_uses[name] = remaining_uses.get(name, 0) + 1
+
+        live_bytes = sum(frame_nbytes(frame) for frame in self.datasets.values())
+        running = {}
+        failure = None
+        yielding = False
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix=f"task-{self.task_id}") as pool:
+            while pending or running:
+                # 啟動輸入已就緒的步驟
+                if failure is None and not yielding:
+                    for node in list(pending):
+                        if len(running) >= self.max_parallel:
+                            break
+                        if not all(name in self.datasets for name in node.inputs):
+                            continue
+                        estimate = sum(frame_nbytes(self.datasets[name]) for name in set(node.inputs))
+                        if running and live_bytes + estimate > self.memory_budget:
+                            continue
+                        pending.remove(node)
+                        live_bytes += estimate
+                        update_step(self.db, self.step_id(node), 'processing', cache_hit=0, started_at=time.time())
+                        if self.progress.active:
+                            self.progress.set_step(node.order)
+                        frames = [self.datasets[name] for name in node.inputs]
+                        future = pool.submit(self.profiler.measure, node.order, run_step, node, frames, self.token)
+                        running[future] = (node, estimate, sum(len(frame) for frame in frames), time.perf_counter())
+
+                if not running:
+                    if failure is None and not yielding and pending:
+                        raise TaskExecutionError("步驟的輸入資料集無法取得: " + ", ".join(node.name for node in pending))
+                    break
+
+                # 定時喚醒以檢查取消標記；執行中的步驟在下一個檢查點中斷（見 raise_if_cancelled）
+                done, _ = wait(running, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                if failure is None and self.token.cancelled:
+                    failure = TaskCancelled()
+                if not done:
+                    continue
+                for future in done:
+                    node, estimate, rows_in, started = running.pop(future)
+                    live_bytes -= estimate
+                    try:
+                        frame, metrics = future.result()
+                    except Exception as e:
+                        update_step(self.db, self.step_id(node), 'cancelled' if isinstance(e, TaskCancelled) else 'failed',
+                                    format_duration(time.perf_counter() - started))
+                        failure = failure or e
+                        continue
+
+                    metrics.rows_in = rows_in
+                    metrics.rows_out = len(frame)
+                    metrics.bytes_read = estimate
+                    metrics.bytes_written = frame_nbytes(frame)
+                    update_step(self.db, self.step_id(node), 'completed', format_duration(metrics.wall_ms / 1000),
+                                metrics=metrics)
+                    self.record_duration(node.order, self.step_rows[node.order]['name'], metrics.wall_ms / 1000)
+                    self.step_cache.store(self.keys.get(node.output), frame)
+                    self.datasets[node.output] = frame
+                    self.completed.add(node.output)
+                    live_bytes += frame_nbytes(frame)
+
+                    # 釋放不再需要的中間資料集
+                    for name in set(node.inputs):
+                        remaining_uses[name] -= 1
+                        if remaining_uses[name] == 0 and name not in self.outputs:
+                            live_bytes -= frame_nbytes(self.datasets.pop(name, None))
+
+                done_count = total - len(pending) - len(running)
+                self.report_progress(round(done_count / total * 100, 1) if total else 100)
+
+                # 步驟邊界：緊急任務需要工作程序時，不再啟動新步驟，等執行中的步驟完成後讓出
+                if pending and not yielding and failure is None and preempt_requested(self.db, self.task_id):
+                    yielding = True
+
+        if failure is not None:
+            raise failure
+        if yielding and pending:
+            save_checkpoint(self.task_id, self.datasets, self.completed)
+            requeue_task(self.db, self.task_id, self.worker_id)
+            return False
+        return True
+
+
+def run_task(task_id, db_file, worker_id=None, step_cache_bytes=None, cancel_slot=None):
+    """在工作程序中執行單一任務（必須是模組層級函式才能被 pickle）
+
+    worker_id 為領取任務時記錄的工作者識別，用於確認寫入結果時仍持有租約。
+    每個步驟的輸出都會寫入步驟快取（上限 step_cache_bytes），重新執行時
+    直接載入仍有效的快取。cancel_slot 為共享取消標記表與進度表中此任務的位置。
+    """
+    db = DatabaseManager(db_file)
+    spec = load_task_spec(db, task_id)
+
+    if not spec['file_path']:
+        raise TaskExecutionError("任務沒有指定輸入文件")
+
+    token = worker_token(cancel_slot)
+    if spec.get('cancel_requested'):
+        token.cancel()
+
+    step_cache = ColumnarCache(STEP_CACHE_DIR, step_cache_bytes or STEP_CACHE_MAX_BYTES)
+    try:
+        frames = StepRun(db, task_id, spec, worker_id, step_cache, token, worker_progress(cancel_slot)).run()
+    except TaskCancelled:
+        if token.interrupted:
+            # 程式結束時被中斷：放回等待佇列，下次啟動時重新執行
+            requeue_task(db, task_id, worker_id)
+            return {'task_id': task_id, 'interrupted': True}
+        # 停止的任務不保留檢查點，下次執行時重新開始
+        remove_checkpoint(task_id)
+        finish_task(db, task_id, 'cancelled', f"任務 {task_id} 已由使用者停止", worker_id=worker_id)
+        return {'task_id': task_id, 'cancelled': True}
+    if frames is None:
+        return {'task_id': task_id, 'preempted': True}
+
+    # 輸出結果並建立結果記錄
+    stem = os.path.splitext(spec['file_name'] or f"task_{task_id}")[0]
+    output_path = write_outputs(frames, os.path.join(RESULTS_DIR, f"task_{task_id}_{stem}.xlsx"))
+
+    remove_checkpoint(task_id)
+    if not finish_task(db, task_id, 'completed', worker_id=worker_id,
+                       result=(f"{stem} 處理結果", output_path, spec['user_id'])):
+        return {'task_id': task_id, 'lease_lost': True}
+
+    return {'task_id': task_id, 'output_path': output_path, 'rows': sum(len(frame) for frame in frames.values())}
+
+
+def init_worker(cancel_flags, events, progress_arrays):
+    """程序池的 initializer：設定共享的取消標記表、任務事件佇列與進度表"""
+    cancellation.init_worker(cancel_flags)
+    task_events.init_worker(events)
+    progress_board.init_worker(progress_arrays)
+
+
+class TaskEngine:
+    """任務執行引擎
+
+    派工執行緒在背景領取等待中的任務，交給程序池執行，
+    因此 GUI 不會被阻塞，且能使用所有 CPU 核心同時處理多個文件。
+    領取順序由 TaskScheduler 依優先級加權決定；程序池已滿而有緊急任務等待時，
+    會要求一個較低優先級的任務在下一個步驟邊界讓出工作程序。
+    任務透過 TaskQueue 以租約領取，派工執行緒定期為執行中的任務續約，
+    程式中斷後遺留的任務會在租約過期後重新排入佇列。
+    工作程序的進度與狀態變更以事件佇列傳回主程序，由 EventForwarder 分派給介面。
+    任務進度只寫入共享進度表，由 ProgressWriter 定期合併寫入資料庫。
+    """
+
+    def __init__(self, db=None, max_workers=None, poll_interval=2.0, scheduler=None, queue=None,
+                 step_cache_bytes=STEP_CACHE_MAX_BYTES):
+        self.db = db or DatabaseManager()
+        self.step_cache_bytes = step_cache_bytes
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.poll_interval = poll_interval
+        self.scheduler = scheduler or TaskScheduler()
+        self.queue = queue or TaskQueue(self.db)
+        self._last_heartbeat = 0
+        self.cancel_flags = CancelFlags()
+        # 工作程序一律以 spawn 方式啟動：主程序已有資料庫連接池、Qt 與背景執行緒，
+        # fork 會把這些狀態（包括被其他執行緒持有的鎖）複製到子程序
+        self._mp_context = multiprocessing.get_context('spawn')
+        self.events = self._mp_context.Queue()
+        self._forwarder = EventForwarder(self.events)
+        self.progress_board = ProgressBoard()
+        self.progress_writer = ProgressWriter(self.db, self.progress_board)
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """啟動程序池與派工執行緒"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._forwarder.start()
+        self.progress_writer.start()
+        self._recover_expired()
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._mp_context,
+                                             initializer=init_worker,
+                                             initargs=(self.cancel_flags.flags, self.events,
+                                                       self.progress_board.arrays()))
+        self._thread = threading.Thread(target=self._run, name="task-engine", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True):
+        """停止派工並關閉程序池
+
+        wait 為 False 時（程式結束）不等待執行中的任務完成：設定中斷標記，
+        任務在下一個檢查點放回等待佇列；尚未開始的任務同樣放回佇列，下次啟動時重新執行。
+        """
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if self._executor:
+            if not wait:
+                with self._lock:
+                    for task in self._futures.values():
+                        self.cancel_flags.interrupt(task['cancel_slot'])
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+        self.progress_writer.stop()
+        self._forwarder.stop()
+
+    def wake(self):
+        """通知引擎有新任務，立即檢查而不等待下一次輪詢"""
+        self._wake_event.set()
+
+    def running_tasks(self):
+        with self._lock:
+            return [task['id'] for task in self._futures.values()]
+
+    def pending_summary(self):
+        """統計等待中的任務：回傳 ({(優先級, 配置 ID): 數量}, {配置 ID: 配置的同時執行上限})"""
+        with self.db.connection() as conn:
+            rows = conn.execute(f"""
+                SELECT {PRIORITY_SQL} AS priority, t.config_id, COUNT(*) AS pending,
+                       json_extract(p.configuration, '$.max_concurrency') AS max_concurrency
+                FROM tasks t
+                LEFT JOIN process_configs p ON t.config_id = p.id
+                WHERE t.status = 'pending'
+                GROUP BY 1, t.config_id
+            """).fetchall()
+
+        pending = {}
+        configured_caps = {}
+        for row in rows:
+            pending[(row['priority'], row['config_id'])] = row['pending']
+            if row['max_concurrency']:
+                configured_caps[row['config_id']] = row['max_concurrency']
+        return pending, configured_caps
+
+    def claim_next_task(self, priority=None, excluded_configs=()):
+        """透過持久化佇列領取一個等待中的任務，回傳 (任務 ID, 優先級, 配置 ID) 或 None"""
+        return self.queue.claim(priority, excluded_configs)
+
+    def request_preemption(self, task_id):
+        """要求任務在下一個步驟邊界讓出工作程序"""
+        with self.db.transaction() as conn:
+            conn.execute("""
+                UPDATE tasks SET preempt_requested = 1
+                WHERE id = ? AND status = 'processing'
+            """, (task_id,))
+
+    def cancel_task(self, task_id):
+        """停止任務：等待中的任務直接標記為已停止，本引擎執行中的任務立即設定取消標記"""
+        outcome = request_cancellation(self.db, task_id)
+        if outcome == 'requested':
+            self._signal_cancellation([task_id])
+        return outcome
+
+    def _signal_cancellation(self, task_ids):
+        task_ids = set(task_ids)
+        with self._lock:
+            for task in self._futures.values():
+                if task['id'] in task_ids:
+                    self.cancel_flags.cancel(task['cancel_slot'])
+
+    def _check_cancellations(self):
+        """將其他程序（例如介面）寫入資料庫的停止要求轉為共享記憶體中的取消標記"""
+        running = self.running_tasks()
+        if not running:
+            return
+        try:
+            with self.db.connection() as conn:
+                rows = conn.execute(f"""
+                    SELECT id FROM tasks
+                    WHERE cancel_requested = 1 AND status = 'processing'
+                      AND id IN ({','.join('?' * len(running))})
+                """, running).fetchall()
+        except Exception as e:
+            print(f"檢查停止要求時發生錯誤：{e}")
+            return
+        self._signal_cancellation(row[0] for row in rows)
+
+    def _recover_expired(self):
+        """重新排入租約已過期的任務（程式崩潰或其他實例中斷時遺留）"""
+        try:
+            requeued, failed = self.queue.requeue_expired()
+        except Exception as e:
+            print(f"回收過期任務時發生錯誤：{e}")
+            return
+        if requeued or failed:
+            print(f"已重新排入 {requeued} 個中斷的任務，{failed} 個任務因多次中斷標記為失敗")
+
+    def _heartbeat(self):
+        """為執行中的任務續約，並定期回收其他工作者遺留的過期任務"""
+        now = time.monotonic()
+        if now - self._last_heartbeat < self.queue.lease_seconds / 3:
+            return
+        self._last_heartbeat = now
+        try:
+            self.queue.heartbeat(self.running_tasks())
+        except Exception as e:
+            print(f"任務續約時發生錯誤：{e}")
+        self._recover_expired()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._heartbeat()
+            self._check_cancellations()
+            self._dispatch()
+            self._wake_event.wait(self.poll_interval)
+            self._wake_event.clear()
+
+    def _dispatch(self):
+        """在程序池有空位時依排程器的決定領取並提交任務"""
+        while not self._stop_event.is_set():
+            try:
+                pending, configured_caps = self.pending_summary()
+                if not pending:
+                    return
+
+                with self._lock:
+                    running = list(self._futures.values())
+
+                if len(running) >= self.max_workers:
+                    victim = self.scheduler.preemption_victim(pending, running, configured_caps)
+                    if victim is not None:
+                        self.request_preemption(victim)
+                        self._mark_preempting(victim)
+                    return
+
+                priority = self.scheduler.next_priority(pending, running, configured_caps)
+                if priority is None:
+                    return
+                blocked = self.scheduler.blocked_configs(running, configured_caps)
+                claimed = self.claim_next_task(priority, blocked)
+            except Exception as e:
+                print(f"領取任務時發生錯誤：{e}")
+                return
+            if claimed is None:
+                return
+            self._submit(*claimed)
+
+    def _mark_preempting(self, task_id):
+        with self._lock:
+            for task in self._futures.values():
+                if task['id'] == task_id:
+                    task['preempting'] = True
+
+    def _submit(self, task_id, priority, config_id):
+        cancel_slot = self.cancel_flags.acquire()
+        self.progress_board.bind(cancel_slot, task_id)
+        future = self._executor.submit(run_task, task_id, self.db.db_file, self.queue.worker_id,
+                                       self.step_cache_bytes, cancel_slot)
+        with self._lock:
+            self._futures[future] = {
+                'id': task_id,
+                'priority': priority,
+                'config_id': config_id,
+                'started': time.monotonic(),
+                'preempting': False,
+                'cancel_slot': cancel_slot,
+            }
+        future.add_done_callback(self._task_done)
+
+    def _task_done(self, future):
+        with self._lock:
+            task = self._futures.pop(future, None)
+        if task is None:
+            return
+        task_id = task['id']
+        self.progress_writer.flush_slot(task['cancel_slot'])
+        self.cancel_flags.release(task['cancel_slot'])
+
+        if future.cancelled() and self._stop_event.is_set():
+            # 引擎停止時尚未開始的任務放回等待佇列
+            try:
+                requeue_task(self.db, task_id, self.queue.worker_id)
+            except Exception as e:
+                print(f"更新任務 {task_id} 狀態時發生錯誤：{e}")
+            return
+        if future.cancelled():
+            error = "已取消"
+        else:
+            exc = future.exception()
+            error = f"執行失敗：{exc}" if exc else None
+
+        if error:
+            remove_checkpoint(task_id)
+            try:
+                finish_task(self.db, task_id, 'failed', f"任務 {task_id} {error}",
+                            worker_id=self.queue.worker_id)
+            except Exception as e:
+                print(f"更新任務 {task_id} 狀態時發生錯誤：{e}")
+
+        # 有空位了，立即領取下一個任務
+        self._wake_event.set()
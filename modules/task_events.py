@@ -0,0 +1,88 @@
+import queue
+import threading
+
+# 事件種類：任務狀態轉換、任務進度、步驟狀態或說明變更
+STATUS_EVENT = 'status'
+PROGRESS_EVENT = 'progress'
+STEP_EVENT = 'step'
+
+# 工作程序中的事件佇列（由 init_worker 設定）；主程序中為 None，事件直接分派
+_worker_queue = None
+
+_subscribers = []
+_subscribers_lock = threading.Lock()
+
+
+def init_worker(events):
+    """程序池的 initializer：工作程序發布的事件改寫入共享佇列，由主程序轉發"""
+    global _worker_queue
+    _worker_queue = events
+
+
+def publish(kind, task_id, **data):
+    """發布任務事件（資料庫寫入提交後呼叫）
+
+    事件為 {'kind', 'task_id', ...} 字典。發布失敗不影響任務執行，
+    介面最多只是少更新一次畫面。
+    """
+    event = dict(data, kind=kind, task_id=task_id)
+    if _worker_queue is not None:
+        try:
+            _worker_queue.put_nowait(event)
+        except Exception:
+            pass
+        return
+    dispatch(event)
+
+
+def subscribe(callback):
+    """訂閱主程序中的任務事件；callback 在發布事件的執行緒中呼叫"""
+    with _subscribers_lock:
+        _subscribers.append(callback)
+
+
+def unsubscribe(callback):
+    with _subscribers_lock:
+        if callback in _subscribers:
+            _subscribers.remove(callback)
+
+
+def dispatch(event):
+    with _subscribers_lock:
+        subscribers = list(_subscribers)
+    for callback in subscribers:
+        try:
+            callback(event)
+        except Exception as e:
+            print(f"處理任務事件時發生錯誤：{e}")
+
+
+class EventForwarder:
+    """在主程序中讀取工作程序的事件佇列並分派給訂閱者"""
+
+    def __init__(self, events):
+        self.events = events
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="task-events", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self.events.put(None)
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                event = self.events.get()
+            except (EOFError, OSError, queue.Empty):
+                return
+            if event is None:
+                return
+            dispatch(event)
@@ -0,0 +1,134 @@
+import os
+import time
+import uuid
+import socket
+
+from utils.db import DatabaseManager
+from modules.task_scheduler import PRIORITY_SQL, normalize_priority
+from modules.task_events import publish, STATUS_EVENT
+
+# 租約長度（秒）：執行中的任務必須在此期間內續約，否則視為工作程序已終止
+DEFAULT_LEASE_SECONDS = 60
+
+# 任務因租約過期而中斷的次數上限，達到後標記為失敗，避免反覆讓程式崩潰
+# （attempts 只在租約過期時增加，被搶占或程式正常結束時讓出不計入）
+MAX_ATTEMPTS = 3
+
+
+def make_worker_id():
+    """產生工作者識別：主機名稱、程序 ID 與隨機字串"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class TaskQueue:
+    """以 tasks 資料表實作的持久化任務佇列
+
+    領取任務時以單一 UPDATE ... RETURNING 原子地設定狀態、租約與工作者識別，
+    多個程式實例或工作程序共用同一個資料庫也不會重複執行同一任務。
+    執行中的任務須定期續約（心跳）；租約過期的任務會被重新排入佇列。
+    """
+
+    def __init__(self, db=None, worker_id=None, lease_seconds=DEFAULT_LEASE_SECONDS,
+                 max_attempts=MAX_ATTEMPTS):
+        self.db = db or DatabaseManager()
+        self.worker_id = worker_id or make_worker_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def claim(self, priority=None, excluded_configs=()):
+        """領取一個等待中的任務，回傳 (任務 ID, 優先級, 配置 ID)；沒有任務時回傳 None
+
+        指定 priority 時只領取該優先級的任務，並略過 excluded_configs 中的處理配置。
+        """
+        conditions = ["status = 'pending'"]
+        params = []
+        if priority is not None:
+            conditions.append(f"{PRIORITY_SQL} = ?")
+            params.append(priority)
+        excluded_configs = [config_id for config_id in excluded_configs if config_id is not None]
+        if excluded_configs:
+            placeholders = ", ".join("?" for _ in excluded_configs)
+            conditions.append(f"(config_id IS NULL OR config_id NOT IN ({placeholders}))")
+            params.extend(excluded_configs)
+
+        now = time.time()
+        with self.db.transaction() as conn:
+            row = conn.execute(f"""
+                UPDATE tasks
+                SET status = 'processing', started_at = COALESCE(started_at, CURRENT_TIMESTAMP),
+                    updated_at = CURRENT_TIMESTAMP, preempt_requested = 0,
+                    worker_id = ?, lease_expires_at = ?, heartbeat_at = ?
+                WHERE id = (
+                    SELECT id FROM tasks WHERE {" AND ".join(conditions)}
+                    ORDER BY created_at, id LIMIT 1
+                ) AND status = 'pending'
+                RETURNING id, priority, config_id
+            """, [self.worker_id, now + self.lease_seconds, now] + params).fetchone()
+        if row is None:
+            return None
+        publish(STATUS_EVENT, row['id'], status='processing')
+        return row['id'], normalize_priority(row['priority']), row['config_id']
+
+    def heartbeat(self, task_ids):
+        """為本工作者持有的任務續約，回傳仍持有租約的任務 ID"""
+        task_ids = list(task_ids)
+        if not task_ids:
+            return set()
+
+        now = time.time()
+        placeholders = ", ".join("?" for _ in task_ids)
+        with self.db.transaction() as conn:
+            rows = conn.execute(f"""
+                UPDATE tasks SET lease_expires_at = ?, heartbeat_at = ?
+                WHERE id IN ({placeholders}) AND status = 'processing' AND worker_id = ?
+                RETURNING id
+            """, [now + self.lease_seconds, now] + task_ids + [self.worker_id]).fetchall()
+        return {row[0] for row in rows}
+
+    def release(self, task_id):
+        """清除任務的租約資訊（任務結束或讓出後呼叫）"""
+        with self.db.transaction() as conn:
+            conn.execute("""
+                UPDATE tasks SET worker_id = NULL, lease_expires_at = NULL
+                WHERE id = ? AND worker_id = ?
+            """, (task_id, self.worker_id))
+
+    def requeue_expired(self):
+        """將租約過期的執行中任務重新排入佇列，回傳 (重新排入數, 標記失敗數)
+
+        沒有租約資訊的執行中任務（升級前遺留或程式崩潰時的資料）同樣視為過期。
+        每次過期都會增加 attempts，中斷次數達到上限的任務直接標記為失敗並記錄日誌。
+        """
+        now = time.time()
+        with self.db.transaction() as conn:
+            failed = conn.execute("""
+                UPDATE tasks
+                SET status = 'failed', completed_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP,
+                    worker_id = NULL, lease_expires_at = NULL, attempts = attempts + 1
+                WHERE status = 'processing'
+                  AND (lease_expires_at IS NULL OR lease_expires_at < ?)
+                  AND attempts + 1 >= ?
+                RETURNING id, file_id, user_id
+            """, (now, self.max_attempts)).fetchall()
+            for task_id, file_id, user_id in failed:
+                conn.execute("""
+                    UPDATE files SET status = 'failed', updated_at = CURRENT_TIMESTAMP WHERE id = ?
+                """, (file_id,))
+                conn.execute("""
+                    INSERT INTO system_logs (level, message, user_id) VALUES ('error', ?, ?)
+                """, (f"任務 {task_id} 執行中斷已達 {self.max_attempts} 次，標記為失敗", user_id))
+
+            requeued = conn.execute("""
+                UPDATE tasks
+                SET status = 'pending', updated_at = CURRENT_TIMESTAMP,
+                    worker_id = NULL, lease_expires_at = NULL, attempts = attempts + 1
+                WHERE status = 'processing'
+                  AND (lease_expires_at IS NULL OR lease_expires_at < ?)
+                RETURNING id
+            """, (now,)).fetchall()
+
+        for row in failed:
+            publish(STATUS_EVENT, row[0], status='failed')
+        for row in requeued:
+            publish(STATUS_EVENT, row[0], status='pending')
+        return len(requeued), len(failed)
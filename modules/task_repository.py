@@ -0,0 +1,84 @@
+from utils.db import DatabaseManager
+from modules.records import TaskRecord
+
+# 任務列表的預設排序：進行中 > 等待中 > 失敗 > 已完成 > 已停止
+STATUS_ORDER_SQL = """
+    CASE t.status
+        WHEN 'processing' THEN 1
+        WHEN 'pending' THEN 2
+        WHEN 'failed' THEN 3
+        WHEN 'completed' THEN 4
+        WHEN 'cancelled' THEN 5
+        ELSE 6
+    END
+"""
+
+
+class TaskRepository:
+    """任務資料存取類"""
+
+    def __init__(self, db=None):
+        self.db = db or DatabaseManager()
+
+    def list_tasks(self, status=None, limit=None, offset=0):
+        """取得任務列表（含檔案名稱、配置名稱與步驟統計），回傳 TaskRecord 列表
+
+        先以 CTE 取出當頁任務，再對這些任務的步驟做一次 GROUP BY 統計，
+        整個列表只需一次查詢，不會再為每個任務各查兩次步驟數量。
+        """
+        if status:
+            return self._query_tasks("t.status = ?", [status], limit, offset)
+        return self._query_tasks(None, [], limit, offset)
+
+    def get_task(self, task_id):
+        """取得單一任務（與 list_tasks 相同的 TaskRecord），不存在時回傳 None"""
+        tasks = self._query_tasks("t.id = ?", [task_id], 1, 0)
+        return tasks[0] if tasks else None
+
+    def _query_tasks(self, condition, params, limit, offset):
+        """以單一查詢取得符合條件的任務與步驟統計"""
+        where = f"WHERE {condition}" if condition else ""
+
+        # LIMIT -1 在 SQLite 表示不限制筆數
+        params = list(params) + [limit if limit is not None else -1, offset]
+
+        query = f"""
+            WITH page AS (
+                SELECT t.id, t.name, t.priority, t.status, t.progress,
+                       t.started_at, t.completed_at, t.file_id, t.config_id,
+                       {STATUS_ORDER_SQL} AS status_order
+                FROM tasks t
+                {where}
+                ORDER BY status_order, t.started_at DESC, t.id DESC
+                LIMIT ? OFFSET ?
+            ),
+            step_counts AS (
+                SELECT task_id,
+                       COUNT(*) AS total_steps,
+                       SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) AS completed_steps
+                FROM task_steps
+                WHERE task_id IN (SELECT id FROM page)
+                GROUP BY task_id
+            )
+            SELECT page.id, page.name, page.priority, page.status, page.progress,
+                   page.started_at, page.completed_at,
+                   f.name AS file_name, p.name AS config_name,
+                   COALESCE(s.total_steps, 0) AS total_steps,
+                   COALESCE(s.completed_steps, 0) AS completed_steps
+            FROM page
+            LEFT JOIN files f ON page.file_id = f.id
+            LEFT JOIN process_configs p ON page.config_id = p.id
+            LEFT JOIN step_counts s ON s.task_id = page.id
+            ORDER BY page.status_order, page.started_at DESC, page.id DESC
+        """
+
+        with self.db.connection() as conn:
+            return TaskRecord.fetch_all(conn, query, params)
+
+    def count_tasks_by_status(self):
+        """取得各狀態的任務數量"""
+        with self.db.connection() as conn:
+            rows = conn.execute("""
+                SELECT status, COUNT(*) FROM tasks GROUP BY status
+            """).fetchall()
+        return {row[0]: row[1] for row in rows}
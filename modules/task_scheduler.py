@@ -0,0 +1,116 @@
+from collections import Counter
+
+# 優先級（由高至低），與 FileUploadWidget.priority_combo 的選項相同
+PRIORITIES = ("緊急", "高", "普通")
+DEFAULT_PRIORITY = "普通"
+
+# 加權公平排程的權重：每 10 次派工中緊急約 6 次、高 3 次、普通 1 次，
+# 只要有等待中的任務，低優先級就不會被完全餓死
+DEFAULT_WEIGHTS = {
+    "緊急": 6,
+    "高": 3,
+    "普通": 1,
+}
+
+# 各優先級同時執行的任務數上限（None 表示只受程序池大小限制）
+DEFAULT_PRIORITY_CAPS = {
+    "緊急": None,
+    "高": None,
+    "普通": None,
+}
+
+# 將 tasks.priority 正規化為三種優先級之一（空值或未知值視為普通）
+PRIORITY_SQL = """
+    CASE WHEN priority IN ('緊急', '高') THEN priority ELSE '普通' END
+"""
+
+
+def normalize_priority(priority):
+    """將任意優先級值正規化為 PRIORITIES 之一"""
+    return priority if priority in PRIORITIES else DEFAULT_PRIORITY
+
+
+class TaskScheduler:
+    """任務優先級排程器
+
+    以平滑加權輪詢（smooth weighted round-robin）在各優先級佇列間分配工作程序，
+    並套用每個優先級與每個處理配置的同時執行上限。排程器只負責決策，
+    任務的領取與執行由 TaskEngine 完成。
+
+    pending 參數為 {(priority, config_id): 等待中任務數}；
+    running 參數為執行中任務的列表，每筆包含 id、priority、config_id 與 started。
+    """
+
+    def __init__(self, weights=None, priority_caps=None, config_caps=None, default_config_cap=None):
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(weights or {})
+        self.priority_caps = dict(DEFAULT_PRIORITY_CAPS)
+        self.priority_caps.update(priority_caps or {})
+        # 個別配置的上限；處理配置 JSON 中的 max_concurrency 會覆蓋此設定
+        self.config_caps = dict(config_caps or {})
+        self.default_config_cap = default_config_cap
+        self._current = {priority: 0 for priority in PRIORITIES}
+
+    def config_cap(self, config_id, configured_cap=None):
+        """取得處理配置的同時執行上限"""
+        if configured_cap:
+            return int(configured_cap)
+        return self.config_caps.get(config_id, self.default_config_cap)
+
+    def blocked_configs(self, running, configured_caps=None):
+        """回傳已達同時執行上限的處理配置 ID"""
+        configured_caps = configured_caps or {}
+        counts = Counter(task['config_id'] for task in running)
+        blocked = set()
+        for config_id, count in counts.items():
+            cap = self.config_cap(config_id, configured_caps.get(config_id))
+            if cap is not None and count >= cap:
+                blocked.add(config_id)
+        return blocked
+
+    def eligible_priorities(self, pending, running, configured_caps=None):
+        """回傳目前可以派工的優先級"""
+        blocked = self.blocked_configs(running, configured_caps)
+        running_counts = Counter(task['priority'] for task in running)
+
+        eligible = []
+        for priority in PRIORITIES:
+            cap = self.priority_caps.get(priority)
+            if cap is not None and running_counts[priority] >= cap:
+                continue
+            if any(count > 0 and key[0] == priority and key[1] not in blocked
+                   for key, count in pending.items()):
+                eligible.append(priority)
+        return eligible
+
+    def next_priority(self, pending, running, configured_caps=None):
+        """選出下一個要派工的優先級；沒有可派工的任務時回傳 None"""
+        eligible = self.eligible_priorities(pending, running, configured_caps)
+        if not eligible:
+            return None
+
+        total = 0
+        chosen = None
+        for priority in eligible:
+            self._current[priority] += self.weights.get(priority, 1)
+            total += self.weights.get(priority, 1)
+            if chosen is None or self._current[priority] > self._current[chosen]:
+                chosen = priority
+        self._current[chosen] -= total
+        return chosen
+
+    def preemption_victim(self, pending, running, configured_caps=None):
+        """有緊急任務等待但沒有空位時，選出應在步驟邊界讓出的任務 ID
+
+        優先讓出優先級最低、最晚開始的任務；已要求讓出的任務不重複選取。
+        """
+        if "緊急" not in self.eligible_priorities(pending, running, configured_caps):
+            return None
+        if any(task.get('preempting') for task in running):
+            return None
+
+        candidates = [task for task in running if task['priority'] != "緊急"]
+        if not candidates:
+            return None
+        victim = max(candidates, key=lambda task: (PRIORITIES.index(task['priority']), task['started']))
+        return victim['id']
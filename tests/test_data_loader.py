@@ -0,0 +1,62 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PySide6.QtCore import QCoreApplication, QThreadPool
+
+from utils.data_loader import DataLoader
+
+
+def process_events():
+    for _ in range(10):
+        QCoreApplication.processEvents()
+
+
+class DataLoaderTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QCoreApplication([])
+
+    def setUp(self):
+        self.pool = QThreadPool()
+        self.loader = DataLoader(thread_pool=self.pool)
+
+    def tearDown(self):
+        self.loader.cancel_all()
+        self.pool.waitForDone()
+        process_events()
+
+    def test_request_again_before_first_result_is_delivered(self):
+        results = []
+        self.loader.request('key', lambda: 1, callback=results.append)
+        # 第一個工作已執行完畢並被刪除，但結果信號尚未送達
+        self.pool.waitForDone()
+        self.loader.request('key', lambda: 2, callback=results.append)
+        self.pool.waitForDone()
+        process_events()
+
+        self.assertEqual(results, [2])
+        self.assertFalse(self.loader.is_loading('key'))
+
+    def test_request_again_while_first_job_is_queued(self):
+        self.pool.setMaxThreadCount(1)
+        release = threading.Event()
+        self.loader.request('blocker', release.wait)
+
+        results = []
+        self.loader.request('key', lambda: 1, callback=results.append)
+        self.loader.request('key', lambda: 2, callback=results.append)
+        release.set()
+        self.pool.waitForDone()
+        process_events()
+
+        self.assertEqual(results, [2])
+        self.assertFalse(self.loader.is_loading('key'))
+
+
+if __name__ == '__main__':
+    unittest.main()
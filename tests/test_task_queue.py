@@ -0,0 +1,67 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.db import DatabaseManager, close_all_pools
+from modules.task_queue import TaskQueue, MAX_ATTEMPTS
+from modules.task_engine import requeue_task
+
+
+class TaskQueueAttemptsTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.temp_dir, 'test.db'))
+        self.db.initialize_database()
+        with self.db.transaction() as conn:
+            conn.execute("""
+                INSERT INTO files (name, path, status, category) VALUES ('in.csv', 'in.csv', 'pending', 'x')
+            """)
+            self.task_id = conn.execute("""
+                INSERT INTO tasks (name, file_id, priority, status) VALUES ('t', 1, '普通', 'pending')
+            """).lastrowid
+        self.queue = TaskQueue(self.db)
+
+    def tearDown(self):
+        close_all_pools()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def task_state(self):
+        with self.db.connection() as conn:
+            row = conn.execute("SELECT status, attempts FROM tasks WHERE id = ?", (self.task_id,)).fetchone()
+        return row[0], row[1]
+
+    def expire_lease(self):
+        with self.db.transaction() as conn:
+            conn.execute("UPDATE tasks SET lease_expires_at = 0 WHERE id = ?", (self.task_id,))
+
+    def test_preemption_requeues_do_not_count_as_attempts(self):
+        for _ in range(MAX_ATTEMPTS):
+            self.assertEqual(self.queue.claim()[0], self.task_id)
+            requeue_task(self.db, self.task_id, self.queue.worker_id)
+        self.assertEqual(self.task_state(), ('pending', 0))
+
+        # 被搶占多次後的第一次崩潰仍會重新排入佇列
+        self.queue.claim()
+        self.expire_lease()
+        self.assertEqual(self.queue.requeue_expired(), (1, 0))
+        self.assertEqual(self.task_state(), ('pending', 1))
+
+    def test_task_fails_after_max_lease_expiries(self):
+        for attempt in range(1, MAX_ATTEMPTS):
+            self.queue.claim()
+            self.expire_lease()
+            self.assertEqual(self.queue.requeue_expired(), (1, 0))
+            self.assertEqual(self.task_state(), ('pending', attempt))
+
+        self.queue.claim()
+        self.expire_lease()
+        self.assertEqual(self.queue.requeue_expired(), (0, 1))
+        self.assertEqual(self.task_state(), ('failed', MAX_ATTEMPTS))
+
+
+if __name__ == '__main__':
+    unittest.main()
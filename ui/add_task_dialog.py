@@ -0,0 +1,74 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QFormLayout, QLineEdit, QComboBox,
+                               QDialogButtonBox, QMessageBox)
+from utils.db import DatabaseManager
+
+# 任務優先級選項（與文件上傳頁面相同）
+PRIORITIES = ["普通", "高", "緊急"]
+
+
+class AddTaskDialog(QDialog):
+    """新增任務對話框：選擇要處理的文件與處理配置"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setup_ui()
+        self.load_options()
+
+    def setup_ui(self):
+        """設置新增任務對話框UI"""
+        self.setWindowTitle("新增任務")
+        self.setMinimumWidth(400)
+
+        layout = QVBoxLayout(self)
+        form_layout = QFormLayout()
+
+        self.name_edit = QLineEdit()
+        self.name_edit.setPlaceholderText("預設為「處理 文件名稱」")
+        self.file_combo = QComboBox()
+        self.config_combo = QComboBox()
+        self.priority_combo = QComboBox()
+        self.priority_combo.addItems(PRIORITIES)
+
+        form_layout.addRow("任務名稱:", self.name_edit)
+        form_layout.addRow("文件:", self.file_combo)
+        form_layout.addRow("處理配置:", self.config_combo)
+        form_layout.addRow("優先級:", self.priority_combo)
+        layout.addLayout(form_layout)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def load_options(self):
+        """載入可選擇的文件（未在處理中）與處理配置（未停用或封存）"""
+        with DatabaseManager().connection() as conn:
+            files = conn.execute("""
+                SELECT id, name FROM files WHERE status != 'processing'
+                ORDER BY created_at DESC, id DESC
+            """).fetchall()
+            configs = conn.execute("""
+                SELECT id, name FROM process_configs
+                WHERE status NOT IN ('disabled', 'archived')
+                ORDER BY is_default DESC, name
+            """).fetchall()
+
+        for row in files:
+            self.file_combo.addItem(row['name'], row['id'])
+        for row in configs:
+            self.config_combo.addItem(row['name'], row['id'])
+
+    def accept(self):
+        if self.file_combo.currentData() is None:
+            QMessageBox.warning(self, "新增失敗", "沒有可處理的文件，請先上傳文件")
+            return
+        if self.config_combo.currentData() is None:
+            QMessageBox.warning(self, "新增失敗", "沒有可用的處理配置")
+            return
+        super().accept()
+
+    def task_values(self):
+        """回傳 (任務名稱, 文件 ID, 配置 ID, 優先級)"""
+        name = self.name_edit.text().strip() or f"處理 {self.file_combo.currentText()}"
+        return (name, self.file_combo.currentData(), self.config_combo.currentData(),
+                self.priority_combo.currentText())
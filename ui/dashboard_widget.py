@@ -2,10 +2,51 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                                QFrame, QTableWidget, QTableWidgetItem, QHeaderView)
 from PySide6.QtCore import Qt
 from utils.db import DatabaseManager
+from utils.data_loader import DataLoader
+
+
+def fetch_dashboard_data():
+    """查詢儀表板數據（在背景執行緒執行）"""
+    db = DatabaseManager()
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    
+    # 載入文件統計（單次掃描計算所有狀態）
+    cursor.execute("""
+        SELECT COUNT(*),
+               SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'processing' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END)
+        FROM files
+    """)
+    counts = [value or 0 for value in cursor.fetchone()]
+    
+    # 載入最近任務
+    cursor.execute("""
+        SELECT f.name, p.name, f.created_at, f.status
+        FROM files f
+        LEFT JOIN tasks t ON f.id = t.file_id
+        LEFT JOIN process_configs p ON t.config_id = p.id
+        ORDER BY f.created_at DESC
+        LIMIT 10
+    """)
+    tasks = [tuple(task) for task in cursor.fetchall()]
+    
+    conn.close()
+    
+    return {
+        'total_files': counts[0],
+        'completed_files': counts[1],
+        'processing_files': counts[2],
+        'failed_files': counts[3],
+        'tasks': tasks
+    }
+
 
 class DashboardWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.loader = DataLoader(self)
         self.setup_ui()
         self.load_data()
         
@@ -77,9 +118,19 @@ class DashboardWidget(QWidget):
         tasks_frame.setStyleSheet("background-color: white; border-radius: 5px;")
         tasks_layout = QVBoxLayout(tasks_frame)
         
+        tasks_header_layout = QHBoxLayout()
         tasks_header = QLabel("最近處理任務")
         tasks_header.setStyleSheet("font-size: 18px; font-weight: bold; padding-bottom: 10px;")
-        tasks_layout.addWidget(tasks_header)
+        
+        # 載入中提示
+        self.loading_label = QLabel("載入中...")
+        self.loading_label.setStyleSheet("color: #95a5a6;")
+        self.loading_label.setVisible(False)
+        
+        tasks_header_layout.addWidget(tasks_header)
+        tasks_header_layout.addStretch()
+        tasks_header_layout.addWidget(self.loading_label)
+        tasks_layout.addLayout(tasks_header_layout)
         
         # 創建表格
         self.tasks_table = QTableWidget()
@@ -144,41 +195,28 @@ class DashboardWidget(QWidget):
         layout.addWidget(activity_frame)
         
     def load_data(self):
-        """從資料庫載入儀表板數據"""
-        db = DatabaseManager()
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        
-        # 載入文件統計
-        cursor.execute("SELECT COUNT(*) FROM files")
-        total_files = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM files WHERE status = 'completed'")
-        completed_files = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM files WHERE status = 'processing'")
-        processing_files = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM files WHERE status = 'failed'")
-        failed_files = cursor.fetchone()[0]
+        """從資料庫載入儀表板數據（背景執行，完成後更新畫面）"""
+        self.loading_label.setVisible(True)
+        self.loader.request('dashboard', fetch_dashboard_data,
+                            callback=self.populate_data,
+                            error_callback=self.load_failed)
+    
+    def load_failed(self, message):
+        """載入失敗"""
+        self.loading_label.setText(f"載入失敗：{message}")
+    
+    def populate_data(self, data):
+        """將載入的數據填入畫面"""
+        self.loading_label.setVisible(False)
+        self.loading_label.setText("載入中...")
         
         # 更新統計卡片
-        self.findChild(QLabel, "stat-value-總文件數").setText(str(total_files))
-        self.findChild(QLabel, "stat-value-已處理文件").setText(str(completed_files))
-        self.findChild(QLabel, "stat-value-處理中文件").setText(str(processing_files))
-        self.findChild(QLabel, "stat-value-處理失敗文件").setText(str(failed_files))
-        
-        # 載入最近任務
-        cursor.execute("""
-            SELECT f.name, p.name, f.created_at, f.status
-            FROM files f
-            LEFT JOIN tasks t ON f.id = t.file_id
-            LEFT JOIN process_configs p ON t.config_id = p.id
-            ORDER BY f.created_at DESC
-            LIMIT 10
-        """)
-        
-        tasks = cursor.fetchall()
+        self.findChild(QLabel, "stat-value-總文件數").setText(str(data['total_files']))
+        self.findChild(QLabel, "stat-value-已處理文件").setText(str(data['completed_files']))
+        self.findChild(QLabel, "stat-value-處理中文件").setText(str(data['processing_files']))
+        self.findChild(QLabel, "stat-value-處理失敗文件").setText(str(data['failed_files']))
+        
+        tasks = data['tasks']
         self.tasks_table.setRowCount(len(tasks))
         
         # 填充任務表
@@ -201,5 +239,3 @@ class DashboardWidget(QWidget):
             # 創建操作按鈕 (這裡需要自定義一個更複雜的小部件)
             # 暫時使用佔位符
             self.tasks_table.setItem(row, 4, QTableWidgetItem("查看/下載"))
-        
-        conn.close()
\ No newline at end of file
@@ -5,6 +5,7 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QIcon
 from utils.db import DatabaseManager
+from modules.connection_repository import ConnectionRepository
 
 class ConnectionCard(QFrame):
     """連接卡片組件"""
@@ -26,20 +27,20 @@ class ConnectionCard(QFrame):
         # 連接狀態指示器
         status_indicator = QLabel()
         status_indicator.setFixedSize(10, 10)
-        status_indicator.setStyleSheet(f"background-color: {'#27ae60' if self.connection_data['status'] == 'active' else '#e74c3c'}; border-radius: 5px;")
+        status_indicator.setStyleSheet(f"background-color: {'#27ae60' if self.connection_data.status == 'active' else '#e74c3c'}; border-radius: 5px;")
         
         # 連接標題
-        title_label = QLabel(self.connection_data['name'])
+        title_label = QLabel(self.connection_data.name)
         title_label.setStyleSheet("font-size: 16px; font-weight: bold;")
         
         # 操作按鈕
         buttons_layout = QHBoxLayout()
         
         edit_button = QPushButton("編輯")
-        edit_button.setProperty("connection_id", self.connection_data['id'])
+        edit_button.setProperty("connection_id", self.connection_data.id)
         
         delete_button = QPushButton("刪除")
-        delete_button.setProperty("connection_id", self.connection_data['id'])
+        delete_button.setProperty("connection_id", self.connection_data.id)
         delete_button.setObjectName("btn-danger")
         
         buttons_layout.addWidget(edit_button)
@@ -59,22 +60,22 @@ class ConnectionCard(QFrame):
         form_layout.setFieldGrowthPolicy(QFormLayout.AllNonFixedFieldsGrow)
         
         # 連接名稱
-        name_edit = QLineEdit(self.connection_data['name'])
+        name_edit = QLineEdit(self.connection_data.name)
         name_edit.setReadOnly(True)
         form_layout.addRow("連接名稱:", name_edit)
         
         # 連接類型
-        type_edit = QLineEdit(self.connection_data['type'])
+        type_edit = QLineEdit(self.connection_data.type)
         type_edit.setReadOnly(True)
         form_layout.addRow("連接類型:", type_edit)
         
         # 服務器地址和端口
         server_port_layout = QHBoxLayout()
         
-        server_edit = QLineEdit(self.connection_data['server'])
+        server_edit = QLineEdit(self.connection_data.server)
         server_edit.setReadOnly(True)
         
-        port_edit = QLineEdit(self.connection_data['port'])
+        port_edit = QLineEdit(self.connection_data.port)
         port_edit.setReadOnly(True)
         
         server_port_layout.addWidget(server_edit)
@@ -83,16 +84,16 @@ class ConnectionCard(QFrame):
         form_layout.addRow("服務器地址/端口:", server_port_layout)
         
         # 根據連接類型添加額外字段
-        if self.connection_data['type'] in ['MySQL', 'PostgreSQL', 'SQL Server']:
+        if self.connection_data.type in ['MySQL', 'PostgreSQL', 'SQL Server']:
             # 數據庫名稱
-            db_name_edit = QLineEdit(self.connection_data.get('database_name', ''))
+            db_name_edit = QLineEdit(self.connection_data.database_name or '')
             db_name_edit.setReadOnly(True)
             form_layout.addRow("數據庫名稱:", db_name_edit)
         
         # 用戶名和密碼
         user_pass_layout = QHBoxLayout()
         
-        user_edit = QLineEdit(self.connection_data.get('username', ''))
+        user_edit = QLineEdit(self.connection_data.username or '')
         user_edit.setReadOnly(True)
         
         pass_edit = QLineEdit('********')
@@ -108,7 +109,7 @@ class ConnectionCard(QFrame):
         # 測試連接按鈕
         test_button = QPushButton("測試連接")
         test_button.setObjectName("btn-success")
-        test_button.setProperty("connection_id", self.connection_data['id'])
+        test_button.setProperty("connection_id", self.connection_data.id)
         
         main_layout.addWidget(test_button, alignment=Qt.AlignRight)
 
@@ -220,41 +221,19 @@ class DataConnectionWidget(QWidget):
         self.clear_layouts()
         
         # 從資料庫獲取連接
-        db = DatabaseManager()
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, name, type, server, port, database_name, username, status
-            FROM connections
-            ORDER BY name ASC
-        """)
-        
-        connections = cursor.fetchall()
-        conn.close()
+        connections = ConnectionRepository().list_connections()
         
         # 根據類型分類連接
         olap_connections = []
         db_connections = []
         api_connections = []
         
-        for connection in connections:
-            conn_data = {
-                'id': connection[0],
-                'name': connection[1],
-                'type': connection[2],
-                'server': connection[3],
-                'port': connection[4],
-                'database_name': connection[5],
-                'username': connection[6],
-                'status': connection[7]
-            }
-            
-            if conn_data['type'] in ['OLAP', 'OLTP']:
+        for conn_data in connections:
+            if conn_data.type in ['OLAP', 'OLTP']:
                 olap_connections.append(conn_data)
-            elif conn_data['type'] in ['MySQL', 'PostgreSQL', 'SQL Server', 'Oracle', 'SQLite']:
+            elif conn_data.type in ['MySQL', 'PostgreSQL', 'SQL Server', 'Oracle', 'SQLite']:
                 db_connections.append(conn_data)
-            elif conn_data['type'] in ['REST API', 'SOAP API', 'GraphQL']:
+            elif conn_data.type in ['REST API', 'SOAP API', 'GraphQL']:
                 api_connections.append(conn_data)
         
         # 添加到相應的標籤頁
@@ -312,12 +291,8 @@ class DataConnectionWidget(QWidget):
             'status': 'inactive'
         }
         
-        db = DatabaseManager()
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute("""
+            DatabaseManager().write(lambda conn: conn.execute("""
                 INSERT INTO connections (name, type, server, port, database_name, username, password, status)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """, (
@@ -329,9 +304,7 @@ class DataConnectionWidget(QWidget):
                 new_connection['username'],
                 new_connection['password'],
                 new_connection['status']
-            ))
-            
-            conn.commit()
+            )).lastrowid)
             
             # 重新載入連接列表
             self.load_connections()
@@ -347,8 +320,4 @@ class DataConnectionWidget(QWidget):
             QMessageBox.information(self, "連接創建成功", "已成功創建新的數據連接")
             
         except Exception as e:
-            conn.rollback()
-            QMessageBox.critical(self, "連接創建失敗", f"創建連接時發生錯誤：{str(e)}")
-        
-        finally:
-            conn.close()
\ No newline at end of file
+            QMessageBox.critical(self, "連接創建失敗", f"創建連接時發生錯誤：{str(e)}")
\ No newline at end of file
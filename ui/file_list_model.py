@@ -0,0 +1,318 @@
+import os
+
+from PySide6.QtWidgets import QStyledItemDelegate, QStyle
+from PySide6.QtCore import (Qt, QAbstractListModel, QModelIndex, QRect, QSize,
+                            QEvent, QTimer, Signal)
+from PySide6.QtGui import QColor, QPen, QFont, QFontMetrics
+from modules.file_repository import FileRepository
+from modules.file_metadata import format_file_size
+
+
+def fetch_file_page(status, limit, after):
+    """查詢一頁文件（在背景執行緒執行）"""
+    files = FileRepository().list_files(status, limit, after)
+    for file_data in files:
+        # 已記錄大小的文件不需要再存取檔案系統
+        if file_data.size_bytes is not None:
+            file_data.size = format_file_size(file_data.size_bytes)
+    return files
+
+
+def fetch_file_metadata(paths_by_id):
+    """讀取文件大小等中繼資料（在背景執行緒執行）"""
+    metadata = {}
+    for file_id, path in paths_by_id.items():
+        try:
+            size = format_file_size(os.path.getsize(path))
+        except Exception:
+            size = format_file_size(None)
+        metadata[file_id] = {'size': size}
+    return metadata
+
+
+def file_icon_text(file_name):
+    """依文件類型取得圖示"""
+    file_extension = os.path.splitext(file_name)[1].lower()
+    if file_extension in ['.xlsx', '.xls']:
+        return "📊"  # Excel圖標
+    elif file_extension == '.csv':
+        return "📋"  # CSV圖標
+    elif file_extension == '.pdf':
+        return "📄"  # PDF圖標
+    return "📁"  # 默認文件圖標
+
+
+class FileListModel(QAbstractListModel):
+    """分頁載入的文件列表模型
+
+    以 (created_at, id) 鍵集分頁從背景執行緒載入文件；文件大小等需要存取
+    檔案系統的中繼資料（僅限上傳時尚未記錄大小的舊文件），只有在視圖實際
+    繪製該項目時才排入背景載入。
+    """
+
+    FileRole = Qt.UserRole + 1
+    FileIdRole = Qt.UserRole + 2
+
+    PAGE_SIZE = 60
+
+    def __init__(self, loader, parent=None):
+        super().__init__(parent)
+        self.loader = loader
+        self.status_filter = None
+        self._files = []
+        self._rows_by_id = {}
+        self._fetching = False
+        self._exhausted = True
+
+        # 可見項目的中繼資料請求會先累積，再一次送到背景執行緒
+        self._metadata_queue = {}
+        self._metadata_requested = set()
+        self._metadata_timer = QTimer(self)
+        self._metadata_timer.setSingleShot(True)
+        self._metadata_timer.setInterval(50)
+        self._metadata_timer.timeout.connect(self._load_metadata)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._files)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._files):
+            return None
+        file_data = self._files[index.row()]
+        if role == Qt.DisplayRole:
+            return file_data.name
+        if role == self.FileRole:
+            if file_data.size is None:
+                self._queue_metadata(file_data)
+            return file_data
+        if role == self.FileIdRole:
+            return file_data.id
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return not self._exhausted and not self._fetching
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self.canFetchMore() or not self._files:
+            return
+        last = self._files[-1]
+        self._request_page((last.created_at, last.id))
+
+    def set_status_filter(self, status_filter):
+        """切換狀態篩選並重新載入第一頁"""
+        self.status_filter = status_filter
+        self._request_page(None)
+
+    def refresh(self):
+        self._request_page(None)
+
+    def _request_page(self, after):
+        self._fetching = True
+        self.loader.request("file-page", fetch_file_page, self.status_filter, self.PAGE_SIZE, after,
+                            callback=lambda files, after=after: self._page_loaded(after, files),
+                            error_callback=self._page_failed)
+
+    def _page_loaded(self, after, files):
+        self._fetching = False
+        self._exhausted = len(files) < self.PAGE_SIZE
+
+        if after is None:
+            self.beginResetModel()
+            self._files = files
+            self._rows_by_id = {file_data.id: row for row, file_data in enumerate(files)}
+            self._metadata_queue.clear()
+            self._metadata_requested.clear()
+            self.endResetModel()
+            return
+
+        files = [file_data for file_data in files if file_data.id not in self._rows_by_id]
+        if not files:
+            return
+        first = len(self._files)
+        self.beginInsertRows(QModelIndex(), first, first + len(files) - 1)
+        self._files.extend(files)
+        for row in range(first, len(self._files)):
+            self._rows_by_id[self._files[row].id] = row
+        self.endInsertRows()
+
+    def _page_failed(self, message):
+        self._fetching = False
+        print(f"載入文件列表時發生錯誤：{message}")
+
+    def _queue_metadata(self, file_data):
+        file_id = file_data.id
+        if file_id in self._metadata_requested:
+            return
+        self._metadata_requested.add(file_id)
+        self._metadata_queue[file_id] = file_data.path
+        if not self._metadata_timer.isActive():
+            self._metadata_timer.start()
+
+    def _load_metadata(self):
+        # 同一時間只載入一批，前一批完成後再送出期間累積的文件，避免後一批取消前一批
+        if not self._metadata_queue or self.loader.is_loading("file-meta"):
+            return
+        batch = self._metadata_queue
+        self._metadata_queue = {}
+        self.loader.request("file-meta", fetch_file_metadata, batch,
+                            callback=self._metadata_loaded, error_callback=self._metadata_failed)
+
+    def _metadata_failed(self, message):
+        print(f"載入文件中繼資料時發生錯誤：{message}")
+        self._load_metadata()
+
+    def _metadata_loaded(self, metadata):
+        for file_id, values in metadata.items():
+            row = self._rows_by_id.get(file_id)
+            if row is None:
+                continue
+            for name, value in values.items():
+                setattr(self._files[row], name, value)
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+        self._load_metadata()
+
+
+class FileCardDelegate(QStyledItemDelegate):
+    """以繪製方式呈現文件卡片的委派"""
+
+    action_requested = Signal(str, int)
+
+    CARD_SIZE = QSize(260, 230)
+    MARGIN = 8
+    PADDING = 12
+    BUTTON_SIZE = 30
+
+    STATUS_STYLES = {
+        'completed': ("處理完成", 100, "#27ae60"),
+        'processing': ("處理中", 75, "#f39c12"),
+        'failed': ("處理失敗", 30, "#e74c3c"),
+    }
+    DEFAULT_STATUS = ("未處理", 0, "#95a5a6")
+
+    def sizeHint(self, option, index):
+        return self.CARD_SIZE
+
+    def _card_rect(self, option):
+        return option.rect.adjusted(self.MARGIN, self.MARGIN, -self.MARGIN, -self.MARGIN)
+
+    def _buttons(self, file_data):
+        """依文件狀態決定可用的按鈕"""
+        completed = file_data.status == 'completed'
+        buttons = [
+            ('view', "👁️", completed),
+            ('download', "⬇️", completed),
+        ]
+        if file_data.status == 'failed':
+            buttons.append(('retry', "🔄", True))
+        buttons.append(('delete', "🗑️", True))
+        return buttons
+
+    def _button_rects(self, option, file_data):
+        inner = self._card_rect(option).adjusted(self.PADDING, self.PADDING, -self.PADDING, -self.PADDING)
+        rects = []
+        right = inner.right()
+        for action, text, enabled in reversed(self._buttons(file_data)):
+            rect = QRect(right - self.BUTTON_SIZE + 1, inner.bottom() - self.BUTTON_SIZE + 1,
+                         self.BUTTON_SIZE, self.BUTTON_SIZE)
+            rects.append((action, text, enabled, rect))
+            right -= self.BUTTON_SIZE + 4
+        return rects
+
+    def paint(self, painter, option, index):
+        file_data = index.data(FileListModel.FileRole)
+        if file_data is None:
+            return
+
+        painter.save()
+        painter.setRenderHint(painter.RenderHint.Antialiasing)
+
+        card = self._card_rect(option)
+        inner = card.adjusted(self.PADDING, self.PADDING, -self.PADDING, -self.PADDING)
+        selected = bool(option.state & QStyle.State_Selected)
+
+        # 卡片背景與邊框
+        painter.setPen(QPen(QColor("#3498db" if selected else "#eeeeee"), 1))
+        painter.setBrush(QColor("white"))
+        painter.drawRoundedRect(card, 5, 5)
+
+        # 文件圖標
+        icon_font = QFont(option.font)
+        icon_font.setPixelSize(32)
+        icon_rect = QRect(inner.left(), inner.top(), inner.width(), 40)
+        painter.setFont(icon_font)
+        painter.setPen(QColor("#3498db"))
+        painter.drawText(icon_rect, Qt.AlignCenter, file_icon_text(file_data.name))
+
+        # 文件名稱
+        name_font = QFont(option.font)
+        name_font.setBold(True)
+        name_font.setPixelSize(16)
+        name_fm = QFontMetrics(name_font)
+        name_rect = QRect(inner.left(), icon_rect.bottom() + 6, inner.width(), name_fm.height())
+        painter.setFont(name_font)
+        painter.setPen(QColor("#2c3e50"))
+        painter.drawText(name_rect, Qt.AlignCenter,
+                         name_fm.elidedText(file_data.name, Qt.ElideMiddle, name_rect.width()))
+
+        # 上傳時間、大小與類別
+        small_font = QFont(option.font)
+        small_font.setPixelSize(12)
+        small_fm = QFontMetrics(small_font)
+        painter.setFont(small_font)
+        painter.setPen(QColor("#95a5a6"))
+
+        time_rect = QRect(inner.left(), name_rect.bottom() + 4, inner.width(), small_fm.height())
+        painter.drawText(time_rect, Qt.AlignCenter, f"上傳於: {file_data.created_at}")
+
+        info_rect = QRect(inner.left(), time_rect.bottom() + 2, inner.width(), small_fm.height())
+        info_text = f"大小: {file_data.size or '...'} | 類別: {file_data.category}"
+        painter.drawText(info_rect, Qt.AlignCenter,
+                         small_fm.elidedText(info_text, Qt.ElideRight, info_rect.width()))
+
+        # 進度條
+        status_text, progress, color = self.STATUS_STYLES.get(file_data.status, self.DEFAULT_STATUS)
+        bar_rect = QRect(inner.left(), info_rect.bottom() + 8, inner.width(), 8)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor("#ecf0f1"))
+        painter.drawRoundedRect(bar_rect, 4, 4)
+        if progress > 0:
+            painter.setBrush(QColor(color))
+            painter.drawRoundedRect(QRect(bar_rect.left(), bar_rect.top(),
+                                          int(bar_rect.width() * progress / 100), bar_rect.height()), 4, 4)
+
+        # 進度狀態
+        status_rect = QRect(inner.left(), bar_rect.bottom() + 4, inner.width(), small_fm.height())
+        painter.setPen(QColor("#e74c3c" if file_data.status == 'failed' else "#2c3e50"))
+        painter.drawText(status_rect, Qt.AlignLeft | Qt.AlignVCenter, status_text)
+        painter.setPen(QColor("#95a5a6"))
+        painter.drawText(status_rect, Qt.AlignRight | Qt.AlignVCenter, f"{progress}%")
+
+        # 操作按鈕
+        painter.setFont(option.font)
+        for action, text, enabled, rect in self._button_rects(option, file_data):
+            painter.setOpacity(1.0 if enabled else 0.35)
+            painter.setPen(QPen(QColor("#dddddd"), 1))
+            painter.setBrush(Qt.NoBrush)
+            painter.drawRoundedRect(rect, 4, 4)
+            painter.drawText(rect, Qt.AlignCenter, text)
+        painter.setOpacity(1.0)
+
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        """處理卡片上按鈕的點擊"""
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            file_data = index.data(FileListModel.FileRole)
+            if file_data is not None:
+                pos = event.position().toPoint()
+                for action, _, enabled, rect in self._button_rects(option, file_data):
+                    if rect.contains(pos):
+                        if enabled:
+                            self.action_requested.emit(action, file_data.id)
+                        return True
+        return super().editorEvent(event, model, option, index)
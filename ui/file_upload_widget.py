@@ -5,14 +5,72 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
 
 from PySide6.QtCore import Qt, QFile, QIODevice
 from utils.db import DatabaseManager
+from utils.data_loader import DataLoader
+from modules.file_metadata import collect_file_metadata, save_metadata
 import os
 import shutil
 import datetime
 
+
+def store_upload(source_path, file_name, category, description, process_type, priority,
+                 process_after_upload):
+    """複製上傳的文件、收集中繼資料並寫入資料庫（在背景執行緒中執行）
+
+    計算雜湊與讀取 Excel 列數可能需要數秒，在寫入交易之外完成，不佔用寫入執行緒。
+    """
+    # 創建目標目錄
+    upload_dir = "data/uploads"
+    os.makedirs(upload_dir, exist_ok=True)
+
+    # 生成唯一文件名
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    unique_filename = f"{timestamp}_{file_name}"
+    target_path = os.path.join(upload_dir, unique_filename)
+
+    # 複製文件
+    shutil.copy2(source_path, target_path)
+
+    # 記錄文件大小、雜湊與其他中繼資料，列表畫面不必再存取檔案系統
+    metadata = collect_file_metadata(target_path, os.path.basename(source_path))
+
+    status = "pending"
+    if process_after_upload:
+        status = "processing"
+
+    def insert_file(conn):
+        cursor = conn.cursor()
+
+        # 插入文件記錄
+        cursor.execute("""
+            INSERT INTO files (name, category, description, path, status)
+            VALUES (?, ?, ?, ?, ?)
+        """, (file_name, category, description, target_path, status))
+
+        file_id = cursor.lastrowid
+        save_metadata(cursor, 'files', file_id, metadata)
+
+        # 如果需要立即處理，創建處理任務
+        if process_after_upload:
+            # 獲取處理配置ID
+            cursor.execute("SELECT id FROM process_configs WHERE name = ?", (process_type,))
+            config = cursor.fetchone()
+            config_id = config[0] if config else None
+
+            # 任務以等待中狀態建立，由任務執行引擎領取執行
+            cursor.execute("""
+                INSERT INTO tasks (name, file_id, config_id, priority, status)
+                VALUES (?, ?, ?, ?, 'pending')
+            """, (f"處理 {file_name}", file_id, config_id, priority))
+
+    # 由寫入執行緒儲存到資料庫
+    DatabaseManager().write(insert_file)
+
+
 class FileUploadWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.selected_file_path = None
+        self.loader = DataLoader(self)
         self.setup_ui()
         
     def setup_ui(self):
@@ -202,6 +260,8 @@ class FileUploadWidget(QWidget):
     
     def upload_file(self):
         """上傳並處理文件"""
+        if self.loader.is_loading("upload"):
+            return
         if not self.selected_file_path:
             QMessageBox.warning(self, "上傳失敗", "請先選擇要上傳的文件")
             return
@@ -221,69 +281,36 @@ class FileUploadWidget(QWidget):
             QMessageBox.warning(self, "上傳失敗", "請選擇處理類型")
             return
         
-        try:
-            # 創建目標目錄
-            upload_dir = "data/uploads"
-            os.makedirs(upload_dir, exist_ok=True)
-            
-            # 生成唯一文件名
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            file_extension = os.path.splitext(self.selected_file_path)[1]
-            unique_filename = f"{timestamp}_{file_name}"
-            target_path = os.path.join(upload_dir, unique_filename)
-            
-            # 複製文件
-            shutil.copy2(self.selected_file_path, target_path)
-            
-            # 儲存到資料庫
-            db = DatabaseManager()
-            conn = db.get_connection()
-            cursor = conn.cursor()
-            
-            status = "pending"
-            if process_after_upload:
-                status = "processing"
-            
-            # 插入文件記錄
-            cursor.execute("""
-                INSERT INTO files (name, category, description, path, status)
-                VALUES (?, ?, ?, ?, ?)
-            """, (file_name, category, description, target_path, status))
-            
-            file_id = cursor.lastrowid
-            
-            # 如果需要立即處理，創建處理任務
-            if process_after_upload:
-                # 獲取處理配置ID
-                cursor.execute("SELECT id FROM process_configs WHERE name = ?", (process_type,))
-                config = cursor.fetchone()
-                config_id = config[0] if config else None
-                
-                cursor.execute("""
-                    INSERT INTO tasks (name, file_id, config_id, priority, status)
-                    VALUES (?, ?, ?, ?, 'processing')
-                """, (f"處理 {file_name}", file_id, config_id, priority))
-            
-            conn.commit()
-            conn.close()
-            
-            # 更新UI
-            self.selected_file_path = None
-            self.filename_edit.clear()
-            self.desc_edit.clear()
-            self.category_combo.setCurrentIndex(0)
-            self.process_combo.setCurrentIndex(0)
-            self.priority_combo.setCurrentIndex(0)
-            self.upload_button.setEnabled(False)
-            
-            # 重新載入上傳記錄
-            self.load_upload_records()
-            
-            QMessageBox.information(self, "上傳成功", "文件已成功上傳")
-            
-        except Exception as e:
-            QMessageBox.critical(self, "上傳失敗", f"上傳過程中發生錯誤：{str(e)}")
-    
+        # 複製文件與計算雜湊在背景執行，完成前停用上傳按鈕避免重複上傳
+        self.upload_button.setEnabled(False)
+        self.upload_button.setText("上傳中...")
+        self.loader.request("upload", store_upload, self.selected_file_path, file_name, category,
+                            description, process_type, priority, process_after_upload,
+                            callback=self.upload_finished, error_callback=self.upload_failed)
+
+    def upload_finished(self, _):
+        """文件已上傳，重置表單並更新上傳記錄"""
+        # 更新UI
+        self.selected_file_path = None
+        self.filename_edit.clear()
+        self.desc_edit.clear()
+        self.category_combo.setCurrentIndex(0)
+        self.process_combo.setCurrentIndex(0)
+        self.priority_combo.setCurrentIndex(0)
+        self.upload_button.setText("上傳並處理")
+        self.upload_button.setEnabled(False)
+
+        # 重新載入上傳記錄
+        self.load_upload_records()
+
+        QMessageBox.information(self, "上傳成功", "文件已成功上傳")
+
+    def upload_failed(self, message):
+        """上傳失敗，保留表單內容讓使用者重試"""
+        self.upload_button.setText("上傳並處理")
+        self.upload_button.setEnabled(self.selected_file_path is not None)
+        QMessageBox.critical(self, "上傳失敗", f"上傳過程中發生錯誤：{message}")
+
     def load_upload_records(self):
         """載入上傳記錄"""
         db = DatabaseManager()
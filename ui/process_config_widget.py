@@ -1,10 +1,13 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                                QFrame, QTableWidget, QTableWidgetItem, QHeaderView,
                                QPushButton, QComboBox, QLineEdit, QTextEdit,
-                               QListWidget, QListWidgetItem, QMessageBox)
+                               QListWidget, QListWidgetItem, QMessageBox, QCheckBox)
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QIcon
 from utils.db import DatabaseManager
+from modules.step_functions import validate_step
+from modules.step_graph import validate_step_graph
+from modules.script_sandbox import validate_script
 import json
 
 class ProcessConfigWidget(QWidget):
@@ -161,10 +164,15 @@ class ProcessConfigWidget(QWidget):
         form_layout.addWidget(script_label)
         
         self.script_edit = QTextEdit()
-        self.script_edit.setPlaceholderText("# 在這裡輸入Python處理腳本")
+        self.script_edit.setPlaceholderText("# 在這裡輸入Python處理腳本\n"
+                                            "# 腳本以與本程式相同的權限執行，請只使用可信任的腳本")
         self.script_edit.setStyleSheet("font-family: monospace;")
         form_layout.addWidget(self.script_edit)
         
+        # 效能分析：依序執行步驟並為耗時較長的步驟保存 cProfile 分析檔
+        self.profile_check = QCheckBox("記錄步驟效能分析（保存耗時較長步驟的 cProfile 分析檔）")
+        form_layout.addWidget(self.profile_check)
+        
         # 保存按鈕
         button_layout = QHBoxLayout()
         button_layout.addStretch()
@@ -334,11 +342,17 @@ class ProcessConfigWidget(QWidget):
         
         # 清空步驟列表
         self.steps_list.clear()
+        self.profile_check.setChecked(False)
+        self.config_options = {}
         
         # 解析配置JSON並填充步驟列表
         if config[4]:
             try:
                 config_data = json.loads(config[4])
+                self.profile_check.setChecked(bool(config_data.get('profile_steps')))
+                # 表單沒有提供的設定（工作表、輸出資料集等）在保存時保留
+                self.config_options = {key: value for key, value in config_data.items()
+                                       if key not in ('steps', 'script', 'profile_steps')}
                 
                 # 填充處理步驟
                 if 'steps' in config_data:
@@ -373,6 +387,8 @@ class ProcessConfigWidget(QWidget):
         self.desc_edit.clear()
         self.steps_list.clear()
         self.script_edit.clear()
+        self.profile_check.setChecked(False)
+        self.config_options = {}
     
     def add_step(self):
         """添加處理步驟"""
@@ -438,11 +454,17 @@ class ProcessConfigWidget(QWidget):
         
         # 清空步驟列表
         self.steps_list.clear()
+        self.profile_check.setChecked(False)
+        self.config_options = {}
         
         # 解析配置JSON並填充步驟列表
         if config[4]:
             try:
                 config_data = json.loads(config[4])
+                self.profile_check.setChecked(bool(config_data.get('profile_steps')))
+                # 表單沒有提供的設定（工作表、輸出資料集等）在保存時保留
+                self.config_options = {key: value for key, value in config_data.items()
+                                       if key not in ('steps', 'script', 'profile_steps')}
                 
                 # 填充處理步驟
                 if 'steps' in config_data:
@@ -505,11 +527,17 @@ class ProcessConfigWidget(QWidget):
         
         # 清空步驟列表
         self.steps_list.clear()
+        self.profile_check.setChecked(False)
+        self.config_options = {}
         
         # 解析配置JSON並填充步驟列表
         if config[4]:
             try:
                 config_data = json.loads(config[4])
+                self.profile_check.setChecked(bool(config_data.get('profile_steps')))
+                # 表單沒有提供的設定（工作表、輸出資料集等）在保存時保留
+                self.config_options = {key: value for key, value in config_data.items()
+                                       if key not in ('steps', 'script', 'profile_steps')}
                 
                 # 填充處理步驟
                 if 'steps' in config_data:
@@ -551,37 +579,50 @@ class ProcessConfigWidget(QWidget):
             step_data = step_item.data(Qt.UserRole)
             steps.append(step_data)
         
-        # 獲取腳本
+        # 驗證步驟函式與參數
+        errors = [error for step in steps for error in validate_step(step)]
+        # 驗證步驟之間的相依關係（輸入/輸出名稱與循環相依）
+        errors.extend(validate_step_graph(steps))
+        if errors:
+            QMessageBox.warning(self, "保存失敗", "\n".join(errors))
+            return
+        
+        # 獲取腳本並檢查語法
         script = self.script_edit.toPlainText()
+        script_error = validate_script(script)
+        if script_error:
+            QMessageBox.warning(self, "保存失敗", f"自訂腳本{script_error}")
+            return
         
         # 構建配置JSON
-        config_data = {
+        config_data = dict(getattr(self, 'config_options', {}))
+        config_data.update({
             'steps': steps,
-            'script': script
-        }
+            'script': script,
+            'profile_steps': self.profile_check.isChecked()
+        })
         
         # 轉換為JSON字符串
         configuration = json.dumps(config_data)
         
-        # 保存到資料庫
-        db = DatabaseManager()
-        conn = db.get_connection()
-        cursor = conn.cursor()
+        config_id = self.current_config_id
         
-        try:
-            if self.current_config_id:  # 更新現有配置
-                cursor.execute("""
+        def save(conn):
+            if config_id:  # 更新現有配置
+                conn.execute("""
                     UPDATE process_configs
                     SET name = ?, file_type = ?, description = ?, configuration = ?, status = ?, updated_at = CURRENT_TIMESTAMP
                     WHERE id = ?
-                """, (name, file_type, description, configuration, status, self.current_config_id))
+                """, (name, file_type, description, configuration, status, config_id))
             else:  # 創建新配置
-                cursor.execute("""
+                conn.execute("""
                     INSERT INTO process_configs (name, file_type, description, configuration, status, is_default)
                     VALUES (?, ?, ?, ?, ?, 0)
                 """, (name, file_type, description, configuration, status))
-            
-            conn.commit()
+        
+        # 由寫入執行緒保存到資料庫
+        try:
+            DatabaseManager().write(save)
             
             # 更新配置列表
             self.load_configs()
@@ -592,8 +633,4 @@ class ProcessConfigWidget(QWidget):
             QMessageBox.information(self, "保存成功", "配置已成功保存")
             
         except Exception as e:
-            conn.rollback()
-            QMessageBox.critical(self, "保存失敗", f"保存配置時發生錯誤：{str(e)}")
-        
-        finally:
-            conn.close()
\ No newline at end of file
+            QMessageBox.critical(self, "保存失敗", f"保存配置時發生錯誤：{str(e)}")
\ No newline at end of file
@@ -6,6 +6,21 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QIcon
 from utils.db import DatabaseManager
+from utils.data_loader import DataLoader
+from modules.file_metadata import format_file_size
+from modules.result_repository import ResultRepository
+
+
+def fetch_results(status_filter=None):
+    """查詢結果列表（在背景執行緒執行）"""
+    results = ResultRepository().list_results(status_filter)
+    for result in results:
+        # 文件大小與副檔名在產生結果時已記錄，不需逐筆存取檔案系統
+        result.size = format_file_size(result.size_bytes)
+        if not result.extension:
+            result.extension = os.path.splitext(result.output_path)[1] if result.output_path else ''
+    
+    return results
 
 class ResultCard(QFrame):
     """結果卡片組件"""
@@ -27,7 +42,7 @@ class ResultCard(QFrame):
         icon_label.setStyleSheet("font-size: 24px;")
         
         # 設置圖標基於文件類型
-        file_extension = self.result_data.get('extension', '').lower()
+        file_extension = (self.result_data.extension or '').lower()
         if file_extension in ['.xlsx', '.xls']:
             icon_label.setText("📊")  # Excel圖標
         elif file_extension == '.csv':
@@ -43,12 +58,12 @@ class ResultCard(QFrame):
         content_layout = QVBoxLayout()
         
         # 結果標題
-        title_label = QLabel(self.result_data['name'])
+        title_label = QLabel(self.result_data.name)
         title_label.setStyleSheet("font-weight: bold; font-size: 16px;")
         content_layout.addWidget(title_label)
         
         # 結果描述
-        desc_label = QLabel(f"處理時間: {self.result_data['created_at']} | 文件大小: {self.result_data['size']}")
+        desc_label = QLabel(f"處理時間: {self.result_data.created_at} | 文件大小: {self.result_data.size}")
         desc_label.setStyleSheet("color: #95a5a6;")
         content_layout.addWidget(desc_label)
         
@@ -80,6 +95,7 @@ class ResultManagementWidget(QWidget):
     """結果管理頁面"""
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.loader = DataLoader(self)
         self.setup_ui()
         self.load_results()
         
@@ -102,9 +118,19 @@ class ResultManagementWidget(QWidget):
         results_layout = QVBoxLayout(results_frame)
         
         # 卡片標題
+        header_layout = QHBoxLayout()
         header_label = QLabel("處理結果")
         header_label.setStyleSheet("font-size: 18px; font-weight: bold;")
-        results_layout.addWidget(header_label)
+        
+        # 載入中提示
+        self.loading_label = QLabel("載入中...")
+        self.loading_label.setStyleSheet("color: #95a5a6;")
+        self.loading_label.setVisible(False)
+        
+        header_layout.addWidget(header_label)
+        header_layout.addStretch()
+        header_layout.addWidget(self.loading_label)
+        results_layout.addLayout(header_layout)
         
         # 標籤頁
         self.tab_widget = QTabWidget()
@@ -207,78 +233,38 @@ class ResultManagementWidget(QWidget):
         self.tab_widget.currentChanged.connect(self.tab_changed)
         
     def load_results(self, status_filter=None):
-        """載入結果列表"""
+        """載入結果列表（背景執行，完成後更新畫面）"""
+        self.loading_label.setVisible(True)
+        self.loader.request('results', fetch_results, status_filter,
+                            callback=self.populate_results,
+                            error_callback=self.load_failed)
+    
+    def load_failed(self, message):
+        """載入失敗"""
+        self.loading_label.setText(f"載入失敗：{message}")
+    
+    def populate_results(self, results):
+        """將載入的結果填入各標籤頁"""
+        self.loading_label.setVisible(False)
+        self.loading_label.setText("載入中...")
+        
         # 清空現有結果列表
         self.clear_layouts()
         
-        # 從資料庫獲取結果
-        db = DatabaseManager()
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        
-        # 獲取所有結果
-        query = """
-            SELECT r.id, r.name, r.output_path, r.status, r.created_at,
-                   t.name as task_name
-            FROM results r
-            LEFT JOIN tasks t ON r.task_id = t.id
-        """
-        params = []
-        
-        if status_filter:
-            query += " WHERE r.status = ?"
-            params.append(status_filter)
-        
-        query += " ORDER BY r.created_at DESC"
-        
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-        
         # 按狀態分類結果
         recent_results = []
         archived_results = []
         shared_results = []
         
-        for result in results:
-            # 獲取文件大小
-            file_size = "未知"
-            try:
-                file_path = result[2]
-                if file_path and os.path.exists(file_path):
-                    size_bytes = os.path.getsize(file_path)
-                    if size_bytes < 1024:
-                        file_size = f"{size_bytes} B"
-                    elif size_bytes < 1024 * 1024:
-                        file_size = f"{size_bytes / 1024:.1f} KB"
-                    else:
-                        file_size = f"{size_bytes / (1024 * 1024):.1f} MB"
-            except Exception as e:
-                # 如果文件不存在或無法獲取大小
-                print(e)
-                pass
-            
-            # 構建結果數據
-            result_data = {
-                'id': result[0],
-                'name': result[1],
-                'path': result[2],
-                'status': result[3],
-                'created_at': result[4],
-                'task_name': result[5],
-                'size': file_size,
-                'extension': os.path.splitext(result[2])[1] if result[2] else ''
-            }
-            
+        for result_data in results:
             # 按狀態添加到相應列表
-            if result[3] == 'archived':
+            if result_data.status == 'archived':
                 archived_results.append(result_data)
-            elif result[3] == 'shared':
+            elif result_data.status == 'shared':
                 shared_results.append(result_data)
             else:
                 recent_results.append(result_data)
         
-        conn.close()
-        
         # 添加結果卡片到相應標籤頁
         for result_data in recent_results:
             result_card = ResultCard(result_data)
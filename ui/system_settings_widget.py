@@ -9,12 +9,56 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
 from PySide6.QtCore import Qt, QTime
 from PySide6.QtGui import QIcon
 from utils.db import DatabaseManager
+from utils.data_loader import DataLoader
+
+
+def fetch_users():
+    """查詢用戶列表（在背景執行緒執行）"""
+    db = DatabaseManager()
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT id, username, name, email, role, status
+        FROM users
+        ORDER BY id ASC
+    """)
+    
+    users = [tuple(user) for user in cursor.fetchall()]
+    conn.close()
+    return users
+
+
+def fetch_logs(level_filter=None):
+    """查詢最近的系統日誌（在背景執行緒執行）"""
+    db = DatabaseManager()
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    
+    query = """
+        SELECT l.id, l.level, l.message, l.created_at, u.username
+        FROM system_logs l
+        LEFT JOIN users u ON l.user_id = u.id
+    """
+    params = []
+    
+    if level_filter and level_filter != "all":
+        query += " WHERE l.level = ?"
+        params.append(level_filter)
+    
+    query += " ORDER BY l.created_at DESC LIMIT 20"
+    
+    cursor.execute(query, params)
+    logs = [tuple(log) for log in cursor.fetchall()]
+    conn.close()
+    return logs
 
 
 class SystemSettingsWidget(QWidget):
     """系統設置頁面"""
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.loader = DataLoader(self)
         self.setup_ui()
         self.load_settings()
         
@@ -189,8 +233,14 @@ class SystemSettingsWidget(QWidget):
         add_user_button.setIcon(QIcon("assets/icons/user-plus.ico"))
         add_user_button.clicked.connect(self.add_user)
         
+        # 載入中提示
+        self.users_loading_label = QLabel("載入中...")
+        self.users_loading_label.setStyleSheet("color: #95a5a6;")
+        self.users_loading_label.setVisible(False)
+        
         header_layout.addWidget(header_label)
         header_layout.addStretch()
+        header_layout.addWidget(self.users_loading_label)
         header_layout.addWidget(add_user_button)
         
         users_layout.addLayout(header_layout)
@@ -296,8 +346,14 @@ class SystemSettingsWidget(QWidget):
         level_combo.addItems(["所有級別", "信息", "警告", "錯誤", "嚴重錯誤"])
         level_combo.currentIndexChanged.connect(self.filter_logs)
         
+        # 載入中提示
+        self.logs_loading_label = QLabel("載入中...")
+        self.logs_loading_label.setStyleSheet("color: #95a5a6;")
+        self.logs_loading_label.setVisible(False)
+        
         header_layout.addWidget(header_label)
         header_layout.addStretch()
+        header_layout.addWidget(self.logs_loading_label)
         header_layout.addWidget(QLabel("日誌級別:"))
         header_layout.addWidget(level_combo)
         
@@ -376,20 +432,16 @@ class SystemSettingsWidget(QWidget):
         self.load_logs()
     
     def load_users(self):
-        """載入用戶列表"""
-        # 從資料庫獲取用戶
-        db = DatabaseManager()
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, username, name, email, role, status
-            FROM users
-            ORDER BY id ASC
-        """)
-        
-        users = cursor.fetchall()
-        conn.close()
+        """載入用戶列表（背景執行，完成後更新畫面）"""
+        self.users_loading_label.setVisible(True)
+        self.loader.request('users', fetch_users,
+                            callback=self.populate_users,
+                            error_callback=lambda message: self.users_loading_label.setText(f"載入失敗：{message}"))
+    
+    def populate_users(self, users):
+        """將載入的用戶填入表格"""
+        self.users_loading_label.setVisible(False)
+        self.users_loading_label.setText("載入中...")
         
         # 填充用戶表格
         self.users_table.setRowCount(len(users))
@@ -430,23 +482,17 @@ class SystemSettingsWidget(QWidget):
             
             self.users_table.setCellWidget(i, 5, operations_widget)
     
-    def load_logs(self):
-        """載入系統日誌"""
-        # 從資料庫獲取日誌
-        db = DatabaseManager()
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT l.id, l.level, l.message, l.created_at, u.username
-            FROM system_logs l
-            LEFT JOIN users u ON l.user_id = u.id
-            ORDER BY l.created_at DESC
-            LIMIT 20
-        """)
-        
-        logs = cursor.fetchall()
-        conn.close()
+    def load_logs(self, level_filter=None):
+        """載入系統日誌（背景執行，完成後更新畫面）"""
+        self.logs_loading_label.setVisible(True)
+        self.loader.request('logs', fetch_logs, level_filter,
+                            callback=self.populate_logs,
+                            error_callback=lambda message: self.logs_loading_label.setText(f"載入失敗：{message}"))
+    
+    def populate_logs(self, logs):
+        """將載入的日誌填入表格"""
+        self.logs_loading_label.setVisible(False)
+        self.logs_loading_label.setText("載入中...")
         
         # 填充日誌表格
         self.logs_table.setRowCount(len(logs))
@@ -519,21 +565,15 @@ class SystemSettingsWidget(QWidget):
         }
         
         db = DatabaseManager()
-        conn = db.get_connection()
-        cursor = conn.cursor()
+        password_hash = db.hash_password(new_user['password'])
         
-        try:
-            # 查詢用戶名是否已存在
-            cursor.execute("SELECT id FROM users WHERE username = ?", (new_user['username'],))
-            if cursor.fetchone():
-                QMessageBox.warning(self, "添加失敗", f"用戶名 '{new_user['username']}' 已存在")
-                conn.close()
-                return
+        def insert_user(conn):
+            # 查詢用戶名是否已存在（在寫入交易中檢查，避免同時新增相同用戶名）
+            if conn.execute("SELECT id FROM users WHERE username = ?", (new_user['username'],)).fetchone():
+                return False
             
             # 插入新用戶
-            password_hash = db.hash_password(new_user['password'])
-            
-            cursor.execute("""
+            conn.execute("""
                 INSERT INTO users (username, password, name, email, role, status)
                 VALUES (?, ?, ?, ?, ?, ?)
             """, (
@@ -544,8 +584,12 @@ class SystemSettingsWidget(QWidget):
                 new_user['role'],
                 new_user['status']
             ))
-            
-            conn.commit()
+            return True
+        
+        try:
+            if not db.write(insert_user):
+                QMessageBox.warning(self, "添加失敗", f"用戶名 '{new_user['username']}' 已存在")
+                return
             
             # 重新載入用戶列表
             self.load_users()
@@ -553,11 +597,7 @@ class SystemSettingsWidget(QWidget):
             QMessageBox.information(self, "添加成功", f"已成功添加用戶 '{new_user['username']}'")
             
         except Exception as e:
-            conn.rollback()
             QMessageBox.critical(self, "添加失敗", f"添加用戶時發生錯誤：{str(e)}")
-            
-        finally:
-            conn.close()
     
     def edit_user(self, user_id):
         """編輯用戶"""
@@ -572,37 +612,25 @@ class SystemSettingsWidget(QWidget):
         )
         
         if confirm == QMessageBox.Yes:
-            db = DatabaseManager()
-            conn = db.get_connection()
-            cursor = conn.cursor()
+            def delete(conn):
+                # 獲取用戶資訊並刪除用戶，回傳用戶名（用戶不存在時回傳 None）
+                user = conn.execute("DELETE FROM users WHERE id = ? RETURNING username", (user_id,)).fetchone()
+                return user[0] if user else None
             
             try:
-                # 獲取用戶資訊
-                cursor.execute("SELECT username FROM users WHERE id = ?", (user_id,))
-                user = cursor.fetchone()
+                username = DatabaseManager().write(delete)
                 
-                if not user:
+                if not username:
                     QMessageBox.warning(self, "刪除失敗", "未找到指定用戶")
-                    conn.close()
                     return
                 
-                username = user[0]
-                
-                # 刪除用戶
-                cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
-                conn.commit()
-                
                 # 重新載入用戶列表
                 self.load_users()
                 
                 QMessageBox.information(self, "刪除成功", f"已成功刪除用戶 '{username}'")
                 
             except Exception as e:
-                conn.rollback()
                 QMessageBox.critical(self, "刪除失敗", f"刪除用戶時發生錯誤：{str(e)}")
-                
-            finally:
-                conn.close()
     
     def save_permissions(self):
         """保存權限設置"""
@@ -629,52 +657,7 @@ class SystemSettingsWidget(QWidget):
         level_filter = ["all", "info", "warning", "error", "critical"][index]
         
         # 重新載入日誌並應用過濾
-        db = DatabaseManager()
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        
-        query = """
-            SELECT l.id, l.level, l.message, l.created_at, u.username
-            FROM system_logs l
-            LEFT JOIN users u ON l.user_id = u.id
-        """
-        params = []
-        
-        if level_filter != "all":
-            query += " WHERE l.level = ?"
-            params.append(level_filter)
-        
-        query += " ORDER BY l.created_at DESC LIMIT 20"
-        
-        cursor.execute(query, params)
-        logs = cursor.fetchall()
-        conn.close()
-        
-        # 填充日誌表格
-        self.logs_table.setRowCount(len(logs))
-        
-        for i, log in enumerate(logs):
-            self.logs_table.setItem(i, 0, QTableWidgetItem(log[3]))
-            
-            # 日誌級別
-            level_cell = QTableWidgetItem(log[1])
-            if log[1] == 'error':
-                level_cell.setText("錯誤")
-                level_cell.setBackground(Qt.red)
-            elif log[1] == 'warning':
-                level_cell.setText("警告")
-                level_cell.setBackground(Qt.yellow)
-            elif log[1] == 'info':
-                level_cell.setText("信息")
-                level_cell.setBackground(Qt.green)
-            else:
-                level_cell.setText(log[1])
-            
-            self.logs_table.setItem(i, 1, level_cell)
-            
-            # 用戶和訊息
-            self.logs_table.setItem(i, 2, QTableWidgetItem(log[4] or "系統"))
-            self.logs_table.setItem(i, 3, QTableWidgetItem(log[2]))
+        self.load_logs(level_filter)
     
     def clear_logs(self):
         """清除系統日誌"""
@@ -684,14 +667,9 @@ class SystemSettingsWidget(QWidget):
         )
         
         if confirm == QMessageBox.Yes:
-            db = DatabaseManager()
-            conn = db.get_connection()
-            cursor = conn.cursor()
-            
             try:
                 # 清除日誌表
-                cursor.execute("DELETE FROM system_logs")
-                conn.commit()
+                DatabaseManager().write(lambda conn: conn.execute("DELETE FROM system_logs").rowcount)
                 
                 # 重新載入日誌列表
                 self.load_logs()
@@ -699,11 +677,7 @@ class SystemSettingsWidget(QWidget):
                 QMessageBox.information(self, "清除成功", "系統日誌已成功清除")
                 
             except Exception as e:
-                conn.rollback()
                 QMessageBox.critical(self, "清除失敗", f"清除日誌時發生錯誤：{str(e)}")
-                
-            finally:
-                conn.close()
     
     def export_logs(self):
         """導出系統日誌"""
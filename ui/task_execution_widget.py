@@ -1,111 +1,93 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                                QFrame, QProgressBar, QPushButton, QTabWidget,
-                               QTableWidget, QTableWidgetItem, QHeaderView, QFormLayout, QMessageBox)
+                               QTableWidget, QTableWidgetItem, QHeaderView, QFormLayout, QMessageBox,
+                               QListView, QAbstractItemView, QDialog)
 from PySide6.QtCore import Qt, QTimer
 from PySide6.QtGui import QIcon
+from datetime import datetime, timezone
 from utils.db import DatabaseManager
+from utils.data_loader import DataLoader
+from utils.task_event_bridge import TaskEventBridge
+from ui.add_task_dialog import AddTaskDialog
+from ui.task_list_model import TaskListModel, TaskCardDelegate, fetch_task
+from modules.step_stats import StepStatistics, format_eta
+from modules.cancellation import request_cancellation
 
-class TaskCard(QFrame):
-    """任務卡片組件"""
-    def __init__(self, task_data, parent=None):
-        super().__init__(parent)
-        self.task_data = task_data
-        self.setObjectName("task-card")
-        self.setFrameShape(QFrame.StyledPanel)
-        self.setStyleSheet("border: 1px solid #eee; border-radius: 5px; padding: 15px; margin-bottom: 15px;")
-        self.setup_ui()
-    
-    def setup_ui(self):
-        """設置任務卡片UI"""
-        layout = QVBoxLayout(self)
-        
-        # 任務標題和狀態
-        header_layout = QHBoxLayout()
-        
-        title_label = QLabel(self.task_data['name'])
-        title_label.setStyleSheet("font-weight: bold; font-size: 16px;")
-        
-        status_label = QLabel()
-        if self.task_data['status'] == 'completed':
-            status_label.setText("已完成")
-            status_label.setStyleSheet("background-color: #27ae60; color: white; padding: 2px 8px; border-radius: 10px;")
-        elif self.task_data['status'] == 'processing':
-            status_label.setText("處理中")
-            status_label.setStyleSheet("background-color: #f39c12; color: white; padding: 2px 8px; border-radius: 10px;")
-        elif self.task_data['status'] == 'failed':
-            status_label.setText("失敗")
-            status_label.setStyleSheet("background-color: #e74c3c; color: white; padding: 2px 8px; border-radius: 10px;")
-        elif self.task_data['status'] == 'pending':
-            status_label.setText("等待中")
-            status_label.setStyleSheet("background-color: #95a5a6; color: white; padding: 2px 8px; border-radius: 10px;")
-        
-        header_layout.addWidget(title_label)
-        header_layout.addStretch()
-        header_layout.addWidget(status_label)
-        
-        layout.addLayout(header_layout)
-        
-        # 任務時間信息
-        time_label = QLabel(f"開始時間: {self.task_data['started_at'] or 'N/A'} | 預計完成: {self.task_data['estimated_completion'] or 'N/A'}")
-        time_label.setStyleSheet("color: #95a5a6; font-size: 12px;")
-        layout.addWidget(time_label)
-        
-        # 進度條
-        self.progress_bar = QProgressBar()
-        self.progress_bar.setRange(0, 100)
-        self.progress_bar.setValue(int(self.task_data['progress']))
-        self.progress_bar.setTextVisible(False)
-        layout.addWidget(self.progress_bar)
-        
-        # 進度信息
-        progress_layout = QHBoxLayout()
-        
-        progress_percent = QLabel(f"{int(self.task_data['progress'])}% 完成")
-        
-        steps_label = QLabel(f"處理步驟: {self.task_data['current_step']}/{self.task_data['total_steps']}")
-        steps_label.setAlignment(Qt.AlignRight)
-        
-        progress_layout.addWidget(progress_percent)
-        progress_layout.addStretch()
-        progress_layout.addWidget(steps_label)
-        
-        layout.addLayout(progress_layout)
-        
-        # 操作按鈕
-        buttons_layout = QHBoxLayout()
-        buttons_layout.setContentsMargins(0, 10, 0, 0)
-        
-        if self.task_data['status'] == 'processing':
-            stop_button = QPushButton("停止")
-            stop_button.setObjectName("btn-danger")
-            stop_button.setProperty("task_id", self.task_data['id'])
-            buttons_layout.addWidget(stop_button)
-        
-        if self.task_data['status'] == 'failed':
-            retry_button = QPushButton("重試")
-            retry_button.setObjectName("btn-warning")
-            retry_button.setProperty("task_id", self.task_data['id'])
-            buttons_layout.addWidget(retry_button)
-        
-        details_button = QPushButton("查看詳情")
-        details_button.setProperty("task_id", self.task_data['id'])
-        
-        buttons_layout.addStretch()
-        buttons_layout.addWidget(details_button)
+
+def format_ms(value):
+    """格式化毫秒數"""
+    if value is None:
+        return "-"
+    if value < 1000:
+        return f"{value:.0f} 毫秒"
+    if value < 60000:
+        return f"{value / 1000:.1f}秒"
+    return f"{int(value // 60000)}分{int(value % 60000 / 1000)}秒"
+
+
+def format_bytes(value):
+    """格式化位元組數"""
+    if value is None:
+        return "-"
+    if value < 1024:
+        return f"{value} B"
+    for unit in ("KB", "MB", "GB"):
+        value /= 1024
+        if value < 1024 or unit == "GB":
+            return f"{value:.1f} {unit}"
+
+
+def format_count(value):
+    return "-" if value is None else f"{value:,}"
+
+
+def fetch_task_details(task_id):
+    """查詢任務詳情、步驟與預估剩餘秒數（在背景執行緒執行），任務不存在時回傳 None"""
+    db = DatabaseManager()
+    with db.connection() as conn:
+        task = conn.execute("""
+            SELECT t.id, t.name, t.priority, t.status, t.progress, t.started_at, t.completed_at,
+                   f.name as file_name, p.name as config_name
+            FROM tasks t
+            LEFT JOIN files f ON t.file_id = f.id
+            LEFT JOIN process_configs p ON t.config_id = p.id
+            WHERE t.id = ?
+        """, (task_id,)).fetchone()
+        if not task:
+            return None
         
-        layout.addLayout(buttons_layout)
+        steps = conn.execute("""
+            SELECT id, order_num, name, description, status, duration, cache_hit,
+                   wall_ms, cpu_ms, peak_rss_bytes, tracemalloc_peak_bytes,
+                   rows_in, rows_out, bytes_read, bytes_written, profile_path
+            FROM task_steps
+            WHERE task_id = ?
+            ORDER BY order_num
+        """, (task_id,)).fetchall()
+    
+    eta_seconds = StepStatistics(db).estimate_remaining(task_id) if task[3] == 'processing' else None
+    return tuple(task), [tuple(step) for step in steps], eta_seconds
+
 
 class TaskExecutionWidget(QWidget):
     """任務執行頁面"""
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.loader = DataLoader(self)
         self.setup_ui()
         self.load_tasks()
         
-        # 定時更新任務狀態
-        self.update_timer = QTimer(self)
-        self.update_timer.timeout.connect(self.update_task_status)
-        self.update_timer.start(5000)  # 每5秒更新一次
+        # 任務引擎推送狀態與進度事件，只更新受影響的卡片
+        self.events = TaskEventBridge(self)
+        self.events.task_status_changed.connect(self.task_status_changed)
+        self.events.task_progress_changed.connect(self.task_progress_changed)
+        self.events.task_steps_changed.connect(self.task_steps_changed)
+        
+        # 任務詳情在短時間內多次變動時合併為一次刷新
+        self.details_timer = QTimer(self)
+        self.details_timer.setSingleShot(True)
+        self.details_timer.setInterval(250)
+        self.details_timer.timeout.connect(self.refresh_task_details)
         
     def setup_ui(self):
         """設置任務執行UI"""
@@ -135,59 +117,37 @@ class TaskExecutionWidget(QWidget):
         add_task_button.setCursor(Qt.PointingHandCursor)
         add_task_button.clicked.connect(self.show_add_task_dialog)
         
+        # 載入中提示
+        self.loading_label = QLabel("載入中...")
+        self.loading_label.setStyleSheet("color: #95a5a6;")
+        self.loading_label.setVisible(False)
+        
         header_layout.addWidget(header_label)
         header_layout.addStretch()
+        header_layout.addWidget(self.loading_label)
         header_layout.addWidget(add_task_button)
         tasks_layout.addLayout(header_layout)
         
         # 標籤頁
         self.tab_widget = QTabWidget()
         
-        # 進行中標籤頁
-        self.processing_tab = QWidget()
-        processing_layout = QVBoxLayout(self.processing_tab)
-        
-        self.processing_content = QWidget()
-        self.processing_content_layout = QVBoxLayout(self.processing_content)
-        self.processing_content_layout.setAlignment(Qt.AlignTop)
-        
-        processing_layout.addWidget(self.processing_content)
-        
-        # 已完成標籤頁
-        self.completed_tab = QWidget()
-        completed_layout = QVBoxLayout(self.completed_tab)
-        
-        self.completed_content = QWidget()
-        self.completed_content_layout = QVBoxLayout(self.completed_content)
-        self.completed_content_layout.setAlignment(Qt.AlignTop)
+        # 所有標籤頁共用同一個卡片委派
+        self.task_delegate = TaskCardDelegate(self)
+        self.task_delegate.details_requested.connect(self.show_task_details)
+        self.task_delegate.stop_requested.connect(self.stop_task)
         
-        completed_layout.addWidget(self.completed_content)
+        # 每個標籤頁各有一個按狀態分頁載入的任務模型
+        self.task_models = {}
+        self.task_views = {}
         
-        # 計劃中標籤頁
-        self.pending_tab = QWidget()
-        pending_layout = QVBoxLayout(self.pending_tab)
-        
-        self.pending_content = QWidget()
-        self.pending_content_layout = QVBoxLayout(self.pending_content)
-        self.pending_content_layout.setAlignment(Qt.AlignTop)
-        
-        pending_layout.addWidget(self.pending_content)
-        
-        # 失敗標籤頁
-        self.failed_tab = QWidget()
-        failed_layout = QVBoxLayout(self.failed_tab)
-        
-        self.failed_content = QWidget()
-        self.failed_content_layout = QVBoxLayout(self.failed_content)
-        self.failed_content_layout.setAlignment(Qt.AlignTop)
-        
-        failed_layout.addWidget(self.failed_content)
-        
-        # 添加標籤頁
-        self.tab_widget.addTab(self.processing_tab, "進行中")
-        self.tab_widget.addTab(self.completed_tab, "已完成")
-        self.tab_widget.addTab(self.pending_tab, "計劃中")
-        self.tab_widget.addTab(self.failed_tab, "失敗")
+        for status, title in [('processing', "進行中"), ('completed', "已完成"),
+                              ('pending', "計劃中"), ('failed', "失敗"), ('cancelled', "已停止")]:
+            model = TaskListModel(status, self.loader, self.estimate_completion_time, self)
+            view = self.create_task_view(model)
+            
+            self.task_models[status] = model
+            self.task_views[status] = view
+            self.tab_widget.addTab(view, title)
         
         tasks_layout.addWidget(self.tab_widget)
         layout.addWidget(tasks_frame)
@@ -249,8 +209,9 @@ class TaskExecutionWidget(QWidget):
         
         # 處理步驟表格
         self.steps_table = QTableWidget()
-        self.steps_table.setColumnCount(4)
-        self.steps_table.setHorizontalHeaderLabels(["步驟", "描述", "狀態", "用時"])
+        self.steps_table.setColumnCount(8)
+        self.steps_table.setHorizontalHeaderLabels(["步驟", "描述", "狀態", "用時", "CPU 時間", "峰值記憶體",
+                                                    "列數（入/出）", "讀取/寫入"])
         self.steps_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.steps_table.verticalHeader().setVisible(False)
         self.steps_table.setEditTriggers(QTableWidget.NoEditTriggers)
@@ -265,6 +226,7 @@ class TaskExecutionWidget(QWidget):
         self.stop_task_button = QPushButton("停止任務")
         self.stop_task_button.setObjectName("btn-danger")
         self.stop_task_button.setVisible(False)
+        self.stop_task_button.clicked.connect(self.stop_current_task)
         
         self.refresh_button = QPushButton("刷新狀態")
         
@@ -278,136 +240,41 @@ class TaskExecutionWidget(QWidget):
         # 連接信號
         self.tab_widget.currentChanged.connect(self.tab_changed)
         self.refresh_button.clicked.connect(self.refresh_task_details)
+        self.loader.loading_changed.connect(self.update_loading_state)
+    
+    def create_task_view(self, model):
+        """創建虛擬化的任務列表視圖"""
+        view = QListView()
+        view.setModel(model)
+        view.setItemDelegate(self.task_delegate)
+        view.setUniformItemSizes(True)  # 所有卡片同高，視圖不需逐列計算尺寸
+        view.setLayoutMode(QListView.Batched)
+        view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        view.setSelectionMode(QAbstractItemView.SingleSelection)
+        view.setFrameShape(QFrame.NoFrame)
+        view.clicked.connect(lambda index: self.show_task_details(index.data(TaskListModel.TaskIdRole)))
+        return view
+    
+    def update_loading_state(self, key, loading):
+        """根據背景載入狀態顯示或隱藏載入提示"""
+        self.loading_label.setVisible(self.loader.is_busy())
         
     def load_tasks(self):
-        """載入任務列表"""
-        # 清空所有任務列表
-        self.clear_layouts()
-        
-        # 從資料庫獲取任務
-        db = DatabaseManager()
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        
-        # 獲取所有任務
-        cursor.execute("""
-            SELECT t.id, t.name, t.priority, t.status, t.progress, t.started_at, t.completed_at,
-                   f.name as file_name, p.name as config_name
-            FROM tasks t
-            LEFT JOIN files f ON t.file_id = f.id
-            LEFT JOIN process_configs p ON t.config_id = p.id
-            ORDER BY 
-                CASE 
-                    WHEN t.status = 'processing' THEN 1
-                    WHEN t.status = 'pending' THEN 2
-                    WHEN t.status = 'failed' THEN 3
-                    WHEN t.status = 'completed' THEN 4
-                END,
-                t.started_at DESC
-        """)
-        
-        tasks = cursor.fetchall()
-        
-        # 按狀態分類任務
-        processing_tasks = []
-        completed_tasks = []
-        pending_tasks = []
-        failed_tasks = []
-        
-        for task in tasks:
-            # 獲取任務步驟信息
-            cursor.execute("""
-                SELECT COUNT(*) FROM task_steps
-                WHERE task_id = ?
-            """, (task[0],))
-            
-            total_steps = cursor.fetchone()[0] or 4  # 默認4個步驟
-            
-            cursor.execute("""
-                SELECT COUNT(*) FROM task_steps
-                WHERE task_id = ? AND status = 'completed'
-            """, (task[0],))
-            
-            completed_steps = cursor.fetchone()[0] or 0
-            
-            # 構建任務數據
-            task_data = {
-                'id': task[0],
-                'name': task[1],
-                'priority': task[2],
-                'status': task[3],
-                'progress': task[4] or 0,
-                'started_at': task[5],
-                'completed_at': task[6],
-                'file_name': task[7],
-                'config_name': task[8],
-                'current_step': completed_steps + (1 if task[3] == 'processing' else 0),
-                'total_steps': total_steps,
-                'estimated_completion': self.estimate_completion_time(task[5], task[4], task[6])
-            }
-            
-            # 按狀態添加到相應列表
-            if task[3] == 'processing':
-                processing_tasks.append(task_data)
-            elif task[3] == 'completed':
-                completed_tasks.append(task_data)
-            elif task[3] == 'pending':
-                pending_tasks.append(task_data)
-            elif task[3] == 'failed':
-                failed_tasks.append(task_data)
-        
-        conn.close()
-        
-        # 添加任務卡片到相應標籤頁
-        for task_data in processing_tasks:
-            task_card = TaskCard(task_data)
-            task_card.clicked.connect(lambda _, id=task_data['id']: self.show_task_details(id))
-            self.processing_content_layout.addWidget(task_card)
-        
-        for task_data in completed_tasks:
-            task_card = TaskCard(task_data)
-            task_card.clicked.connect(lambda _, id=task_data['id']: self.show_task_details(id))
-            self.completed_content_layout.addWidget(task_card)
-        
-        for task_data in pending_tasks:
-            task_card = TaskCard(task_data)
-            task_card.clicked.connect(lambda _, id=task_data['id']: self.show_task_details(id))
-            self.pending_content_layout.addWidget(task_card)
-        
-        for task_data in failed_tasks:
-            task_card = TaskCard(task_data)
-            task_card.clicked.connect(lambda _, id=task_data['id']: self.show_task_details(id))
-            self.failed_content_layout.addWidget(task_card)
+        """載入任務列表（各標籤頁重新載入第一頁，其餘頁面捲動時才載入）"""
+        for model in self.task_models.values():
+            model.refresh()
     
-    def clear_layouts(self):
-        """清空任務列表布局"""
-        # 清空進行中任務
-        while self.processing_content_layout.count():
-            item = self.processing_content_layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
-        
-        # 清空已完成任務
-        while self.completed_content_layout.count():
-            item = self.completed_content_layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
-        
-        # 清空計劃中任務
-        while self.pending_content_layout.count():
-            item = self.pending_content_layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
-        
-        # 清空失敗任務
-        while self.failed_content_layout.count():
-            item = self.failed_content_layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
+    def reload_task(self, task_id):
+        """重新載入單一任務，只更新受影響的卡片"""
+        self.loader.request(f"task-{task_id}", fetch_task, task_id,
+                            callback=self.apply_task_update)
+    
+    def apply_task_update(self, task):
+        """將單一任務的最新狀態套用到各標籤頁"""
+        if task is None:
+            return
+        for model in self.task_models.values():
+            model.apply_task(task)
     
     def tab_changed(self, index):
         """標籤頁切換時調用"""
@@ -415,29 +282,21 @@ class TaskExecutionWidget(QWidget):
         pass
     
     def show_task_details(self, task_id):
-        """顯示任務詳情"""
-        # 從資料庫獲取任務詳情
-        db = DatabaseManager()
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT t.id, t.name, t.priority, t.status, t.progress, t.started_at, t.completed_at,
-                   f.name as file_name, p.name as config_name
-            FROM tasks t
-            LEFT JOIN files f ON t.file_id = f.id
-            LEFT JOIN process_configs p ON t.config_id = p.id
-            WHERE t.id = ?
-        """, (task_id,))
-        
-        task = cursor.fetchone()
-        
-        if not task:
-            conn.close()
+        """顯示任務詳情（在背景執行緒查詢，結果回到 GUI 執行緒後才更新畫面）"""
+        self.current_task_id = task_id
+        self.loader.request("task-details", fetch_task_details, task_id,
+                            callback=self.render_task_details)
+    
+    def render_task_details(self, details):
+        """以背景查詢的結果填充任務詳情"""
+        if details is None:
+            return
+        task, steps, eta_seconds = details
+        # 查詢期間已切換到其他任務
+        if task[0] != getattr(self, 'current_task_id', None):
             return
         
         # 填充任務詳情
-        self.current_task_id = task[0]
         self.task_name_label.setText(task[1])
         self.task_config_label.setText(task[8] or "未指定")
         self.task_priority_label.setText(task[2])
@@ -447,8 +306,8 @@ class TaskExecutionWidget(QWidget):
         
         self.task_progress_bar.setValue(int(task[4] or 0))
         
-        # 計算預計剩餘時間
-        estimated_completion = self.estimate_completion_time(task[5], task[4], task[6])
+        # 預計剩餘時間（每次刷新時依步驟耗時統計重新估計）
+        estimated_completion = self.estimate_completion_time(task[5], task[4], task[6], eta_seconds)
         progress_text = f"{int(task[4] or 0)}% 完成"
         
         if task[3] == 'processing' and estimated_completion:
@@ -457,117 +316,149 @@ class TaskExecutionWidget(QWidget):
         self.task_progress_label.setText(progress_text)
         
         # 設置停止按鈕可見性
-        self.stop_task_button.setVisible(task[3] == 'processing')
+        self.stop_task_button.setVisible(task[3] in ('processing', 'pending'))
         
-        # 獲取任務步驟
-        cursor.execute("""
-            SELECT id, order_num, name, description, status, duration
-            FROM task_steps
-            WHERE task_id = ?
-            ORDER BY order_num
-        """, (task_id,))
-        
-        steps = cursor.fetchall()
-        conn.close()
+        # 顯示由快取載入的步驟數
+        cache_hits = sum(1 for step in steps if step[6])
+        if cache_hits:
+            self.task_progress_label.setText(f"{progress_text} | 快取命中: {cache_hits}/{len(steps)} 個步驟")
         
         # 填充步驟表格
         self.steps_table.setRowCount(len(steps))
         
         for i, step in enumerate(steps):
             self.steps_table.setItem(i, 0, QTableWidgetItem(str(step[1])))
-            self.steps_table.setItem(i, 1, QTableWidgetItem(step[2]))
-            
+            name_cell = QTableWidgetItem(step[2])
+            if step[3]:
+                name_cell.setToolTip(step[3])
+            self.steps_table.setItem(i, 1, name_cell)
+
             # 步驟狀態
             status_cell = QTableWidgetItem()
-            if step[4] == 'completed':
+            if step[4] == 'completed' and step[6]:
+                status_cell.setText("已完成（快取）")
+                status_cell.setBackground(Qt.cyan)
+                status_cell.setToolTip("此步驟的輸出由快取載入，未重新執行")
+            elif step[4] == 'completed':
                 status_cell.setText("已完成")
                 status_cell.setBackground(Qt.green)
             elif step[4] == 'processing':
-                status_cell.setText("處理中")
+                # 讀取文件等長時間步驟會在說明中回報進度
+                status_cell.setText(f"處理中 - {step[3]}" if step[3] else "處理中")
                 status_cell.setBackground(Qt.yellow)
             elif step[4] == 'failed':
                 status_cell.setText("失敗")
                 status_cell.setBackground(Qt.red)
+            elif step[4] == 'cancelled':
+                status_cell.setText("已停止")
+                status_cell.setBackground(Qt.lightGray)
             else:
                 status_cell.setText("等待中")
             
             self.steps_table.setItem(i, 2, status_cell)
             
-            # 用時
-            duration = step[5] or "-"
-            self.steps_table.setItem(i, 3, QTableWidgetItem(str(duration)))
+            # 用時與效能量測（啟用效能分析且超過門檻時提示分析檔位置）
+            duration_cell = QTableWidgetItem(format_ms(step[7]) if step[7] is not None else str(step[5] or "-"))
+            if step[15]:
+                duration_cell.setText(f"{duration_cell.text()}（已分析）")
+                duration_cell.setToolTip(f"效能分析檔: {step[15]}")
+            self.steps_table.setItem(i, 3, duration_cell)
+            self.steps_table.setItem(i, 4, QTableWidgetItem(format_ms(step[8])))
+            memory_cell = QTableWidgetItem(format_bytes(step[9]))
+            if step[10] is not None:
+                memory_cell.setToolTip(f"Python 配置峰值（tracemalloc）: {format_bytes(step[10])}")
+            self.steps_table.setItem(i, 5, memory_cell)
+            self.steps_table.setItem(i, 6, QTableWidgetItem(f"{format_count(step[11])} / {format_count(step[12])}"))
+            self.steps_table.setItem(i, 7, QTableWidgetItem(f"{format_bytes(step[13])} / {format_bytes(step[14])}"))
     
-    def estimate_completion_time(self, started_at, progress, completed_at):
-        """估計任務完成時間"""
+    def estimate_completion_time(self, started_at, progress, completed_at, eta_seconds=None):
+        """估計任務剩餘時間
+        
+        優先使用依步驟耗時統計得到的 eta_seconds；沒有統計資料時，
+        以任務已執行時間與目前進度等比例推估。
+        """
         if completed_at:
             return "已完成"
         
+        if eta_seconds is not None:
+            return format_eta(eta_seconds)
+        
         if not started_at or progress is None or float(progress) <= 0:
             return "未知"
         
-        # 這裡應該有更複雜的邏輯來估計完成時間
-        # 簡化起見，我們返回一個固定值
-        return "25分鐘"
+        try:
+            # started_at 為 SQLite CURRENT_TIMESTAMP（UTC）
+            started = datetime.strptime(str(started_at)[:19], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+        except ValueError:
+            return "未知"
+        elapsed = (datetime.now(timezone.utc) - started).total_seconds()
+        progress = min(float(progress), 100)
+        return format_eta(max(elapsed, 0) * (100 - progress) / progress)
+    
+    def stop_current_task(self):
+        """停止目前顯示的任務"""
+        if hasattr(self, 'current_task_id'):
+            self.stop_task(self.current_task_id)
+    
+    def stop_task(self, task_id):
+        """停止任務（執行中的任務會在目前這批資料處理完後中斷）"""
+        confirm = QMessageBox.question(
+            self, "確認停止", "確定要停止此任務嗎？已處理的部分不會保留。",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+        if confirm != QMessageBox.Yes:
+            return
+        
+        try:
+            outcome = request_cancellation(DatabaseManager(), task_id)
+        except Exception as e:
+            QMessageBox.critical(self, "錯誤", f"停止任務時發生錯誤：{str(e)}")
+            return
+        
+        if outcome is None:
+            QMessageBox.information(self, "提示", "任務已經結束，無需停止")
+        self.reload_task(task_id)
+        self.refresh_task_details()
     
     def refresh_task_details(self):
         """刷新任務詳情"""
         if hasattr(self, 'current_task_id'):
             self.show_task_details(self.current_task_id)
     
-    def update_task_status(self):
-        """定時更新任務狀態"""
-        # 在實際應用中，這裡應該查詢資料庫獲取最新的任務狀態
-        # 並更新UI
-        if hasattr(self, 'current_task_id'):
-            self.refresh_task_details()
+    def schedule_details_refresh(self, task_id):
+        """目前顯示詳情的任務有變動時，延遲刷新詳情（合併短時間內的多個事件）"""
+        if getattr(self, 'current_task_id', None) == task_id and not self.details_timer.isActive():
+            self.details_timer.start()
+    
+    def task_status_changed(self, task_id, status):
+        """任務狀態轉換：重新載入該任務，使其移動到對應的標籤頁"""
+        self.reload_task(task_id)
+        self.schedule_details_refresh(task_id)
+    
+    def task_progress_changed(self, task_id, progress):
+        """任務進度變動：直接更新卡片的進度"""
+        for model in self.task_models.values():
+            model.apply_progress(task_id, progress)
+        self.schedule_details_refresh(task_id)
+    
+    def task_steps_changed(self, task_id):
+        """步驟狀態變動：步驟數顯示在卡片上，重新載入該任務"""
+        self.reload_task(task_id)
+        self.schedule_details_refresh(task_id)
     
     def show_add_task_dialog(self):
         """顯示新增任務對話框"""
-        # 在實際應用中，應該顯示一個對話框讓用戶輸入任務信息
-        # 這裡簡化處理，直接創建一個測試任務
-        
-        # 創建測試任務
-        test_task = {
-            'name': '測試任務',
-            'file_id': 1,  # 假設有一個ID為1的文件
-            'config_id': 1,  # 假設有一個ID為1的配置
-            'priority': '普通',
-            'status': 'pending'
-        }
-        
-        db = DatabaseManager()
-        conn = db.get_connection()
-        cursor = conn.cursor()
+        dialog = AddTaskDialog(self)
+        if dialog.exec() != QDialog.Accepted:
+            return
+        name, file_id, config_id, priority = dialog.task_values()
         
+        # 只建立等待中的任務；步驟由任務執行引擎依處理配置建立
         try:
-            cursor.execute("""
+            DatabaseManager().write(lambda conn: conn.execute("""
                 INSERT INTO tasks (name, file_id, config_id, priority, status, progress)
-                VALUES (?, ?, ?, ?, ?, 0)
-            """, (
-                test_task['name'],
-                test_task['file_id'],
-                test_task['config_id'],
-                test_task['priority'],
-                test_task['status']
-            ))
-            
-            task_id = cursor.lastrowid
-            
-            # 創建任務步驟
-            steps = [
-                ('數據提取', '從Excel文件中提取數據'),
-                ('數據清洗', '清理數據，處理缺失值'),
-                ('數據計算', '進行必要的計算和轉換'),
-                ('結果生成', '生成處理結果')
-            ]
-            
-            for i, (name, desc) in enumerate(steps, 1):
-                cursor.execute("""
-                    INSERT INTO task_steps (task_id, order_num, name, description, status)
-                    VALUES (?, ?, ?, ?, 'pending')
-                """, (task_id, i, name, desc))
-            
-            conn.commit()
+                VALUES (?, ?, ?, ?, 'pending', 0)
+            """, (name, file_id, config_id, priority)).lastrowid)
             
             # 重新載入任務列表
             self.load_tasks()
@@ -578,8 +469,4 @@ class TaskExecutionWidget(QWidget):
             QMessageBox.information(self, "任務創建成功", "已成功創建新任務")
             
         except Exception as e:
-            conn.rollback()
-            QMessageBox.critical(self, "任務創建失敗", f"創建任務時發生錯誤：{str(e)}")
-        
-        finally:
-            conn.close()
\ No newline at end of file
+            QMessageBox.critical(self, "任務創建失敗", f"創建任務時發生錯誤：{str(e)}")
\ No newline at end of file
@@ -0,0 +1,333 @@
+from PySide6.QtWidgets import QStyledItemDelegate, QStyle
+from PySide6.QtCore import (Qt, QAbstractListModel, QModelIndex, QRect, QSize,
+                            QEvent, Signal)
+from PySide6.QtGui import QColor, QPen, QFont, QFontMetrics
+from modules.task_repository import TaskRepository
+from modules.step_stats import StepStatistics
+
+
+def prepare_task(task):
+    """補齊任務卡片顯示所需的欄位"""
+    task.progress = task.progress or 0
+    # 步驟在任務開始執行時才依處理配置建立，等待中的任務顯示實際的 0 個步驟
+    task.total_steps = task.total_steps or 0
+    task.current_step = min(task.completed_steps + (1 if task.status == 'processing' else 0), task.total_steps)
+    return task
+
+
+def fill_eta(tasks):
+    """依步驟耗時統計補上執行中任務的預估剩餘秒數（沒有統計資料時為 None）
+
+    整頁任務以一次批次查詢計算，不為每個任務各自查詢。
+    """
+    processing = [task.id for task in tasks if task.status == 'processing']
+    if processing:
+        estimates = StepStatistics().estimate_remaining_many(processing)
+        for task in tasks:
+            task.eta_seconds = estimates.get(task.id)
+    return tasks
+
+
+def fetch_task_page(status, limit, offset):
+    """查詢一頁任務（在背景執行緒執行）"""
+    return fill_eta([prepare_task(task) for task in TaskRepository().list_tasks(status, limit, offset)])
+
+
+def fetch_task(task_id):
+    """查詢單一任務（在背景執行緒執行）"""
+    task = TaskRepository().get_task(task_id)
+    return fill_eta([prepare_task(task)])[0] if task else None
+
+
+class TaskListModel(QAbstractListModel):
+    """單一狀態的任務列表模型
+
+    任務以分頁方式從背景執行緒載入，視圖捲動到底時透過 canFetchMore/fetchMore
+    才載入下一頁；單一任務變動時只更新該列，不重建整個列表。
+    """
+
+    TaskRole = Qt.UserRole + 1
+    TaskIdRole = Qt.UserRole + 2
+
+    PAGE_SIZE = 100
+
+    def __init__(self, status, loader, estimator=None, parent=None):
+        super().__init__(parent)
+        self.status = status
+        self.loader = loader
+        self.estimator = estimator
+        self.key = f"task-page-{status}"
+        self._tasks = []
+        self._rows_by_id = {}
+        self._fetching = False
+        self._exhausted = True
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._tasks)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._tasks):
+            return None
+        task = self._tasks[index.row()]
+        if role == Qt.DisplayRole:
+            return task.name
+        if role == self.TaskRole:
+            return task
+        if role == self.TaskIdRole:
+            return task.id
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return not self._exhausted and not self._fetching
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self.canFetchMore():
+            return
+        self._request_page(len(self._tasks))
+
+    def refresh(self):
+        """重新載入第一頁（舊資料在新資料到達前保持顯示）"""
+        self._request_page(0)
+
+    def task_at(self, row):
+        if 0 <= row < len(self._tasks):
+            return self._tasks[row]
+        return None
+
+    def apply_task(self, task):
+        """套用單一任務的最新狀態，只變動受影響的列"""
+        row = self._rows_by_id.get(task.id)
+        belongs = task.status == self.status
+
+        if row is not None and belongs:
+            self._tasks[row] = self._with_estimate(task)
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+        elif row is not None:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._tasks[row]
+            self._rebuild_row_index()
+            self.endRemoveRows()
+        elif belongs:
+            # 新進入此狀態的任務通常是最新開始的，放在最上方
+            self.beginInsertRows(QModelIndex(), 0, 0)
+            self._tasks.insert(0, self._with_estimate(task))
+            self._rebuild_row_index()
+            self.endInsertRows()
+
+    def apply_progress(self, task_id, progress):
+        """更新任務進度（不重新查詢資料庫），回傳任務是否在此列表中"""
+        row = self._rows_by_id.get(task_id)
+        if row is None:
+            return False
+        task = self._tasks[row]
+        if task.progress == progress:
+            return True
+        task.progress = progress
+        self._with_estimate(task)
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+        return True
+
+    def remove_task(self, task_id):
+        """移除指定任務"""
+        row = self._rows_by_id.get(task_id)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._tasks[row]
+        self._rebuild_row_index()
+        self.endRemoveRows()
+
+    def _request_page(self, offset):
+        self._fetching = True
+        self.loader.request(self.key, fetch_task_page, self.status, self.PAGE_SIZE, offset,
+                            callback=lambda tasks, offset=offset: self._page_loaded(offset, tasks),
+                            error_callback=self._page_failed)
+
+    def _page_loaded(self, offset, tasks):
+        self._fetching = False
+        self._exhausted = len(tasks) < self.PAGE_SIZE
+        tasks = [self._with_estimate(task) for task in tasks]
+
+        if offset == 0:
+            self.beginResetModel()
+            self._tasks = tasks
+            self._rebuild_row_index()
+            self.endResetModel()
+            return
+
+        # 分頁期間若有任務移動，略過已在列表中的任務
+        tasks = [task for task in tasks if task.id not in self._rows_by_id]
+        if not tasks:
+            return
+        first = len(self._tasks)
+        self.beginInsertRows(QModelIndex(), first, first + len(tasks) - 1)
+        self._tasks.extend(tasks)
+        for row in range(first, len(self._tasks)):
+            self._rows_by_id[self._tasks[row].id] = row
+        self.endInsertRows()
+
+    def _page_failed(self, message):
+        self._fetching = False
+        print(f"載入任務列表時發生錯誤：{message}")
+
+    def _with_estimate(self, task):
+        if self.estimator:
+            task.estimated_completion = self.estimator(
+                task.started_at, task.progress, task.completed_at, task.eta_seconds)
+        return task
+
+    def _rebuild_row_index(self):
+        self._rows_by_id = {task.id: row for row, task in enumerate(self._tasks)}
+
+
+class TaskCardDelegate(QStyledItemDelegate):
+    """以繪製方式呈現任務卡片的委派，不為每個任務建立子元件"""
+
+    stop_requested = Signal(int)
+    retry_requested = Signal(int)
+    details_requested = Signal(int)
+
+    CARD_HEIGHT = 140
+    MARGIN = 6
+    PADDING = 14
+    BUTTON_HEIGHT = 26
+
+    STATUS_STYLES = {
+        'completed': ("已完成", "#27ae60"),
+        'processing': ("處理中", "#f39c12"),
+        'failed': ("失敗", "#e74c3c"),
+        'pending': ("等待中", "#95a5a6"),
+        'cancelled': ("已停止", "#7f8c8d"),
+    }
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.CARD_HEIGHT)
+
+    def _card_rect(self, option):
+        return option.rect.adjusted(self.MARGIN, self.MARGIN, -self.MARGIN, -self.MARGIN)
+
+    def _buttons(self, task):
+        """依任務狀態決定可用的按鈕"""
+        buttons = []
+        if task.status in ('processing', 'pending'):
+            buttons.append(('stop', "停止", "#e74c3c"))
+        if task.status == 'failed':
+            buttons.append(('retry', "重試", "#f39c12"))
+        buttons.append(('details', "查看詳情", "#3498db"))
+        return buttons
+
+    def _button_rects(self, option, task):
+        """計算按鈕位置（由右至左排列於卡片底部）"""
+        inner = self._card_rect(option).adjusted(self.PADDING, self.PADDING, -self.PADDING, -self.PADDING)
+        fm = QFontMetrics(option.font)
+        rects = []
+        right = inner.right()
+        for action, text, color in reversed(self._buttons(task)):
+            width = fm.horizontalAdvance(text) + 24
+            rect = QRect(right - width + 1, inner.bottom() - self.BUTTON_HEIGHT + 1, width, self.BUTTON_HEIGHT)
+            rects.append((action, text, color, rect))
+            right -= width + 8
+        return rects
+
+    def paint(self, painter, option, index):
+        task = index.data(TaskListModel.TaskRole)
+        if task is None:
+            return
+
+        painter.save()
+        painter.setRenderHint(painter.RenderHint.Antialiasing)
+
+        card = self._card_rect(option)
+        inner = card.adjusted(self.PADDING, self.PADDING, -self.PADDING, -self.PADDING)
+        selected = bool(option.state & QStyle.State_Selected)
+
+        # 卡片背景與邊框
+        painter.setPen(QPen(QColor("#3498db" if selected else "#eeeeee"), 1))
+        painter.setBrush(QColor("white"))
+        painter.drawRoundedRect(card, 5, 5)
+
+        # 狀態標籤
+        status_text, status_color = self.STATUS_STYLES.get(task.status, (task.status, "#95a5a6"))
+        fm = QFontMetrics(option.font)
+        pill_width = fm.horizontalAdvance(status_text) + 16
+        pill_rect = QRect(inner.right() - pill_width + 1, inner.top(), pill_width, 20)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(status_color))
+        painter.drawRoundedRect(pill_rect, 10, 10)
+        painter.setPen(QColor("white"))
+        painter.setFont(option.font)
+        painter.drawText(pill_rect, Qt.AlignCenter, status_text)
+
+        # 任務標題
+        title_font = QFont(option.font)
+        title_font.setBold(True)
+        title_font.setPixelSize(16)
+        title_fm = QFontMetrics(title_font)
+        title_rect = QRect(inner.left(), inner.top(), inner.width() - pill_width - 10, title_fm.height())
+        painter.setFont(title_font)
+        painter.setPen(QColor("#2c3e50"))
+        painter.drawText(title_rect, Qt.AlignLeft | Qt.AlignVCenter,
+                         title_fm.elidedText(task.name, Qt.ElideRight, title_rect.width()))
+
+        # 任務時間信息
+        small_font = QFont(option.font)
+        small_font.setPixelSize(12)
+        small_fm = QFontMetrics(small_font)
+        time_rect = QRect(inner.left(), title_rect.bottom() + 6, inner.width(), small_fm.height())
+        time_text = f"開始時間: {task.started_at or 'N/A'} | 預計完成: {task.estimated_completion or 'N/A'}"
+        painter.setFont(small_font)
+        painter.setPen(QColor("#95a5a6"))
+        painter.drawText(time_rect, Qt.AlignLeft | Qt.AlignVCenter,
+                         small_fm.elidedText(time_text, Qt.ElideRight, time_rect.width()))
+
+        # 進度條
+        progress = max(0, min(100, int(task.progress)))
+        bar_rect = QRect(inner.left(), time_rect.bottom() + 8, inner.width(), 8)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor("#ecf0f1"))
+        painter.drawRoundedRect(bar_rect, 4, 4)
+        if progress > 0:
+            chunk_rect = QRect(bar_rect.left(), bar_rect.top(), int(bar_rect.width() * progress / 100), bar_rect.height())
+            painter.setBrush(QColor(status_color))
+            painter.drawRoundedRect(chunk_rect, 4, 4)
+
+        # 進度信息
+        info_rect = QRect(inner.left(), bar_rect.bottom() + 6, inner.width(), fm.height())
+        painter.setFont(option.font)
+        painter.setPen(QColor("#2c3e50"))
+        painter.drawText(info_rect, Qt.AlignLeft | Qt.AlignVCenter, f"{progress}% 完成")
+        painter.drawText(info_rect, Qt.AlignRight | Qt.AlignVCenter,
+                         f"處理步驟: {task.current_step}/{task.total_steps}")
+
+        # 操作按鈕
+        for action, text, color, rect in self._button_rects(option, task):
+            painter.setPen(QPen(QColor(color), 1))
+            painter.setBrush(Qt.NoBrush)
+            painter.drawRoundedRect(rect, 4, 4)
+            painter.setPen(QColor(color))
+            painter.drawText(rect, Qt.AlignCenter, text)
+
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        """處理卡片上按鈕的點擊"""
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            task = index.data(TaskListModel.TaskRole)
+            if task is not None:
+                pos = event.position().toPoint()
+                for action, _, _, rect in self._button_rects(option, task):
+                    if rect.contains(pos):
+                        if action == 'stop':
+                            self.stop_requested.emit(task.id)
+                        elif action == 'retry':
+                            self.retry_requested.emit(task.id)
+                        else:
+                            self.details_requested.emit(task.id)
+                        return True
+        return super().editorEvent(event, model, option, index)
@@ -0,0 +1,163 @@
+import threading
+import traceback
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+class LoadCancelled(Exception):
+    """載入請求已被取消"""
+
+
+class CancelToken:
+    """載入請求的取消標記，可傳入載入函式以便在長時間作業中途檢查"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise LoadCancelled()
+
+
+class _LoadSignals(QObject):
+    """背景工作的結果信號（QRunnable 本身無法發送信號）"""
+    finished = Signal(str, int, object)
+    failed = Signal(str, int, str)
+
+
+class _LoadJob(QRunnable):
+    """在執行緒池中執行的單一載入工作"""
+
+    def __init__(self, key, generation, func, args, kwargs, token, started):
+        super().__init__()
+        self.key = key
+        self.generation = generation
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.token = token
+        # 開始執行後設定；執行完畢的工作會被自動刪除，不能再呼叫 tryTake
+        self.started = started
+        self.signals = _LoadSignals()
+        self.setAutoDelete(True)
+
+    def run(self):
+        self.started.set()
+        if self.token.cancelled:
+            return
+        try:
+            result = self.func(*self.args, **self.kwargs)
+        except LoadCancelled:
+            return
+        except Exception as e:
+            traceback.print_exc()
+            if not self.token.cancelled:
+                self.signals.failed.emit(self.key, self.generation, str(e))
+            return
+        if not self.token.cancelled:
+            self.signals.finished.emit(self.key, self.generation, result)
+
+
+class DataLoader(QObject):
+    """背景資料載入服務
+
+    以 key 區分不同的載入請求（例如 "tasks"、"logs"）。同一個 key 發出新請求時，
+    舊請求會被取消；即使舊請求已經在執行，它的結果也會因為世代編號過期而被丟棄，
+    因此畫面只會顯示最新一次請求的結果。回呼函式一律在 GUI 執行緒中執行。
+    """
+
+    loading_changed = Signal(str, bool)
+
+    def __init__(self, parent=None, thread_pool=None):
+        super().__init__(parent)
+        self.thread_pool = thread_pool or QThreadPool.globalInstance()
+        self._generations = {}
+        self._pending = {}
+
+    def request(self, key, func, *args, callback=None, error_callback=None,
+                pass_token=False, **kwargs):
+        """發出載入請求，回傳取消標記
+
+        func 在背景執行緒中執行，不可觸碰任何 Qt 元件；
+        pass_token 為 True 時會以 token 關鍵字參數傳入 CancelToken。
+        """
+        self.cancel(key)
+
+        generation = self._generations.get(key, 0) + 1
+        self._generations[key] = generation
+
+        token = CancelToken()
+        if pass_token:
+            kwargs['token'] = token
+
+        started = threading.Event()
+        job = _LoadJob(key, generation, func, args, kwargs, token, started)
+        job.signals.finished.connect(self._on_finished)
+        job.signals.failed.connect(self._on_failed)
+
+        self._pending[key] = (job, started, token, callback, error_callback)
+        self.loading_changed.emit(key, True)
+        self.thread_pool.start(job)
+        return token
+
+    def cancel(self, key):
+        """取消指定 key 尚未完成的請求"""
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        job, started, token, _, _ = pending
+        token.cancel()
+        # 尚未開始執行的工作直接從佇列移除；已開始的工作可能已執行完畢並被刪除
+        # （結果信號仍在佇列中），只靠取消標記與世代編號丟棄結果
+        if not started.is_set():
+            try:
+                self.thread_pool.tryTake(job)
+            except RuntimeError:
+                # 檢查後才開始執行並已被刪除
+                pass
+        self.loading_changed.emit(key, False)
+
+    def cancel_all(self):
+        """取消所有尚未完成的請求"""
+        for key in list(self._pending):
+            self.cancel(key)
+
+    def is_loading(self, key):
+        return key in self._pending
+
+    def is_busy(self):
+        """是否有任何尚未完成的請求"""
+        return bool(self._pending)
+
+    def _take_current(self, key, generation):
+        """取出仍為最新世代的請求，過期的回應回傳 None"""
+        if self._generations.get(key) != generation:
+            return None
+        return self._pending.pop(key, None)
+
+    def _on_finished(self, key, generation, result):
+        pending = self._take_current(key, generation)
+        if pending is None:
+            return
+        _, _, _, callback, _ = pending
+        self.loading_changed.emit(key, False)
+        if callback:
+            callback(result)
+
+    def _on_failed(self, key, generation, message):
+        pending = self._take_current(key, generation)
+        if pending is None:
+            return
+        _, _, _, _, error_callback = pending
+        self.loading_changed.emit(key, False)
+        if error_callback:
+            error_callback(message)
+        else:
+            print(f"載入 {key} 時發生錯誤：{message}")
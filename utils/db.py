@@ -1,8 +1,432 @@
 import sqlite3
 import os
+import re
+import queue
 import hashlib
+import threading
+import weakref
+from itertools import islice
+from concurrent.futures import Future
+from contextlib import contextmanager
 from pathlib import Path
 
+# 連接建立時一次性設定的 PRAGMA
+CONNECTION_PRAGMAS = (
+    ("journal_mode", "WAL"),       # 讀寫互不阻塞，多位使用者共用同一資料庫
+    ("synchronous", "NORMAL"),     # WAL 模式下安全且明顯較快
+    ("cache_size", -20000),        # 約 20MB 頁面快取（負值單位為 KiB）
+    ("mmap_size", 268435456),      # 256MB 記憶體映射讀取
+    ("temp_store", "MEMORY"),      # 排序與暫存表放在記憶體
+)
+
+# 寫入執行緒一次合併提交的寫入操作數上限
+WRITE_BATCH_SIZE = 64
+
+# 批次寫入時每次 executemany 的列數
+BULK_CHUNK_ROWS = 5000
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class PooledConnection(sqlite3.Connection):
+    """可回收至連接池的資料庫連接
+
+    呼叫 close() 時不會真正關閉，而是歸還給所屬的連接池，
+    因此既有的 get_connection() / close() 寫法不需修改。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool = None
+
+    def close(self):
+        """歸還連接（未提交的交易會被回滾）"""
+        pool = self._pool
+        if pool is None:
+            super().close()
+            return
+        pool.release(self)
+
+    def close_physical(self):
+        """真正關閉底層連接"""
+        self._pool = None
+        super().close()
+
+
+class ConnectionPool:
+    """執行緒感知的 SQLite 連接池
+
+    每個執行緒擁有自己的閒置連接堆疊，連接不會跨執行緒共用，
+    因此可以避免 SQLite 的執行緒限制，同時省去反覆開檔與解析架構的成本。
+    """
+
+    def __init__(self, db_file, max_idle_per_thread=4, timeout=30.0):
+        self.db_file = db_file
+        self.max_idle_per_thread = max_idle_per_thread
+        self.timeout = timeout
+        self._local = threading.local()
+        self._all_connections = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _idle_stack(self):
+        stack = getattr(self._local, 'idle', None)
+        if stack is None:
+            stack = []
+            self._local.idle = stack
+        return stack
+
+    def _open(self):
+        """建立新連接並設定 PRAGMA"""
+        conn = sqlite3.connect(
+            self.db_file,
+            timeout=self.timeout,
+            factory=PooledConnection,
+            check_same_thread=False,  # 由連接池保證連接只在取得它的執行緒使用
+        )
+        conn.row_factory = sqlite3.Row  # 使查詢結果可以通過列名訪問
+        for name, value in CONNECTION_PRAGMAS:
+            conn.execute(f"PRAGMA {name} = {value}")
+        conn._pool = self
+        with self._lock:
+            self._all_connections.add(conn)
+        return conn
+
+    def acquire(self):
+        """取得一個連接，優先重用本執行緒的閒置連接"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("連接池已關閉")
+        stack = self._idle_stack()
+        if stack:
+            return stack.pop()
+        return self._open()
+
+    def release(self, conn):
+        """歸還連接至本執行緒的閒置堆疊"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close_physical()
+            return
+
+        stack = self._idle_stack()
+        if self._closed or len(stack) >= self.max_idle_per_thread or conn in stack:
+            if conn not in stack:
+                conn.close_physical()
+            return
+        stack.append(conn)
+
+    def close_all(self):
+        """關閉連接池中的所有連接（應用程式結束時呼叫）"""
+        self._closed = True
+        with self._lock:
+            connections = list(self._all_connections)
+            self._all_connections = weakref.WeakSet()
+        for conn in connections:
+            try:
+                conn.close_physical()
+            except sqlite3.Error:
+                pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_file):
+    """取得指定資料庫檔案的共用連接池"""
+    key = os.path.abspath(db_file)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = ConnectionPool(db_file)
+            _pools[key] = pool
+        return pool
+
+
+class WriteQueue:
+    """資料庫的單一寫入執行緒
+
+    寫入操作排入佇列後由專用執行緒依序執行，同一時間只有一個寫入者，
+    程式內的寫入不會互相爭奪寫入鎖。佇列中累積的多個操作（最多 batch_size 個）
+    合併在同一個交易中提交，每個操作以儲存點隔離，失敗時只回滾該操作。
+    操作為 func(conn, *args, **kwargs)，不可自行提交或回滾；
+    呼叫端取得 Future，提交後可取得 func 的回傳值或例外。
+    """
+
+    def __init__(self, db_file, batch_size=WRITE_BATCH_SIZE):
+        self.db_file = db_file
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def submit(self, func, *args, **kwargs):
+        """排入寫入操作，回傳 Future"""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("寫入佇列已關閉")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+            self._queue.put((future, func, args, kwargs))
+        return future
+
+    def close(self):
+        """處理完已排入的操作後結束寫入執行緒"""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _run(self):
+        conn = get_pool(self.db_file).acquire()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                batch = [item]
+                closing = False
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        closing = True
+                        break
+                    batch.append(item)
+                self._commit(conn, batch)
+                if closing:
+                    return
+        finally:
+            conn.close()
+
+    def _commit(self, conn, batch):
+        """在一個交易中執行一批寫入操作，提交後才設定各操作的結果"""
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for future, func, args, kwargs in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT write_op")
+                try:
+                    result = func(conn, *args, **kwargs)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write_op")
+                    conn.execute("RELEASE write_op")
+                    outcomes.append((future, None, e))
+                else:
+                    conn.execute("RELEASE write_op")
+                    outcomes.append((future, result, None))
+            conn.commit()
+        except Exception as e:
+            # 開始或提交交易失敗時，整批操作都沒有寫入
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+            for future, _, _, _ in batch:
+                if future.running():
+                    future.set_exception(e)
+            return
+
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+_write_queues = {}
+
+
+def get_write_queue(db_file):
+    """取得指定資料庫檔案的共用寫入佇列（每個程序一個寫入執行緒）"""
+    key = os.path.abspath(db_file)
+    with _pools_lock:
+        write_queue = _write_queues.get(key)
+        if write_queue is None or write_queue._closed:
+            write_queue = WriteQueue(db_file)
+            _write_queues[key] = write_queue
+        return write_queue
+
+
+def close_all_pools():
+    """關閉所有寫入佇列與連接池"""
+    with _pools_lock:
+        write_queues = list(_write_queues.values())
+        _write_queues.clear()
+        pools = list(_pools.values())
+        _pools.clear()
+    for write_queue in write_queues:
+        write_queue.close()
+    for pool in pools:
+        pool.close_all()
+
+
+def quote_identifier(name):
+    """檢查並加上引號的資料表或欄位名稱（批次寫入的名稱由呼叫端提供，不能直接拼接）"""
+    if not _IDENTIFIER.match(name or ''):
+        raise ValueError(f"不合法的資料表或欄位名稱: {name!r}")
+    return f'"{name}"'
+
+
+def _chunks(rows, size):
+    """將列（可以是產生器）依 size 分段"""
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _row_values(row, columns):
+    if isinstance(row, dict):
+        return tuple(row[column] for column in columns)
+    return tuple(row)
+
+
+def _prepend(first, rows):
+    yield first
+    yield from rows
+
+
+def _add_column_if_missing(table, column, definition):
+    """產生一個只在欄位不存在時新增欄位的遷移步驟"""
+    def step(conn):
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return step
+
+
+# 架構遷移：(版本, 說明, 步驟)，步驟可以是 SQL 字串或接收連接的函式
+# 新增遷移時只能附加在最後，不可修改已發佈的版本
+MIGRATIONS = [
+    (1, "文件與任務查詢索引", [
+        # FileManagementWidget / DashboardWidget：依狀態篩選並依上傳時間排序
+        "CREATE INDEX IF NOT EXISTS idx_files_status_created ON files(status, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_files_created ON files(created_at DESC)",
+        # TaskExecutionWidget.load_tasks：依狀態分組並依開始時間排序
+        "CREATE INDEX IF NOT EXISTS idx_tasks_status_started ON tasks(status, started_at DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_file ON tasks(file_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_config ON tasks(config_id)",
+        # 任務步驟：依任務取得步驟（依順序）與計算已完成步驟數
+        "CREATE INDEX IF NOT EXISTS idx_task_steps_task_order ON task_steps(task_id, order_num)",
+        "CREATE INDEX IF NOT EXISTS idx_task_steps_task_status ON task_steps(task_id, status)",
+    ]),
+    (2, "結果與系統日誌查詢索引", [
+        # ResultManagementWidget.load_results：依狀態篩選並依建立時間排序
+        "CREATE INDEX IF NOT EXISTS idx_results_status_created ON results(status, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_results_created ON results(created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_results_task ON results(task_id)",
+        # SystemSettingsWidget.load_logs / filter_logs：依級別篩選並依時間排序
+        "CREATE INDEX IF NOT EXISTS idx_system_logs_level_created ON system_logs(level, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_system_logs_created ON system_logs(created_at DESC)",
+    ]),
+    (3, "處理配置預設標記與索引", [
+        # ProcessConfigWidget 查詢與新增時使用 is_default，但舊架構未建立此欄位
+        _add_column_if_missing("process_configs", "is_default", "INTEGER NOT NULL DEFAULT 0"),
+        "CREATE INDEX IF NOT EXISTS idx_process_configs_default_updated ON process_configs(is_default, updated_at DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_process_configs_status_updated ON process_configs(status, updated_at DESC)",
+    ]),
+    (4, "文件列表鍵集分頁索引", [
+        # FileRepository.list_files 以 (created_at, id) 作為分頁游標
+        "DROP INDEX IF EXISTS idx_files_status_created",
+        "DROP INDEX IF EXISTS idx_files_created",
+        "CREATE INDEX IF NOT EXISTS idx_files_status_created_id ON files(status, created_at DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_files_created_id ON files(created_at DESC, id DESC)",
+    ]),
+    (5, "文件與結果的中繼資料欄位", [
+        # 上傳或產生結果時記錄，列表畫面不必再逐筆存取檔案系統
+        _add_column_if_missing("files", "original_name", "TEXT"),
+        _add_column_if_missing("files", "size_bytes", "INTEGER"),
+        _add_column_if_missing("files", "mtime", "REAL"),
+        _add_column_if_missing("files", "sha256", "TEXT"),
+        _add_column_if_missing("files", "mime_type", "TEXT"),
+        _add_column_if_missing("files", "extension", "TEXT"),
+        _add_column_if_missing("files", "sheet_count", "INTEGER"),
+        _add_column_if_missing("files", "row_count", "INTEGER"),
+        _add_column_if_missing("results", "original_name", "TEXT"),
+        _add_column_if_missing("results", "size_bytes", "INTEGER"),
+        _add_column_if_missing("results", "mtime", "REAL"),
+        _add_column_if_missing("results", "sha256", "TEXT"),
+        _add_column_if_missing("results", "mime_type", "TEXT"),
+        _add_column_if_missing("results", "extension", "TEXT"),
+        _add_column_if_missing("results", "sheet_count", "INTEGER"),
+        _add_column_if_missing("results", "row_count", "INTEGER"),
+        "CREATE INDEX IF NOT EXISTS idx_files_sha256 ON files(sha256)",
+    ]),
+    (6, "任務優先級排程", [
+        # TaskEngine 於步驟邊界檢查此標記，讓出工作程序給緊急任務
+        _add_column_if_missing("tasks", "preempt_requested", "INTEGER NOT NULL DEFAULT 0"),
+        # TaskEngine.claim_next_task：依優先級領取最早建立的等待中任務
+        "CREATE INDEX IF NOT EXISTS idx_tasks_status_priority_created ON tasks(status, priority, created_at, id)",
+    ]),
+    (7, "任務佇列租約", [
+        # TaskQueue：領取任務的工作者、租約到期時間（epoch 秒）、最後心跳與領取次數
+        _add_column_if_missing("tasks", "worker_id", "TEXT"),
+        _add_column_if_missing("tasks", "lease_expires_at", "REAL"),
+        _add_column_if_missing("tasks", "heartbeat_at", "REAL"),
+        _add_column_if_missing("tasks", "attempts", "INTEGER NOT NULL DEFAULT 0"),
+        # TaskQueue.requeue_expired：找出租約過期的執行中任務
+        "CREATE INDEX IF NOT EXISTS idx_tasks_status_lease ON tasks(status, lease_expires_at)",
+    ]),
+    (8, "任務步驟快取命中標記", [
+        # 步驟輸出由快取載入而未實際執行時為 1
+        _add_column_if_missing("task_steps", "cache_hit", "INTEGER NOT NULL DEFAULT 0"),
+    ]),
+    (9, "步驟耗時統計", [
+        # 步驟開始執行的時間（epoch 秒），用於估計執行中步驟的剩餘時間
+        _add_column_if_missing("task_steps", "started_at", "REAL"),
+        # StepStatistics：每個處理配置步驟最近的實際執行耗時與輸入規模
+        """
+        CREATE TABLE IF NOT EXISTS step_run_stats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            config_id INTEGER,
+            order_num INTEGER NOT NULL,
+            step_name TEXT NOT NULL,
+            seconds REAL NOT NULL,
+            input_rows INTEGER,
+            input_bytes INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_step_run_stats_config_step ON step_run_stats(config_id, order_num, step_name, id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_step_run_stats_name ON step_run_stats(step_name, id DESC)",
+    ]),
+    (10, "步驟效能量測欄位", [
+        # 牆鐘時間與執行緒 CPU 時間（毫秒）
+        _add_column_if_missing("task_steps", "wall_ms", "REAL"),
+        _add_column_if_missing("task_steps", "cpu_ms", "REAL"),
+        # 步驟結束時工作程序的峰值 RSS，與啟用分析時 tracemalloc 記錄的峰值（位元組）
+        _add_column_if_missing("task_steps", "peak_rss_bytes", "INTEGER"),
+        _add_column_if_missing("task_steps", "tracemalloc_peak_bytes", "INTEGER"),
+        # 輸入/輸出列數；讀取/寫入位元組（讀取步驟為文件大小，其餘為資料集的記憶體大小）
+        _add_column_if_missing("task_steps", "rows_in", "INTEGER"),
+        _add_column_if_missing("task_steps", "rows_out", "INTEGER"),
+        _add_column_if_missing("task_steps", "bytes_read", "INTEGER"),
+        _add_column_if_missing("task_steps", "bytes_written", "INTEGER"),
+        # 耗時超過門檻時保存的 cProfile 分析檔
+        _add_column_if_missing("task_steps", "profile_path", "TEXT"),
+    ]),
+    (11, "任務停止要求", [
+        # 介面要求停止執行中的任務時設為 1，TaskEngine 轉為工作程序的共享取消標記
+        _add_column_if_missing("tasks", "cancel_requested", "INTEGER NOT NULL DEFAULT 0"),
+    ]),
+]
+
+
 class DatabaseManager:
     """資料庫管理類"""
     
@@ -10,15 +434,133 @@ class DatabaseManager:
         self.db_file = db_file
         
     def get_connection(self):
-        """獲取資料庫連接"""
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row  # 使查詢結果可以通過列名訪問
-        return conn
+        """獲取資料庫連接（來自連接池，close() 時自動歸還）"""
+        return get_pool(self.db_file).acquire()
+    
+    @contextmanager
+    def connection(self):
+        """以上下文管理器取得連接，離開時歸還"""
+        conn = self.get_connection()
+        try:
+            yield conn
+        finally:
+            conn.close()
+    
+    @contextmanager
+    def transaction(self):
+        """以上下文管理器執行交易，成功時提交，發生例外時回滾
+
+        交易開始時即取得寫入鎖（BEGIN IMMEDIATE）：WAL 模式下讀取交易途中升級為寫入
+        會直接失敗而不等待，先取得寫入鎖才能讓忙碌逾時生效。
+        """
+        conn = self.get_connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def submit_write(self, func, *args, **kwargs):
+        """將寫入操作 func(conn, *args, **kwargs) 交給寫入執行緒，回傳 Future
+
+        短時間內排入的多個寫入會合併為一次提交；func 不可自行提交，
+        也不可在 func 中等待其他寫入操作（寫入執行緒會因此停住）。
+        """
+        return get_write_queue(self.db_file).submit(func, *args, **kwargs)
+    
+    def write(self, func, *args, **kwargs):
+        """執行寫入操作並等待提交，回傳 func 的回傳值（失敗時拋出 func 的例外）"""
+        return self.submit_write(func, *args, **kwargs).result()
+    
+    @contextmanager
+    def _bulk_connection(self, conn):
+        """批次寫入使用呼叫端的連接（在其交易中寫入），否則開啟一個交易"""
+        if conn is not None:
+            yield conn
+            return
+        with self.transaction() as conn:
+            yield conn
+    
+    def _executemany(self, sql, rows, columns, conn, chunk_size):
+        count = 0
+        with self._bulk_connection(conn) as conn:
+            for chunk in _chunks(rows, chunk_size or BULK_CHUNK_ROWS):
+                conn.executemany(sql, [_row_values(row, columns) for row in chunk])
+                count += len(chunk)
+        return count
+    
+    def bulk_insert(self, table, rows, columns=None, conn=None, chunk_size=BULK_CHUNK_ROWS):
+        """以 executemany 批次插入多列，回傳插入列數
+        
+        rows 為字典（欄位預設取第一列的鍵）或依 columns 順序排列的序列，可以是產生器。
+        大量資料分段執行，但全部在同一個交易中寫入：傳入 conn 時使用呼叫端的交易，
+        否則自行開啟交易。
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return 0
+        if columns is None and not isinstance(first, dict):
+            raise ValueError("以序列插入時必須指定欄位")
+        columns = list(columns or first.keys())
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            quote_identifier(table), ", ".join(quote_identifier(column) for column in columns),
+            ", ".join("?" for _ in columns))
+        return self._executemany(sql, _prepend(first, rows), columns, conn, chunk_size)
+    
+    def bulk_update(self, table, rows, key_columns=('id',), conn=None, chunk_size=BULK_CHUNK_ROWS):
+        """以 executemany 批次更新多列，回傳處理的列數
+        
+        rows 為字典，key_columns 以外的欄位（以第一列為準）為要更新的欄位。
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return 0
+        key_columns = list(key_columns)
+        update_columns = [column for column in first if column not in key_columns]
+        if not update_columns:
+            raise ValueError("批次更新沒有要更新的欄位")
+        sql = "UPDATE {} SET {} WHERE {}".format(
+            quote_identifier(table),
+            ", ".join(f"{quote_identifier(column)} = ?" for column in update_columns),
+            " AND ".join(f"{quote_identifier(column)} = ?" for column in key_columns))
+        return self._executemany(sql, _prepend(first, rows), update_columns + key_columns, conn, chunk_size)
+    
+    def upsert_many(self, table, rows, conflict_columns, update_columns=None, conn=None,
+                    chunk_size=BULK_CHUNK_ROWS):
+        """批次插入多列，與 conflict_columns 的唯一索引衝突時改為更新，回傳處理的列數
+        
+        update_columns 預設為 conflict_columns 以外的所有欄位；為空序列時衝突的列略過不寫入。
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return 0
+        columns = list(first.keys())
+        conflict_columns = list(conflict_columns)
+        if update_columns is None:
+            update_columns = [column for column in columns if column not in conflict_columns]
+        if update_columns:
+            action = "DO UPDATE SET " + ", ".join(
+                f"{quote_identifier(column)} = excluded.{quote_identifier(column)}" for column in update_columns)
+        else:
+            action = "DO NOTHING"
+        sql = "INSERT INTO {} ({}) VALUES ({}) ON CONFLICT ({}) {}".format(
+            quote_identifier(table), ", ".join(quote_identifier(column) for column in columns),
+            ", ".join("?" for _ in columns),
+            ", ".join(quote_identifier(column) for column in conflict_columns), action)
+        return self._executemany(sql, _prepend(first, rows), columns, conn, chunk_size)
     
     def initialize_database(self):
         """初始化資料庫架構"""
-        # 如果資料庫已存在則返回
+        # 如果資料庫已存在，只需升級架構
         if os.path.exists(self.db_file):
+            self.migrate()
             return
         
         # 確保目錄存在
@@ -40,6 +582,47 @@ class DatabaseManager:
         else:
             # 如果架構腳本不存在，手動創建表格
             self.create_tables()
+        
+        # 新建的資料庫同樣套用所有遷移
+        self.migrate()
+    
+    def get_schema_version(self):
+        """取得目前資料庫架構版本（PRAGMA user_version）"""
+        with self.connection() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    def migrate(self):
+        """依序套用尚未執行的架構遷移，回傳套用後的版本"""
+        conn = self.get_connection()
+        try:
+            # 取得寫入鎖，避免多個程式實例同時遷移
+            conn.execute("BEGIN IMMEDIATE")
+            current_version = conn.execute("PRAGMA user_version").fetchone()[0]
+            
+            for version, description, steps in MIGRATIONS:
+                if version <= current_version:
+                    continue
+                
+                for step in steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(step)
+                
+                # user_version 與遷移內容在同一交易中寫入
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+                current_version = version
+            
+            conn.commit()
+            
+            # 讓查詢規劃器取得新索引的統計資訊
+            conn.execute("PRAGMA optimize")
+            return current_version
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
     
     def create_tables(self):
         """手動創建資料表"""
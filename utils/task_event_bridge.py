@@ -0,0 +1,32 @@
+from PySide6.QtCore import QObject, Signal
+
+from modules import task_events
+
+
+class TaskEventBridge(QObject):
+    """將任務引擎的事件轉為 Qt 信號
+
+    事件由事件轉發執行緒（或主程序中執行的函式）發出，信號以佇列連線
+    送到介面執行緒處理，介面不需要再定時查詢資料庫。
+    """
+
+    task_status_changed = Signal(int, str)
+    task_progress_changed = Signal(int, float)
+    task_steps_changed = Signal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        callback = self._emit_event
+        task_events.subscribe(callback)
+        # 物件銷毀後不再接收事件
+        self.destroyed.connect(lambda: task_events.unsubscribe(callback))
+
+    def _emit_event(self, event):
+        kind = event['kind']
+        task_id = event['task_id']
+        if kind == task_events.STATUS_EVENT:
+            self.task_status_changed.emit(task_id, event.get('status') or '')
+        elif kind == task_events.PROGRESS_EVENT:
+            self.task_progress_changed.emit(task_id, float(event.get('progress') or 0))
+        elif kind == task_events.STEP_EVENT:
+            self.task_steps_changed.emit(task_id)